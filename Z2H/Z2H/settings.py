@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'drf_spectacular',
 
     'corsheaders',
+    'django_dramatiq',
 
     'apps.app',
     'apps.user',
@@ -127,6 +128,123 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+if os.environ.get('REDIS_URL', None):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'z2h',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'z2h',
+        }
+    }
+
+# Seconds configuration (plans, roles, web page access) stays in the shared and in-process caches
+CONFIG_CACHE_TIMEOUT = int(os.environ.get('CONFIG_CACHE_TIMEOUT', 300))
+CONFIG_LOCAL_CACHE_TIMEOUT = int(os.environ.get('CONFIG_LOCAL_CACHE_TIMEOUT', 30))
+CONFIG_LOCAL_CACHE_SIZE = int(os.environ.get('CONFIG_LOCAL_CACHE_SIZE', 1000))
+
+# Seconds a resolved API token stays in the shared and in-process caches, and the most tokens one process keeps
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 60))
+AUTH_TOKEN_LOCAL_CACHE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_LOCAL_CACHE_TIMEOUT', 5))
+AUTH_TOKEN_LOCAL_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_LOCAL_CACHE_SIZE', 1000))
+
+# Seconds a user's mobile home payload (GetUserInfoView) stays cached
+MOBILE_USER_INFO_CACHE_TIMEOUT = int(os.environ.get('MOBILE_USER_INFO_CACHE_TIMEOUT', 300))
+
+# Seconds the product catalog snapshot and its per-category fragments stay cached; changes invalidate them earlier
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 3600))
+
+# Largest rowsPerPage a paginated list accepts
+MAX_ROWS_PER_PAGE = int(os.environ.get('MAX_ROWS_PER_PAGE', 100))
+
+# Most orders a search returns; each searched field is capped at this many matches before they are merged
+ORDER_SEARCH_RESULT_LIMIT = int(os.environ.get('ORDER_SEARCH_RESULT_LIMIT', 100))
+
+# Notification delivery: seconds between outbox checks (the clients' poll hint and the SSE loop) and how long an SSE stream stays open (ASGI only)
+NOTIFICATION_POLL_INTERVAL = int(os.environ.get('NOTIFICATION_POLL_INTERVAL', 2))
+NOTIFICATION_STREAM_TIMEOUT = int(os.environ.get('NOTIFICATION_STREAM_TIMEOUT', 300))
+
+# Serve the dashboard from the refresh_dashboard_snapshot snapshot while it is younger than this many seconds (0 disables)
+DASHBOARD_SNAPSHOT_MAX_AGE = int(os.environ.get('DASHBOARD_SNAPSHOT_MAX_AGE', 0))
+
+
+# Background jobs
+# Run workers with `python manage.py rundramatiq`
+
+DRAMATIQ_MIDDLEWARE = [
+    'dramatiq.middleware.AgeLimit',
+    'dramatiq.middleware.TimeLimit',
+    'dramatiq.middleware.Callbacks',
+    'dramatiq.middleware.Retries',
+    'django_dramatiq.middleware.DbConnectionsMiddleware',
+]
+
+if os.environ.get('REDIS_URL', None):
+    DRAMATIQ_BROKER = {
+        'BROKER': 'dramatiq.brokers.redis.RedisBroker',
+        'OPTIONS': {
+            'url': os.environ['REDIS_URL'],
+        },
+        'MIDDLEWARE': DRAMATIQ_MIDDLEWARE,
+    }
+else:
+    DRAMATIQ_BROKER = {
+        'BROKER': 'dramatiq.brokers.stub.StubBroker',
+        'OPTIONS': {},
+        'MIDDLEWARE': DRAMATIQ_MIDDLEWARE,
+    }
+
+# Emails are queued for the workers only when a real broker is configured, otherwise they are sent in the request
+EMAIL_ASYNC_DELIVERY = os.environ.get('EMAIL_ASYNC_DELIVERY', 'true' if os.environ.get('REDIS_URL', None) else 'false') == 'true'
+
+# Resized WebP variants of uploaded images are generated by the workers when a real broker is configured
+IMAGE_VARIANTS_ASYNC = os.environ.get('IMAGE_VARIANTS_ASYNC', 'true' if os.environ.get('REDIS_URL', None) else 'false') == 'true'
+# Longest side in pixels of each variant; a full size WebP is always produced as well
+IMAGE_VARIANT_SIZES = {
+    'thumbnail': int(os.environ.get('IMAGE_THUMBNAIL_SIZE', 200)),
+    'medium': int(os.environ.get('IMAGE_MEDIUM_SIZE', 600)),
+}
+IMAGE_WEBP_QUALITY = int(os.environ.get('IMAGE_WEBP_QUALITY', 80))
+
+# Resumable video uploads: received chunks live in UPLOAD_SESSION_DIR until the upload is verified
+UPLOAD_SESSION_DIR = os.environ.get('UPLOAD_SESSION_DIR', os.path.join(BASE_DIR, 'upload_sessions'))
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))
+UPLOAD_MAX_CHUNK_SIZE = int(os.environ.get('UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 * 1024))
+VIDEO_UPLOAD_MAX_SIZE = int(os.environ.get('VIDEO_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024))
+
+# The checksum of a fully received upload is verified by the workers when a real broker is configured
+UPLOAD_VERIFY_ASYNC = os.environ.get('UPLOAD_VERIFY_ASYNC', 'true' if os.environ.get('REDIS_URL', None) else 'false') == 'true'
+
+# smtp (yagmail), console or file; the console and file backends only keep message bodies when DEBUG is on
+EMAIL_DELIVERY_BACKEND = os.environ.get('EMAIL_DELIVERY_BACKEND', 'smtp')
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'sent_emails'))
+
+# Log records of the project's apps go to the console at APPS_LOG_LEVEL
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'apps': {
+            'handlers': ['console'],
+            'level': os.environ.get('APPS_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -167,6 +285,6 @@ AUTH_USER_MODEL = 'user.Z2HUser'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "apps.user.authentication.CachedTokenAuthentication",
     ]
 }
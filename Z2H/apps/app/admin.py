@@ -10,7 +10,8 @@ from apps.app.models import (
     Z2HProductImages,
     Z2HOrders,
     Z2HOrderItems,
-    Z2HProductsReturned
+    Z2HProductsReturned,
+    Z2HPaymentIngestions,
 )
 
 # Register your models here.
@@ -48,6 +49,9 @@ class Z2HOrderItemsAdmin(admin.ModelAdmin):
 class Z2HProductsReturnedAdmin(admin.ModelAdmin):
     list_display = [field.name for field in Z2HProductsReturned._meta.get_fields()]
 
+class Z2HPaymentIngestionsAdmin(admin.ModelAdmin):
+    list_display = ('uid', 'idempotency_key', 'payment_reference', 'user', 'order', 'response_status', 'created')
+
 admin.site.register(Z2HWebPages, Z2HWebPagesAdmin)
 admin.site.register(Z2HWebPageRoles, Z2HWebPageRolesAdmin)
 admin.site.register(Z2HPlanDetails, Z2HPlanDetailsAdmin)
@@ -58,4 +62,5 @@ admin.site.register(Z2HProducts, Z2HProductsAdmin)
 admin.site.register(Z2HProductImages, Z2HProductImagesAdmin)
 admin.site.register(Z2HOrders, Z2HOrdersAdmin)
 admin.site.register(Z2HOrderItems, Z2HOrderItemsAdmin)
-admin.site.register(Z2HProductsReturned, Z2HProductsReturnedAdmin)
\ No newline at end of file
+admin.site.register(Z2HProductsReturned, Z2HProductsReturnedAdmin)
+admin.site.register(Z2HPaymentIngestions, Z2HPaymentIngestionsAdmin)
\ No newline at end of file
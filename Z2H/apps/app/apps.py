@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.app'
+
+    def ready(self):
+        # Connects the product catalog snapshot invalidation signals
+        from apps.app import catalog
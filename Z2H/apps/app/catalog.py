@@ -0,0 +1,184 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from apps.app.models import (
+    Z2HPlanDetails,
+    Z2HProductCategories,
+    Z2HProductSubCategories,
+    Z2HProducts,
+    Z2HProductImages,
+)
+from apps.app.serializers import Z2HProductSerializer, Z2HProductSubCategoriesSerializer
+
+# The catalog document is assembled from one cached fragment per category. Every key carries a version that a
+# change moves forward once its transaction commits: readers read the version before building, so a build from
+# rows that were already stale is stored under a version nobody asks for any more. A change only moves the
+# versions of the categories it touches and of the document, so the next read rebuilds just those fragments.
+CATALOG_VERSION_KEY = "catalog:version"
+
+def get_category_version_key(category_id):
+    return f"catalog:category_version:{category_id}"
+
+def get_category_fragment_key(category_id, version):
+    return f"catalog:category:{category_id}:{version}"
+
+def get_initial_version():
+    # Starts from the clock, so a version key the cache evicted never comes back at a number it used before
+    return time.time_ns() // 1000
+
+def get_versions(version_keys):
+    versions = cache.get_many(version_keys)
+
+    for key in version_keys:
+        if key not in versions:
+            cache.add(key, get_initial_version(), None)
+            versions[key] = cache.get(key)
+
+    return versions
+
+def get_catalog_version():
+    return get_versions([CATALOG_VERSION_KEY])[CATALOG_VERSION_KEY]
+
+def get_catalog_categories(version):
+    key = f"catalog:categories:{version}"
+    categories = cache.get(key)
+    if categories is None:
+        categories = list(
+            Z2HProductCategories.objects.filter(is_active=True).order_by('id').values(
+                'id', 'uid', 'name', 'description', 'category_code',
+            )
+        )
+        cache.set(key, categories, settings.CATALOG_CACHE_TIMEOUT)
+
+    return categories
+
+def build_category_fragment(category_id):
+    """Active sub categories of a category with their active products, images and plan prices."""
+    sub_categories = Z2HProductSubCategories.objects.filter(
+        category_id=category_id, is_active=True,
+    ).select_related('category').order_by('id')
+
+    products = Z2HProductSerializer.setup_eager_loading(
+        Z2HProducts.objects.filter(sub_category__category_id=category_id, sub_category__is_active=True, is_active=True).order_by('id')
+    )
+
+    products_by_sub_category = {}
+    for product in products:
+        products_by_sub_category.setdefault(product.sub_category_id, []).append(Z2HProductSerializer(product).data)
+
+    fragment = []
+    for sub_category in sub_categories:
+        sub_category_data = dict(Z2HProductSubCategoriesSerializer(sub_category).data)
+        sub_category_data['products'] = products_by_sub_category.get(sub_category.id, [])
+        fragment.append(sub_category_data)
+
+    return fragment
+
+def build_catalog_document(version):
+    categories = get_catalog_categories(version)
+    category_versions = get_versions([get_category_version_key(category['id']) for category in categories])
+    fragment_keys = {
+        category['id']: get_category_fragment_key(category['id'], category_versions[get_category_version_key(category['id'])])
+        for category in categories
+    }
+
+    fragments = cache.get_many(list(fragment_keys.values()))
+    missing_fragments = {
+        key: build_category_fragment(category_id) for category_id, key in fragment_keys.items() if key not in fragments
+    }
+    if missing_fragments:
+        cache.set_many(missing_fragments, settings.CATALOG_CACHE_TIMEOUT)
+        fragments.update(missing_fragments)
+
+    document = {
+        'version': version,
+        'categories': [
+            dict(category, sub_categories=fragments[fragment_keys[category['id']]]) for category in categories
+        ],
+    }
+
+    payload = json.dumps(document, cls=DjangoJSONEncoder, sort_keys=True)
+
+    return document, hashlib.md5(payload.encode()).hexdigest()
+
+def get_catalog():
+    """Return (document, etag) for the whole active catalog."""
+    version = get_catalog_version()
+    key = f"catalog:document:{version}"
+
+    entry = cache.get(key)
+    if entry is None:
+        document, etag = build_catalog_document(version)
+        entry = {'document': document, 'etag': etag}
+        cache.set(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+
+    return entry['document'], entry['etag']
+
+def bump_versions(version_keys):
+    for key in version_keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted; readers start it again from the clock
+            pass
+
+def invalidate_catalog(category_ids=()):
+    """Move the given categories' fragments and the document to new versions once the current transaction commits."""
+    version_keys = [CATALOG_VERSION_KEY] + [get_category_version_key(category_id) for category_id in category_ids if category_id]
+
+    transaction.on_commit(lambda: bump_versions(version_keys))
+
+def get_product_category_ids(products):
+    return set(products.values_list('sub_category__category_id', flat=True))
+
+@receiver(post_save, sender=Z2HProductCategories)
+@receiver(post_delete, sender=Z2HProductCategories)
+def invalidate_category(sender, instance, **kwargs):
+    invalidate_catalog([instance.id])
+
+@receiver(pre_save, sender=Z2HProductSubCategories)
+@receiver(pre_save, sender=Z2HProducts)
+def remember_previous_category(sender, instance, **kwargs):
+    # A sub category or product moved elsewhere has to leave its old category's fragment too
+    instance._catalog_previous_category_ids = set()
+
+    if instance.pk:
+        if sender is Z2HProductSubCategories:
+            instance._catalog_previous_category_ids = set(
+                sender.objects.filter(pk=instance.pk).values_list('category_id', flat=True)
+            )
+        else:
+            instance._catalog_previous_category_ids = get_product_category_ids(sender.objects.filter(pk=instance.pk))
+
+@receiver(post_save, sender=Z2HProductSubCategories)
+@receiver(post_delete, sender=Z2HProductSubCategories)
+def invalidate_sub_category(sender, instance, **kwargs):
+    invalidate_catalog({instance.category_id} | getattr(instance, '_catalog_previous_category_ids', set()))
+
+@receiver(post_save, sender=Z2HProducts)
+@receiver(post_delete, sender=Z2HProducts)
+def invalidate_product(sender, instance, **kwargs):
+    category_ids = set(getattr(instance, '_catalog_previous_category_ids', set()))
+    if instance.sub_category_id:
+        category_ids |= set(
+            Z2HProductSubCategories.objects.filter(id=instance.sub_category_id).values_list('category_id', flat=True)
+        )
+
+    invalidate_catalog(category_ids)
+
+@receiver(post_save, sender=Z2HProductImages)
+@receiver(post_delete, sender=Z2HProductImages)
+def invalidate_product_image(sender, instance, **kwargs):
+    invalidate_catalog(get_product_category_ids(Z2HProducts.objects.filter(id=instance.product_id)))
+
+@receiver(post_save, sender=Z2HPlanDetails)
+@receiver(post_delete, sender=Z2HPlanDetails)
+def invalidate_plan(sender, instance, **kwargs):
+    invalidate_catalog(get_product_category_ids(Z2HProducts.objects.filter(plan_id=instance.id)))
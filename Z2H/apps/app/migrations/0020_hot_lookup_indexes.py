@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_z2hproductsreturned'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='z2horders',
+            index=models.Index(fields=['order_status', 'order_date'], name='order_status_date'),
+        ),
+        migrations.AddIndex(
+            model_name='z2horders',
+            index=models.Index(fields=['order_number'], name='order_order_number'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hwebpageroles',
+            index=models.Index(fields=['role_uid', 'web_page_uid'], name='web_page_role_page'),
+        ),
+    ]
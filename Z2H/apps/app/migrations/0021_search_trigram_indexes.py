@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Trigram indexes on the exact expression Django emits for icontains/istartswith on PostgreSQL,
+# UPPER("column"::text), so substring searches don't scan the tables. Other databases are left alone.
+TRIGRAM_INDEXES = [
+    ('order_number_trgm', 'app_z2horders', 'order_number'),
+    ('customer_number_trgm', 'user_z2hcustomers', 'customer_number'),
+    ('register_user_mobile_trgm', 'user_registeruser', 'mobile_number'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for index_name, table_name, column_name in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING gin (UPPER({column_name}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for index_name, table_name, column_name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_hot_lookup_indexes'),
+        ('user', '0024_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
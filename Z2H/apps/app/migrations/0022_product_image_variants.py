@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0021_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='z2hproductimages',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
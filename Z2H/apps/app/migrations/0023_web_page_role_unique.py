@@ -0,0 +1,42 @@
+# Generated by Django 4.2.10 on 2026-10-18 01:30
+
+from django.db import migrations, models
+
+
+def merge_duplicate_web_page_roles(apps, schema_editor):
+    # Keep the oldest row of each role/page pair, active if any of its duplicates was
+    Z2HWebPageRoles = apps.get_model('app', 'Z2HWebPageRoles')
+
+    kept = {}
+    duplicate_ids = []
+    for web_page_role in Z2HWebPageRoles.objects.order_by('id'):
+        key = (web_page_role.role_uid, web_page_role.web_page_uid)
+        if key not in kept:
+            kept[key] = web_page_role
+            continue
+
+        duplicate_ids.append(web_page_role.id)
+        if web_page_role.is_active and not kept[key].is_active:
+            kept[key].is_active = True
+            kept[key].save(update_fields=['is_active'])
+
+    Z2HWebPageRoles.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_web_page_roles, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='z2hwebpageroles',
+            name='web_page_role_page',
+        ),
+        migrations.AddConstraint(
+            model_name='z2hwebpageroles',
+            constraint=models.UniqueConstraint(fields=('role_uid', 'web_page_uid'), name='web_page_role_unique'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.10 on 2026-10-18 01:13
+
+from django.db import migrations, models
+
+
+def scope_idempotency_keys(apps, schema_editor):
+    # Keys taken from the payment reference become ref:<reference>, header keys header:<user id>:<key>.
+    # A reference seen on more than one row stays on the oldest only.
+    Z2HPaymentIngestions = apps.get_model('app', 'Z2HPaymentIngestions')
+
+    seen_references = set()
+    for ingestion in Z2HPaymentIngestions.objects.order_by('id'):
+        if ingestion.idempotency_key == ingestion.payment_reference:
+            ingestion.idempotency_key = f"ref:{ingestion.payment_reference}"[:255]
+        else:
+            ingestion.idempotency_key = f"header:{ingestion.user_id}:{ingestion.idempotency_key}"[:255]
+
+        if ingestion.payment_reference in seen_references:
+            ingestion.payment_reference = None
+        elif ingestion.payment_reference:
+            seen_references.add(ingestion.payment_reference)
+
+        ingestion.save(update_fields=['idempotency_key', 'payment_reference'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0024_payment_ingestions'),
+    ]
+
+    operations = [
+        migrations.RunPython(scope_idempotency_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='z2hpaymentingestions',
+            name='payment_reference',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0025_payment_ingestion_scoped_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='z2hproductimages',
+            index=models.Index(fields=['product_image_url'], name='product_image_url'),
+        ),
+    ]
@@ -15,6 +15,11 @@ class Z2HWebPageRoles(ZeroToHeroBaseModel):
     role_uid = models.CharField(max_length=64, null=False, blank=False)
     web_page_uid = models.CharField(max_length=64, null=False, blank=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['role_uid', 'web_page_uid'], name='web_page_role_unique'),
+        ]
+
     def __str__(self):
         return f"{self.role_uid} - {self.web_page_uid}"
 
@@ -89,8 +94,14 @@ class Z2HProducts(ZeroToHeroBaseModel):
 
 class Z2HProductImages(ZeroToHeroBaseModel):
     product_image_url = models.CharField(max_length=256, null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True)
     product = models.ForeignKey(Z2HProducts, on_delete=models.CASCADE, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product_image_url'], name='product_image_url'),
+        ]
+
     def __str__(self):
         return self.product_image_url
 
@@ -123,6 +134,12 @@ class Z2HOrders(ZeroToHeroBaseModel):
     delivery_details = models.JSONField(default=dict, null=True, blank=True)
     payment_details = models.JSONField(default=dict, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['order_status', 'order_date'], name='order_status_date'),
+            models.Index(fields=['order_number'], name='order_order_number'),
+        ]
+
     def __str__(self):
         return self.order_number
 
@@ -145,6 +162,18 @@ class Z2HOrderItems(ZeroToHeroBaseModel):
     def __str__(self):
         return self.order_item_number
 
+class Z2HPaymentIngestions(ZeroToHeroBaseModel):
+    """A checkout accepted for a payment, with the response it returned, so a retried POST gets the same answer."""
+    user = models.ForeignKey(Z2HUser, on_delete=models.CASCADE, null=False, blank=False)
+    idempotency_key = models.CharField(max_length=255, unique=True, null=False, blank=False)
+    payment_reference = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    order = models.ForeignKey(Z2HOrders, on_delete=models.SET_NULL, null=True, blank=True)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_data = models.JSONField(default=dict, null=True, blank=True)
+
+    def __str__(self):
+        return self.idempotency_key
+
 class Z2HProductsReturned(ZeroToHeroBaseModel):
     product_id = models.CharField(max_length=64, null=True, blank=True)
     customer_id = models.CharField(max_length=64, null=True, blank=True)
@@ -0,0 +1,69 @@
+from django.db import IntegrityError, transaction
+from apps.app.models import Z2HPaymentIngestions
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+
+def get_payment_reference(request):
+    payment_reference = request.data.get('payment_reference', None)
+
+    return str(payment_reference).strip()[:255] if payment_reference else None
+
+def get_idempotency_key(request):
+    """
+    The client's Idempotency-Key header scoped to the user, else the payment reference of the request.
+    The prefixes keep the two kinds of keys apart, so a header can never replay another payment's response.
+    """
+    header_key = request.headers.get(IDEMPOTENCY_KEY_HEADER, None)
+    if header_key and header_key.strip():
+        return f"header:{request.user.id}:{header_key.strip()}"[:255]
+
+    payment_reference = get_payment_reference(request)
+
+    return f"ref:{payment_reference}"[:255] if payment_reference else None
+
+def find_payment_ingestion(request):
+    """
+    Ingestion stored under the request's key, else under its payment reference, so a retry that added or
+    dropped the Idempotency-Key header still finds the checkout it repeats.
+    """
+    key = get_idempotency_key(request)
+    ingestion = Z2HPaymentIngestions.objects.filter(idempotency_key=key).first() if key else None
+
+    payment_reference = get_payment_reference(request)
+    if not ingestion and payment_reference:
+        ingestion = Z2HPaymentIngestions.objects.filter(payment_reference=payment_reference).first()
+
+    return ingestion
+
+def get_payment_ingestion(request, refresh=False):
+    """Ingestion already stored for the request, looked up once per request unless refresh is given."""
+    if refresh or not hasattr(request, '_payment_ingestion'):
+        request._payment_ingestion = find_payment_ingestion(request)
+
+    return request._payment_ingestion
+
+def claim_payment_ingestion(request):
+    """
+    Insert the ingestion row for the request's key, or return None when another request holds its key or
+    payment reference; the caller replays that request's response (or refuses it, for another user's).
+    Call inside the checkout transaction: a concurrent duplicate waits on the unique index until that
+    transaction ends, and a rolled back checkout frees the key for the client's retry.
+    """
+    try:
+        with transaction.atomic():
+            return Z2HPaymentIngestions.objects.create(
+                user=request.user,
+                idempotency_key=get_idempotency_key(request),
+                payment_reference=get_payment_reference(request),
+            )
+    except IntegrityError:
+        if get_payment_ingestion(request, refresh=True):
+            return None
+
+        raise
+
+def complete_payment_ingestion(ingestion, order, response_status, response_data):
+    ingestion.order = order
+    ingestion.response_status = response_status
+    ingestion.response_data = response_data
+    ingestion.save(update_fields=['order', 'response_status', 'response_data', 'modified'])
@@ -1,9 +1,15 @@
 from rest_framework import permissions
 from apps.user.models import Z2HCustomers
+from apps.utils.cache import get_user_web_pages
+from apps.app.payments import get_payment_ingestion
 
 class CustomerExistsPermission(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method == 'POST':
+            # A retried payment is let through so the view can replay the response it got the first time
+            if get_payment_ingestion(request):
+                return True
+
             z2h_customers = Z2HCustomers.objects.filter(user=request.user)
             if not z2h_customers.first():
                 return True
@@ -23,4 +29,18 @@ class CustomerExistsPermission(permissions.BasePermission):
                 
             return is_customer_completed_level
                 
-        return False
\ No newline at end of file
+        return False
+
+class WebPagePermission(permissions.BasePermission):
+    """Allows users whose role has the view's web_page enabled. Resolved from the config cache."""
+
+    message = "You Don't Have Access To This Page!!!"
+
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+
+        if request.user.is_superuser:
+            return True
+
+        return view.web_page in get_user_web_pages(request.user)
\ No newline at end of file
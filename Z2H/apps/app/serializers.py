@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import (
     Z2HPlanDetails,
@@ -13,6 +14,7 @@ from .models import (
     Z2HProductsReturned,
 )
 from apps.user.models import Role, RegisterUser, Z2HCustomers
+from apps.utils.cache import get_role, get_web_page_names
 from datetime import datetime
 
 class Z2HPlanDetailsSerializer(serializers.ModelSerializer):
@@ -30,8 +32,23 @@ class Z2HProductCategoriesSerializer(serializers.ModelSerializer):
             'id', 'is_active', 'uid', 'name', 'description', 'sub_categories', 'category_code', 'product_category_status',
         )
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load every category's active sub categories up front."""
+        return queryset.prefetch_related(
+            Prefetch(
+                'z2hproductsubcategories_set',
+                queryset=Z2HProductSubCategories.objects.filter(is_active=True).select_related('category'),
+                to_attr='active_sub_categories',
+            ),
+        )
+
     def get_sub_categories(self, obj):
-        return Z2HProductSubCategoriesSerializer(Z2HProductSubCategories.objects.filter(category=obj, is_active=True), many=True).data
+        sub_categories = getattr(obj, 'active_sub_categories', None)
+        if sub_categories is None:
+            sub_categories = Z2HProductSubCategories.objects.filter(category=obj, is_active=True).select_related('category')
+
+        return Z2HProductSubCategoriesSerializer(sub_categories, many=True).data
     
     def get_product_category_status(self, obj):
         if obj.is_active:
@@ -88,8 +105,26 @@ class Z2HProductSerializer(serializers.ModelSerializer):
             'price', 'discount', 'offer_price', 'product_active_status', 'product_code', 'plan_name',
         )
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the category, plan and active images of every product up front."""
+        return queryset.select_related('sub_category__category', 'plan').prefetch_related(
+            Prefetch(
+                'z2hproductimages_set',
+                queryset=Z2HProductImages.objects.filter(is_active=True),
+                to_attr='active_images',
+            ),
+        )
+
     def get_product_image_urls(self, obj):
-        return [{"url": image.product_image_url, "uid": image.uid} for image in Z2HProductImages.objects.filter(product=obj, is_active=True)]
+        images = getattr(obj, 'active_images', None)
+        if images is None:
+            images = Z2HProductImages.objects.filter(product=obj, is_active=True)
+
+        return [
+            {"url": image.product_image_url, "uid": image.uid, "variants": image.image_variants}
+            for image in images
+        ]
 
     def get_product_active_status(self, obj):
         if obj.is_active:
@@ -146,6 +181,23 @@ class Z2HOrderSerializer(serializers.ModelSerializer):
             'referrer_mobile_number','pincode','city','town','district'
         )
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load customers, register users, districts, referrers and items for every order up front."""
+        return queryset.select_related(
+            'ordered_by__user__district',
+            'customer__referrer__user__user',
+        ).prefetch_related(
+            Prefetch('ordered_by__users', queryset=Z2HCustomers.objects.order_by('id')),
+            Prefetch('z2horderitems_set', queryset=Z2HOrderItems.objects.select_related('product')),
+        )
+
+    def get_register_user(self, obj):
+        return obj.ordered_by.user
+
+    def get_referrer(self, obj):
+        return obj.customer.referrer if obj.customer else None
+
     def get_delivery_through(self, obj):
         if not obj.delivery_details:
             return None
@@ -191,25 +243,26 @@ class Z2HOrderSerializer(serializers.ModelSerializer):
         return obj.ordered_by.name
     
     def get_customer_number(self, obj):
-       return Z2HCustomers.objects.filter(user=obj.ordered_by).first().customer_number
+        customers = obj.ordered_by.users.all()
+        return customers[0].customer_number if customers else None
     
     def get_mobile_number(self, obj):
-        return RegisterUser.objects.filter(user=obj.ordered_by).first().mobile_number
+        return self.get_register_user(obj).mobile_number
     
     def get_customer_address(self, obj):
-        return RegisterUser.objects.filter(user=obj.ordered_by).first().address
+        return self.get_register_user(obj).address
     
     def get_city(self, obj):
-        return RegisterUser.objects.filter(user=obj.ordered_by).first().city
+        return self.get_register_user(obj).city
     
     def get_town(self, obj):
-        return RegisterUser.objects.filter(user=obj.ordered_by).first().town
+        return self.get_register_user(obj).town
     
     def get_pincode(self, obj):
-        return RegisterUser.objects.filter(user=obj.ordered_by).first().pin_code
+        return self.get_register_user(obj).pin_code
     
     def get_district(self, obj):
-        return RegisterUser.objects.filter(user=obj.ordered_by).first().district.name
+        return self.get_register_user(obj).district.name
     
     def get_order_igst_amount(self, obj):
         return obj.order_igst_amount if obj.order_igst_amount else 0.00
@@ -240,20 +293,19 @@ class Z2HOrderSerializer(serializers.ModelSerializer):
             return 'In Transit'
     
     def get_order_items(self, obj):
-        return Z2HOrderItemSerializer(Z2HOrderItems.objects.filter(order=obj), many=True).data
+        return Z2HOrderItemSerializer(obj.z2horderitems_set.all(), many=True).data
 
     def get_referrer_id(self, obj):
-        referrer = Z2HCustomers.objects.filter(referrer=obj.customer.referrer).first()
+        referrer = self.get_referrer(obj)
         return referrer.customer_number if referrer else None
     
     def get_referrer_name(self, obj):
-        user = Z2HCustomers.objects.filter(referrer=obj.customer.referrer).first().user
-        return user.name if user else None
+        referrer = self.get_referrer(obj)
+        return referrer.user.name if referrer else None
     
     def get_referrer_mobile_number(self, obj):
-        user = Z2HCustomers.objects.filter(referrer=obj.customer.referrer).first().user
-        register_user = RegisterUser.objects.filter(user=user).first()
-        return register_user.mobile_number if register_user else None
+        referrer = self.get_referrer(obj)
+        return referrer.user.user.mobile_number if referrer else None
     
 class Z2HOrderItemSerializer(serializers.ModelSerializer):
     product_id = serializers.CharField(source='product.uid')
@@ -294,10 +346,10 @@ class Z2HWebPageRolesSerializer(serializers.ModelSerializer):
         fields = ('uid', 'role_uid', 'web_page_uid', 'role_name', 'web_page_name', 'is_active')
 
     def get_role_name(self, obj):
-        return Role.objects.filter(uid=obj.role_uid).first().name
+        return get_role(obj.role_uid).name
     
     def get_web_page_name(self, obj):
-        return Z2HWebPages.objects.filter(uid=obj.web_page_uid).first().name
+        return get_web_page_names().get(obj.web_page_uid)
     
 class Z2HProductsReturedSerializer(serializers.ModelSerializer):
     product_returned_date = serializers.SerializerMethodField()
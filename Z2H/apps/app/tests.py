@@ -1,3 +1,299 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APITestCase
+from apps.app import payments
+from apps.app.catalog import build_catalog_document, get_catalog, get_catalog_version
+from apps.app.models import (
+    Z2HProductCategories,
+    Z2HProductSubCategories,
+    Z2HProducts,
+    Z2HProductImages,
+    Z2HOrders,
+    Z2HPaymentIngestions,
+)
+from apps.user.models import RegisterUser, Z2HCustomers, Z2HReferralTree
+from apps.app.views import LEVEL_LEG_COUNTS, PostPaymentView
+from apps.user.tests import create_customer, create_customer_tree, create_register_user
+from apps.utils import sequences
+from apps.utils.cache import clear_config_cache
 
 # Create your tests here.
+
+class OrderAndProductQueryCountTests(APITestCase):
+    """The order and product lists must cost the same number of queries whatever the result size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers, cls.product = create_customer_tree(12)
+
+    def setUp(self):
+        cache.clear()
+        clear_config_cache()
+        self.client.force_authenticate(self.customers[0].user)
+
+    def add_products(self, count):
+        for index in range(count):
+            product = Z2HProducts.objects.create(
+                name=f"Product {index}", sub_category=self.product.sub_category, plan=self.product.plan, is_active=True,
+            )
+            Z2HProductImages.objects.create(product=product, product_image_url=f"products/{index}.png")
+
+    def test_orders_list_query_count(self):
+        for rows_per_page in (2, 10):
+            cache.clear()
+            clear_config_cache()
+            with self.assertNumQueries(4):
+                response = self.client.get('/api/z2h/app/orders/', {'page': 1, 'rowsPerPage': rows_per_page})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['data']), rows_per_page)
+
+    def test_products_list_query_count(self):
+        for new_products, expected_rows in ((1, 2), (8, 10)):
+            self.add_products(new_products)
+            cache.clear()
+            clear_config_cache()
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/z2h/app/products_list/')
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), expected_rows)
+
+    def test_orders_list_rejects_invalid_paging(self):
+        for params in ({'rowsPerPage': 0}, {'rowsPerPage': 'abc'}, {'rowsPerPage': 1000}, {'page': -1}):
+            for extra_params in ({}, {'cursor': ''}):
+                response = self.client.get('/api/z2h/app/orders/', {**params, **extra_params})
+
+                self.assertEqual(response.status_code, 400)
+
+    def test_order_search_rejects_invalid_paging(self):
+        for params in ({'page': 'abc'}, {'rowsPerPage': '0'}, {'page': '-1'}):
+            response = self.client.get('/api/z2h/app/ordersitesearch/ORD', params)
+
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/api/z2h/app/ordersitesearch/ORD', {'page': 2, 'rowsPerPage': 5})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_count'], 12)
+        self.assertEqual(len(response.data['data']), 5)
+
+class CatalogCacheTests(APITestCase):
+    """Catalog changes reach readers once they commit, and a build from stale rows is never served."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers, cls.product = create_customer_tree(1)
+        cls.other_category = Z2HProductCategories.objects.create(name='Other Category')
+        other_sub_category = Z2HProductSubCategories.objects.create(name='Other Sub Category', category=cls.other_category)
+        Z2HProducts.objects.create(name='Other Product', sub_category=other_sub_category, is_active=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.customers[0].user)
+
+    def get_product_names(self):
+        document, etag = get_catalog()
+
+        return [
+            product['name']
+            for category in document['categories'] for sub_category in category['sub_categories'] for product in sub_category['products']
+        ]
+
+    def test_change_is_served_after_commit(self):
+        self.assertIn('Product', self.get_product_names())
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.name = 'Renamed Product'
+            self.product.save()
+
+            # Not committed yet: the cached catalog stays as it was
+            self.assertIn('Product', self.get_product_names())
+
+        for callback in callbacks:
+            callback()
+
+        self.assertIn('Renamed Product', self.get_product_names())
+
+    def test_build_finished_after_invalidation_is_not_served(self):
+        version = get_catalog_version()
+        stale_document, stale_etag = build_catalog_document(version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Renamed Product'
+            self.product.save()
+
+        # A reader that started before the change stores its build late
+        cache.set(f"catalog:document:{version}", {'document': stale_document, 'etag': stale_etag})
+
+        self.assertIn('Renamed Product', self.get_product_names())
+
+    def test_change_rebuilds_only_its_category(self):
+        self.get_product_names()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Renamed Product'
+            self.product.save()
+
+        # The categories list and the changed category's sub categories, products and images
+        with self.assertNumQueries(4):
+            self.assertIn('Other Product', self.get_product_names())
+
+    def test_etag_answers_not_modified(self):
+        response = self.client.get('/api/z2h/app/catalog/')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/z2h/app/catalog/', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+
+class CheckoutTestCase(APITestCase):
+    """Two registered users under an admin root, ready to check out."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers, cls.product = create_customer_tree(1)
+        register_user = RegisterUser.objects.select_related('district', 'role').get(user=cls.customers[0].user)
+        cls.user = create_register_user(register_user.district, register_user.role, 50, referred_by=cls.customers[0])
+        cls.other_user = create_register_user(register_user.district, register_user.role, 51, referred_by=cls.customers[0])
+
+    def setUp(self):
+        cache.clear()
+        clear_config_cache()
+        self.addCleanup(sequences._blocks.clear)
+        self.client.force_authenticate(self.user)
+
+    def post_payment(self, payment_reference='PAY1', idempotency_key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': idempotency_key} if idempotency_key else {}
+
+        return self.client.post('/api/z2h/app/update_payment/', {
+            'payment_mode': 'upi', 'payment_status': 'success', 'payment_reference': payment_reference, 'product': str(self.product.uid),
+        }, format='json', **headers)
+
+class PaymentIdempotencyTests(CheckoutTestCase):
+    """A retried checkout gets its first response back and never creates a second order."""
+
+    def test_retry_replays_first_response(self):
+        first_response = self.post_payment(idempotency_key='key-1')
+        response = self.post_payment(idempotency_key='key-1')
+
+        self.assertEqual(first_response.status_code, 200)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.data, first_response.data)
+        self.assertEqual(Z2HOrders.objects.filter(ordered_by=self.user).count(), 1)
+
+    def test_retry_that_adds_or_drops_the_header_replays(self):
+        first_response = self.post_payment(idempotency_key='key-1')
+
+        for idempotency_key in (None, 'key-2'):
+            with self.subTest(idempotency_key=idempotency_key):
+                response = self.post_payment(idempotency_key=idempotency_key)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data, first_response.data)
+
+        self.assertEqual(Z2HOrders.objects.filter(ordered_by=self.user).count(), 1)
+
+    def test_same_key_from_another_user_conflicts(self):
+        self.post_payment(idempotency_key='key-1')
+        self.client.force_authenticate(self.other_user)
+
+        for idempotency_key in ('key-1', None):
+            with self.subTest(idempotency_key=idempotency_key):
+                self.assertEqual(self.post_payment(idempotency_key=idempotency_key).status_code, 409)
+
+        self.assertFalse(Z2HOrders.objects.filter(ordered_by=self.other_user).exists())
+
+    def test_concurrent_duplicate_replays_the_winner(self):
+        first_claim = payments.claim_payment_ingestion
+
+        def claim_after_duplicate_commits(request):
+            # The duplicate checks out between this request's lookup and its claim
+            Z2HPaymentIngestions.objects.create(
+                user=self.user, idempotency_key=payments.get_idempotency_key(request), payment_reference='PAY1',
+                response_status=200, response_data={'status': 'success', 'customer_uid': 'WINNER'},
+            )
+            return first_claim(request)
+
+        with mock.patch('apps.app.views.claim_payment_ingestion', side_effect=claim_after_duplicate_commits):
+            response = self.post_payment(idempotency_key='key-1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['customer_uid'], 'WINNER')
+        self.assertFalse(Z2HCustomers.objects.filter(user=self.user).exists())
+
+    def test_rolled_back_checkout_frees_the_key(self):
+        with mock.patch('apps.app.views.PostPaymentView.update_referrer_level', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.post_payment(idempotency_key='key-1')
+
+        self.assertFalse(Z2HPaymentIngestions.objects.exists())
+
+        response = self.post_payment(idempotency_key='key-1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Z2HOrders.objects.filter(ordered_by=self.user).count(), 1)
+
+class CheckoutTests(CheckoutTestCase):
+    """The customer, its referral paths and the order are written together, with totals summed as Decimals."""
+
+    def test_checkout_creates_customer_and_order(self):
+        response = self.post_payment()
+
+        self.assertEqual(response.status_code, 200)
+
+        customer = Z2HCustomers.objects.get(user=self.user)
+        self.assertEqual(customer.referrer, self.customers[0])
+        self.assertEqual(
+            list(Z2HReferralTree.objects.filter(descendant=customer).order_by('depth').values_list('ancestor', 'depth')),
+            [(customer.id, 0), (self.customers[0].id, 1)],
+        )
+
+        order = Z2HOrders.objects.get(customer=customer)
+        self.assertEqual(order.total_product_price, Decimal('195.00'))
+        self.assertEqual(order.order_cgst_amount, Decimal('2.50'))
+        self.assertEqual(order.order_sgst_amount, Decimal('2.50'))
+        self.assertEqual(order.order_gst_total_amount, Decimal('5.00'))
+        self.assertEqual(order.order_total_amount, Decimal('200.00'))
+        self.assertEqual(order.z2horderitems_set.get().total_amount, Decimal('200.00'))
+
+    def test_failed_checkout_leaves_no_rows(self):
+        referral_paths = Z2HReferralTree.objects.count()
+
+        with mock.patch('apps.app.views.PostPaymentView.update_referrer_level', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.post_payment()
+
+        self.assertFalse(Z2HCustomers.objects.filter(user=self.user).exists())
+        self.assertFalse(Z2HOrders.objects.filter(ordered_by=self.user).exists())
+        self.assertEqual(Z2HReferralTree.objects.count(), referral_paths)
+
+class LevelCompletionTests(TestCase):
+    """A referrer completes a level when that level's downline count reaches LEVEL_LEG_COUNTS, not before."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers, cls.product = create_customer_tree(1)
+
+    def test_level_one_completes_at_leg_count(self):
+        referrer = self.customers[1]
+        register_user = RegisterUser.objects.select_related('district', 'role').get(user=referrer.user)
+
+        for index in range(LEVEL_LEG_COUNTS[1]):
+            referrer.refresh_from_db()
+            self.assertFalse(referrer.is_level_one_completed)
+
+            user = create_register_user(register_user.district, register_user.role, 50 + index, referred_by=referrer)
+            customer = create_customer(user, self.product.plan, 50 + index, referrer=referrer)
+            PostPaymentView().update_referrer_level(None, customer)
+
+        referrer.refresh_from_db()
+        self.assertEqual(referrer.level_one_downline_count, LEVEL_LEG_COUNTS[1])
+        self.assertTrue(referrer.is_level_one_completed)
+        self.assertIsNotNone(referrer.level_one_completed_date)
+        self.assertFalse(referrer.is_level_two_completed)
@@ -22,6 +22,9 @@ urlpatterns += [
     path(
         r'products_list/', views.Z2HProductsListView.as_view(), name="products_list"
     ),
+    path(
+        r'catalog/', views.Z2HCatalogView.as_view(), name="catalog"
+    ),
     #  path(
     #     r'ordersitemcount', views.Z2HOrderItemCount.as_view(), name="ordersitemcount"
     # ),
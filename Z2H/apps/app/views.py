@@ -3,10 +3,9 @@ from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from rest_framework import authentication, permissions, status
+from rest_framework import permissions, status
 from rest_framework import filters
 from rest_framework.decorators import action
-from django.core.paginator import Paginator
 from .models import (
     Z2HPlanDetails,
     Z2HProductCategories,
@@ -34,13 +33,43 @@ from apps.app.serializers import (
     Z2HProductsReturedSerializer,
 )
 from apps.user.serializers import RoleSerializer
-from apps.user.models import Z2HCustomers, RegisterUser, Role
-from apps.app.permissions import CustomerExistsPermission
-from apps.utils.models import Z2HSettings
+from apps.user.models import Z2HCustomers, RegisterUser, Role, Z2HReferralTree, REFERRAL_LEVEL_NAMES
+from apps.user.authentication import CachedTokenAuthentication
+from apps.user.commissions import record_completed_levels
+from apps.user.notifications import notify_product_purchase, notify_level_completions
+from apps.app.catalog import get_catalog, get_product_category_ids, invalidate_catalog
+from apps.app.payments import (
+    get_payment_reference,
+    get_payment_ingestion,
+    claim_payment_ingestion,
+    complete_payment_ingestion,
+)
+from apps.app.permissions import CustomerExistsPermission, WebPagePermission
+from apps.utils.sequences import (
+    get_next_number,
+    ORDER_NUMBER,
+    ORDER_ITEM_NUMBER,
+    CUSTOMER_NUMBER,
+    PRODUCT_CODE,
+    PRODUCT_CATEGORY_CODE,
+    PRODUCT_SUB_CATEGORY_CODE,
+)
+from apps.utils.export import stream_csv_response
+from apps.utils.cache import get_plan_by_name, get_web_page_names, invalidate_role_web_pages
+from apps.utils.pagination import (
+    get_cursor_pagination_data,
+    get_page_pagination_data,
+    get_page_number,
+    get_rows_per_page,
+    CURSOR_QUERY_PARAM,
+    DEFAULT_ROWS_PER_PAGE,
+)
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
-from django.http import FileResponse
-import csv
-import io
+from django.utils.http import parse_etags, quote_etag
+from decimal import Decimal
+import math
 import os
 
 # Create your views here.
@@ -51,11 +80,18 @@ SECONDARY_LEG_COUNT = PRIMARY_LEG_COUNT * PRIMARY_LEG_COUNT
 TERTIARY_LEG_COUNT = SECONDARY_LEG_COUNT * PRIMARY_LEG_COUNT
 QUATERNARY_LEG_COUNT = TERTIARY_LEG_COUNT * PRIMARY_LEG_COUNT
 
+LEVEL_LEG_COUNTS = {
+    1: PRIMARY_LEG_COUNT,
+    2: SECONDARY_LEG_COUNT,
+    3: TERTIARY_LEG_COUNT,
+    4: QUATERNARY_LEG_COUNT,
+}
+
 class Z2HPlanDetailsViewSet(ModelViewSet):
     queryset = Z2HPlanDetails.objects.all()
     serializer_class = Z2HPlanDetailsSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     lookup_field = 'uid'
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['id']
@@ -65,19 +101,13 @@ class Z2HProductCategoriesViewSet(ModelViewSet):
     queryset = Z2HProductCategories.objects.all()
     serializer_class = Z2HProductCategoriesSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
-
-    def perform_create(self, serializer):
-        product_category_code_settings = Z2HSettings.objects.filter(name='product_category_code', is_active=True).first()
-        product_category_code = product_category_code_settings.value
-
-        product_category_sequence_settings = Z2HSettings.objects.filter(name='product_category_sequence', is_active=True).first()
-        product_category_sequence = int(product_category_sequence_settings.value)
+    authentication_classes = [CachedTokenAuthentication]
 
-        product_category_sequence_settings.value = str(product_category_sequence + 1)
-        product_category_sequence_settings.save()
+    def get_queryset(self):
+        return Z2HProductCategoriesSerializer.setup_eager_loading(Z2HProductCategories.objects.all())
 
-        category_code = product_category_code + str(product_category_sequence)
+    def perform_create(self, serializer):
+        category_code = get_next_number(PRODUCT_CATEGORY_CODE)
 
         return serializer.save(category_code=category_code)
 
@@ -85,7 +115,7 @@ class Z2HProductSubCategoriesViewSet(ModelViewSet):
     queryset = Z2HProductSubCategories.objects.all()
     serializer_class = Z2HProductSubCategoriesSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     lookup_field = 'uid'
     lookup_url_kwarg = 'uid'
     lookup_value_regex = LOOKUP_REGEX
@@ -97,19 +127,10 @@ class Z2HProductSubCategoriesViewSet(ModelViewSet):
         return Z2HCreateProductSubCategoriesSerializer
 
     def get_queryset(self):
-        return Z2HProductSubCategories.objects.filter(category__uid=self.kwargs['product_category_uid'])
+        return Z2HProductSubCategories.objects.filter(category__uid=self.kwargs['product_category_uid']).select_related('category')
 
     def perform_create(self, serializer):
-        product_sub_category_code_settings = Z2HSettings.objects.filter(name='product_sub_category_code', is_active=True).first()
-        product_sub_category_code = product_sub_category_code_settings.value
-
-        product_sub_category_sequence_settings = Z2HSettings.objects.filter(name='product_sub_category_sequence', is_active=True).first()
-        product_sub_category_sequence = int(product_sub_category_sequence_settings.value)
-
-        product_sub_category_sequence_settings.value = str(product_sub_category_sequence + 1)
-        product_sub_category_sequence_settings.save()
-
-        sub_category_code = product_sub_category_code + str(product_sub_category_sequence)
+        sub_category_code = get_next_number(PRODUCT_SUB_CATEGORY_CODE)
 
         return serializer.save(sub_category_code=sub_category_code)
     
@@ -117,7 +138,7 @@ class Z2HProductsViewSet(ModelViewSet):
     queryset = Z2HProducts.objects.all()
     serializer_class = Z2HProductSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     lookup_field = 'uid'
     lookup_url_kwarg = 'uid'
     lookup_value_regex = LOOKUP_REGEX
@@ -126,9 +147,11 @@ class Z2HProductsViewSet(ModelViewSet):
         product_type = self.request.query_params.get('product_type', None)
 
         if product_type and product_type == "all":
-            return Z2HProducts.objects.filter(sub_category__uid=self.kwargs['product_sub_category_uid'])
+            products = Z2HProducts.objects.filter(sub_category__uid=self.kwargs['product_sub_category_uid'])
+        else:
+            products = Z2HProducts.objects.filter(sub_category__uid=self.kwargs['product_sub_category_uid'], is_active=True)
 
-        return Z2HProducts.objects.filter(sub_category__uid=self.kwargs['product_sub_category_uid'], is_active=True)
+        return Z2HProductSerializer.setup_eager_loading(products)
     
     @action(detail=False, methods=['POST', ], url_path='add', url_name='add')
     def add_product(self, request, *args, **kwargs):
@@ -139,16 +162,7 @@ class Z2HProductsViewSet(ModelViewSet):
 
         product_sub_category_obj = Z2HProductSubCategories.objects.filter(uid=self.kwargs['product_sub_category_uid']).first()
 
-        product_code_settings = Z2HSettings.objects.filter(name='product_code', is_active=True).first()
-        product_code_value = product_code_settings.value
-
-        product_code_sequence_settings = Z2HSettings.objects.filter(name='prod_code_sequence', is_active=True).first()
-        product_code_sequence = int(product_code_sequence_settings.value)
-
-        product_code_sequence_settings.value = str(product_code_sequence + 1)
-        product_code_sequence_settings.save()
-
-        product_code = product_code_value + str(product_code_sequence)
+        product_code = get_next_number(PRODUCT_CODE)
 
         product = Z2HProducts.objects.create(
             name=product_name,
@@ -175,16 +189,32 @@ class Z2HProductsListView(ListAPIView):
     queryset = Z2HProducts.objects.all()
     serializer_class = Z2HProductSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def get_queryset(self):
         product_type = self.request.query_params.get('product_type', None)
 
         if product_type == "inactive":
-            return Z2HProducts.objects.filter(is_active=False)
+            return Z2HProductSerializer.setup_eager_loading(Z2HProducts.objects.filter(is_active=False))
 
-        return Z2HProducts.objects.filter(is_active=True)
+        return Z2HProductSerializer.setup_eager_loading(Z2HProducts.objects.filter(is_active=True))
     
+class Z2HCatalogView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CachedTokenAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        catalog, etag = get_catalog()
+
+        etag = quote_etag(etag)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and etag in parse_etags(if_none_match):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response({"status": "success", "catalog": catalog}, status=status.HTTP_200_OK, headers=headers)
+
 class Z2HProductsPlanMapView(APIView):
 
     def post(self, request, *args, **kwargs):
@@ -193,7 +223,10 @@ class Z2HProductsPlanMapView(APIView):
 
         plan_obj = Z2HPlanDetails.objects.filter(uid=plan_uid).first()
 
-        Z2HProducts.objects.filter(uid__in=product_uid).update(plan=plan_obj, is_active=True)
+        products = Z2HProducts.objects.filter(uid__in=product_uid)
+        category_ids = get_product_category_ids(products)
+        products.update(plan=plan_obj, is_active=True)
+        invalidate_catalog(category_ids)
 
         return Response({"status": "success", "message": "Plan map updated successfully"}, status=status.HTTP_200_OK)
 
@@ -201,19 +234,56 @@ class Z2HOrdersSearchView(ListAPIView):
     queryset = Z2HOrders.objects.all()
     serializer_class = Z2HOrderSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
-    
-    def get_queryset(self):
-        return Z2HOrders.objects.filter(order_number__icontains=str(self.kwargs['order_number']))
+    authentication_classes = [CachedTokenAuthentication]
+
+    # Fields an order can be found by, each searched in its own bounded query so every one can use its own index
+    search_fields = ['order_number', 'customer__customer_number', 'ordered_by__user__mobile_number']
+
+    def get_search_lookup(self):
+        # PostgreSQL has trigram indexes for substring matches; elsewhere only prefixes are matched
+        return 'icontains' if connection.vendor == 'postgresql' else 'istartswith'
+
+    def get_matching_order_ids(self, search_term):
+        lookup = self.get_search_lookup()
+        order_ids = set()
+
+        for search_field in self.search_fields:
+            order_ids.update(
+                Z2HOrders.objects.filter(
+                    **{f"{search_field}__{lookup}": search_term}
+                ).order_by('-id').values_list('id', flat=True)[:settings.ORDER_SEARCH_RESULT_LIMIT]
+            )
+
+        return sorted(order_ids, reverse=True)[:settings.ORDER_SEARCH_RESULT_LIMIT]
     
     def get(self, request, *args, **kwargs):
-        data = self.get_queryset()
+        search_term = str(self.kwargs['order_number']).strip()
+
+        try:
+            page = get_page_number(request, default=1)
+            rowsPerPage = get_rows_per_page(request)
+        except ValueError as e:
+            return Response({"status": "Error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        order_ids = self.get_matching_order_ids(search_term) if search_term else []
+        page_order_ids = order_ids[(page - 1) * rowsPerPage:page * rowsPerPage]
+
+        orders = Z2HOrderSerializer.setup_eager_loading(
+            Z2HOrders.objects.filter(id__in=page_order_ids)
+        ).order_by('-id')
+
+        data = {
+            "data": self.get_serializer(orders, many=True).data,
+            "total_count": len(order_ids),
+            "total_page_count": math.ceil(len(order_ids) / rowsPerPage),
+        }
+
         return Response(data, status=status.HTTP_200_OK)
     
 class Z2HOrderItemCount(ListAPIView):
     queryset = Z2HOrders.objects.all()
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     
     def get(self, request, *args, **kwargs):
         data = {
@@ -226,7 +296,7 @@ class Z2HOrdersListView(ListAPIView):
     queryset = Z2HOrderItems.objects.all()
     serializer_class = Z2HOrderItemSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     lookup_field = 'uid'
     lookup_url_kwarg = 'uid'
     lookup_value_regex = LOOKUP_REGEX
@@ -246,27 +316,29 @@ class Z2HOrdersListView(ListAPIView):
         return Response(data, status=status.HTTP_200_OK)
 
 class Z2HOrdersViewSet(ModelViewSet):
-    queryset = Z2HOrders.objects.all()
+    queryset = Z2HOrderSerializer.setup_eager_loading(Z2HOrders.objects.all())
     serializer_class = Z2HOrderSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     lookup_field = 'uid'
     
-    def get_paginationData(self, queryset, page="1", rowsPerPage="10"):
-        paginator = Paginator(queryset, rowsPerPage)
-        page_obj = paginator.get_page(page)
-        data = {
-            "data": page_obj.object_list,
-            "total_page_count":round(queryset.count()/10),
-        }
-        return data
+    def get_paginationData(self, queryset, page=1, rowsPerPage=DEFAULT_ROWS_PER_PAGE):
+        return get_page_pagination_data(queryset, page, rowsPerPage)
     
     def list(self, request, *args, **kwargs): 
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        page = self.request.query_params.get('page', None)
-        rowsPerPage = self.request.query_params.get('rowsPerPage', None)
-        pagination_data = self.get_paginationData(queryset, page=page, rowsPerPage=rowsPerPage)
+
+        try:
+            page = get_page_number(request, default=1)
+            rowsPerPage = get_rows_per_page(request)
+
+            if CURSOR_QUERY_PARAM in self.request.query_params:
+                pagination_data = get_cursor_pagination_data(request, queryset, ('order_number', 'id'), rowsPerPage)
+            else:
+                pagination_data = self.get_paginationData(queryset, page=page, rowsPerPage=rowsPerPage)
+        except ValueError as e:
+            return Response({"status": "Error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         pagination_data['data'] = self.get_serializer(pagination_data['data'], many=True).data
         return Response(pagination_data, status=status.HTTP_200_OK)
         
@@ -280,11 +352,11 @@ class Z2HOrdersViewSet(ModelViewSet):
 
         if from_date and to_date:
             if order_status == 'all':
-                return self.queryset.filter(order_date__range=[from_date, to_date]).order_by("order_number")
+                return self.queryset.filter(order_date__range=[from_date, to_date]).order_by("order_number", "id")
             else:
-                return self.queryset.filter(order_date__range=[from_date, to_date], order_status=order_status)
+                return self.queryset.filter(order_date__range=[from_date, to_date], order_status=order_status).order_by("order_number", "id")
         
-        return self.queryset.order_by("order_number")[:10]
+        return self.queryset.order_by("order_number", "id")
     
     def partial_update(self, request, *args, **kwargs):
         orders = Z2HOrders.objects.filter(uid=kwargs['uid']).first()
@@ -313,13 +385,13 @@ class Z2HAdVideosView(ListAPIView):
     queryset = Z2HAdvertisements.objects.all()
     serializer_class = Z2HAdvertisementsSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def get_queryset(self):
         return Z2HAdvertisements.objects.filter(name='demo_video', is_active=True)
     
 class PostPaymentView(APIView):
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated, CustomerExistsPermission]
 
     def check_required_key_exists(self, request_data_keys):
@@ -330,71 +402,22 @@ class PostPaymentView(APIView):
         
         return True
     
-    def check_product_exists(self, product_uid):
-        return Z2HProducts.objects.filter(uid=product_uid, is_active=True).exists()
-    
-    def create_order(self, request, request_data):
-        payment_details = {
-            "payment_date": str(timezone.now()),
-            "payment_mode": request_data['payment_mode'],
-            "payment_status": request_data['payment_status'],
-            "payment_reference": request_data['payment_reference']
-        }
-
-        settings_order_number_text = Z2HSettings.objects.filter(name='order_number_text', is_active=True).first()
-        order_number_text = settings_order_number_text.value
-
-        settings_order_number_sequence = Z2HSettings.objects.filter(name="order_number_sequence", is_active=True).first()
-        order_number_value = int(settings_order_number_sequence.value)
-
-        settings_order_number_sequence.value = str(order_number_value + 1)
-        settings_order_number_sequence.save()
-
-        order_number = order_number_text + str(order_number_value)
-
-        z2h_orders = Z2HOrders.objects.create(
-            ordered_by=request.user,
-            order_date=timezone.now(),
-            order_cgst_amount=0.0,
-            order_sgst_amount=0.0,
-            order_total_amount=0.0,
-            order_status='yet_to_be_couriered',
-            order_type='customer',
-            delivery_date=None,
-            delivery_details=None,
-            payment_details=payment_details,
-            courier_date=None,
-            order_number=order_number,
-        )
-
-        return z2h_orders
+    def get_product(self, product_uid):
+        return Z2HProducts.objects.select_related('plan').filter(uid=product_uid, is_active=True).first()
     
-    def create_order_details(self, request, request_data, order):
-        product = Z2HProducts.objects.filter(uid=request_data['product']).first()
-
-        settings_order_item_number_text = Z2HSettings.objects.filter(name='order_item_number_text', is_active=True).first()
-        order_item_number_text = settings_order_item_number_text.value
-
-        settings_order_item_number_sequence = Z2HSettings.objects.filter(name='order_item_number_sequence', is_active=True).first()
-        order_item_number_sequence = int(settings_order_item_number_sequence.value)
-
-        settings_order_item_number_sequence.value = str(order_item_number_sequence + 1)
-        settings_order_item_number_sequence.save()
-
-        order_item_number = order_item_number_text + str(order_item_number_sequence)
-
-        cgst_percentage = 2.50
-        cgst_amount = 2.50
-        sgst_percentage = 2.50
-        sgst_amount = 2.50
-        igst_percentage = 0.00
-        igst_amount = 0.00
+    def build_order_item(self, product, order_item_number):
+        """Unsaved order item for one unit of the product; the plan's registration fee includes the GST."""
+        cgst_percentage = Decimal('2.50')
+        cgst_amount = Decimal('2.50')
+        sgst_percentage = Decimal('2.50')
+        sgst_amount = Decimal('2.50')
+        igst_percentage = Decimal('0.00')
+        igst_amount = Decimal('0.00')
         gst_total_amount = cgst_amount + sgst_amount + igst_amount
-        price = float(product.plan.registration_fee) - cgst_amount - sgst_amount
+        price = product.plan.registration_fee - cgst_amount - sgst_amount
         total_amount = price + gst_total_amount
 
-        z2h_order_items = Z2HOrderItems.objects.create(
-            order=order,
+        return Z2HOrderItems(
             product=product,
             hsn_code=product.hsn_code,
             quantity=1,
@@ -409,49 +432,43 @@ class PostPaymentView(APIView):
             total_amount=total_amount,
             order_item_number=order_item_number,
         )
-
-        return z2h_order_items
-    
-    def update_order_details(self, request, order):
-        z2h_order_items = Z2HOrderItems.objects.filter(order=order)
-
-        order_cgst_amount = 0.0
-        order_sgst_amount = 0.0
-        order_gst_total_amount = 0.0
-        order_total_amount = 0.0
-        total_product_amount = 0.0
-
-        for item in z2h_order_items:
-            order_cgst_amount += float(item.cgst_amount)
-            order_sgst_amount += float(item.sgst_amount)
-            order_gst_total_amount += float(item.gst_total_amount)
-            order_total_amount += float(item.total_amount)
-            total_product_amount += float(item.price)
-
-        Z2HOrders.objects.filter(uid=order.uid).update(
-            order_cgst_amount=order_cgst_amount,
-            order_sgst_amount=order_sgst_amount,
-            order_gst_total_amount=order_gst_total_amount,
-            order_total_amount=order_total_amount,
-            total_product_price=total_product_amount,
-        )
-
-        return True
     
-    def update_customer_details(self, request, order):
-        register_user = RegisterUser.objects.filter(user=request.user).first()
-        active_plan = Z2HPlanDetails.objects.get(name='Silver')
+    def create_order(self, request, request_data, order_number, customer, order_items):
+        """Insert the order with its totals summed from the items, then the items themselves."""
+        payment_details = {
+            "payment_date": str(timezone.now()),
+            "payment_mode": request_data['payment_mode'],
+            "payment_status": request_data['payment_status'],
+            "payment_reference": request_data['payment_reference']
+        }
 
-        settings_customer_number_text = Z2HSettings.objects.filter(name='customer_number_text', is_active=True).first()
-        customer_number_text = settings_customer_number_text.value
+        z2h_orders = Z2HOrders.objects.create(
+            ordered_by=request.user,
+            customer=customer,
+            order_date=timezone.now(),
+            total_product_price=sum((item.price for item in order_items), Decimal('0.00')),
+            order_cgst_amount=sum((item.cgst_amount for item in order_items), Decimal('0.00')),
+            order_sgst_amount=sum((item.sgst_amount for item in order_items), Decimal('0.00')),
+            order_gst_total_amount=sum((item.gst_total_amount for item in order_items), Decimal('0.00')),
+            order_total_amount=sum((item.total_amount for item in order_items), Decimal('0.00')),
+            order_status='yet_to_be_couriered',
+            order_type='customer',
+            delivery_date=None,
+            delivery_details=None,
+            payment_details=payment_details,
+            courier_date=None,
+            order_number=order_number,
+        )
 
-        settings_customer_number_sequence = Z2HSettings.objects.filter(name='customer_number_value', is_active=True).first()
-        customer_number_sequence = int(settings_customer_number_sequence.value)
+        for item in order_items:
+            item.order = z2h_orders
 
-        settings_customer_number_sequence.value = str(customer_number_sequence + 1)
-        settings_customer_number_sequence.save()
+        Z2HOrderItems.objects.bulk_create(order_items)
 
-        customer_number = customer_number_text + str(customer_number_sequence)
+        return z2h_orders
+    
+    def create_customer(self, request, register_user, customer_number):
+        active_plan = get_plan_by_name('Silver')
 
         customer = Z2HCustomers.objects.create(
             user=request.user,
@@ -461,150 +478,74 @@ class PostPaymentView(APIView):
             customer_number=customer_number,
         )
 
-        Z2HOrders.objects.filter(uid=order.uid).update(
-            customer=customer
-        )
+        Z2HReferralTree.objects.add_customer(customer)
+        notify_product_purchase(customer, register_user)
 
-        return True
+        return customer
         
-    def update_referrer_level(self, request):
-        z2hcustomer = Z2HCustomers.objects.filter(
-            user=request.user,
-            is_level_one_completed=False,
-            is_level_two_completed=False,
-            is_level_three_completed=False,
-            is_level_four_completed=False
-        )
+    def update_referrer_level(self, request, customer):
+        referrer_paths = Z2HReferralTree.objects.filter(
+            descendant=customer,
+            depth__gte=1,
+        ).select_related('ancestor').order_by('depth')
 
-        referrer_level_one = None
-        referrer_level_two = None
-        referrer_level_three = None
-        referrer_level_four = None
-        referrer_final_level = None
+        # Walk up the referral chain, stopping at the first admin referrer
+        referrers = []
+        for referrer_path in referrer_paths:
+            referrers.append((referrer_path.depth, referrer_path.ancestor))
+            if referrer_path.ancestor.is_admin_user:
+                break
 
-        referrer_level_one = z2hcustomer.first().referrer
-        is_referrer_first_admin = referrer_level_one.is_admin_user
+        completed_levels = []
+        for depth, referrer in referrers:
+            level = REFERRAL_LEVEL_NAMES[depth]
 
-        if is_referrer_first_admin:
-            referrer_final_level = referrer_level_one
-        
-        z2hcustomer_referrer_first = Z2HCustomers.objects.filter(id=referrer_level_one.id).first()
+            if getattr(referrer, f"is_level_{level}_completed"):
+                continue
 
-        z2hcustomers_under_referrer_first = Z2HCustomers.objects.filter(
-            referrer=z2hcustomer_referrer_first
-        ).exclude(
-            is_admin_user=True
-        )
+            if getattr(referrer, f"level_{level}_downline_count") != LEVEL_LEG_COUNTS[depth]:
+                continue
 
-        if not z2hcustomer_referrer_first.is_level_one_completed:
-            if z2hcustomers_under_referrer_first.count() == PRIMARY_LEG_COUNT:
-                z2hcustomer_referrer_first.is_level_one_completed = True
-                z2hcustomer_referrer_first.level_one_completed_date = timezone.now()
-                z2hcustomer_referrer_first.save()
-        
-        if referrer_level_one == referrer_final_level:
-            return True
+            setattr(referrer, f"is_level_{level}_completed", True)
+            setattr(referrer, f"level_{level}_completed_date", timezone.now())
+            update_fields = [f"is_level_{level}_completed", f"level_{level}_completed_date", "modified"]
 
-        ################## SECOND #######################
-        
-        referrer_level_two = Z2HCustomers.objects.filter(id=referrer_level_one.id).first().referrer
-        is_referrer_second_admin = referrer_level_two.is_admin_user
+            if depth == 4:
+                referrer.plan_end_date = timezone.now()
+                update_fields.append("plan_end_date")
 
-        if is_referrer_second_admin:
-            referrer_final_level = referrer_level_two
-        
-        # For Second Above Leg
-        z2hcustomer_referrer_second = Z2HCustomers.objects.filter(id=referrer_level_two.id).first()
-
-        # Taking the referrers under second leg
-        z2hcustomer_under_referrer_second = Z2HCustomers.objects.filter(
-            referrer=z2hcustomer_referrer_second
-        ).exclude(
-            is_admin_user=True
-        )
+            referrer.save(update_fields=update_fields)
+            completed_levels.append((referrer, depth))
 
-        # Getting the count of customers under these referrers to update is_level_two_completed of referrer
-        secondary_leg_count = 0
-        for customer in z2hcustomer_under_referrer_second:
-            secondary_leg_count += Z2HCustomers.objects.filter(referrer=customer).exclude(is_admin_user=True).count()
+        record_completed_levels(completed_levels)
+        notify_level_completions(completed_levels)
 
-        if secondary_leg_count == SECONDARY_LEG_COUNT:
-            z2hcustomer_referrer_second.is_level_two_completed = True
-            z2hcustomer_referrer_second.level_two_completed_date = timezone.now()
-            z2hcustomer_referrer_second.save()
-
-        if referrer_level_two == referrer_final_level:
-            return True
-
-        ################## THIRD #######################
-
-        referrer_level_three = Z2HCustomers.objects.filter(id=referrer_level_two.id).first().referrer
-        is_referrer_third_admin = referrer_level_three.is_admin_user
-
-        if is_referrer_third_admin:
-            referrer_final_level = referrer_level_three
-
-        # For Third Above Leg
-        z2hcustomer_referrer_third = Z2HCustomers.objects.filter(id=referrer_level_three.id).first()
-
-        # Taking the referrers under third leg
-        z2hcustomer_under_referrer_third = Z2HCustomers.objects.filter(
-            referrer=z2hcustomer_referrer_third
-        ).exclude(
-            is_admin_user=True
-        )
-
-        # Getting the count of customers under these referrers to update is_level_three_completed of referrer
-        third_leg_count = 0
-        for third_level_customer in z2hcustomer_under_referrer_third:
-            for customer in Z2HCustomers.objects.filter(referrer=third_level_customer).exclude(is_admin_user=True):
-                third_leg_count += Z2HCustomers.objects.filter(referrer=customer).exclude(
-                    is_admin_user=True
-                ).count()
-
-        if third_leg_count == TERTIARY_LEG_COUNT:
-            z2hcustomer_referrer_third.is_level_three_completed = True
-            z2hcustomer_referrer_third.level_three_completed_date = timezone.now()
-            z2hcustomer_referrer_third.save()
-
-        if referrer_level_three == referrer_final_level:
-            return True
-        
-        ################## FOURTH #######################
-        referrer_level_four = Z2HCustomers.objects.filter(id=referrer_level_three.id).first().referrer
+        return True
 
-        # For Fourth Above Leg
-        z2hcustomer_referrer_fourth = Z2HCustomers.objects.filter(id=referrer_level_four.id).first()
+    def get_payment_reference_used_response(self):
+        data = {
+            'status': 'error',
+            'message': 'Payment Reference Already Used!!!',
+        }
+        return Response(data=data, status=status.HTTP_409_CONFLICT)
 
-        # Taking the referrers under fouth leg
-        z2hcustomer_under_referrer_fourth = Z2HCustomers.objects.filter(
-            referrer=z2hcustomer_referrer_fourth
-        ).exclude(
-            is_admin_user=True
-        )
+    def get_replayed_response(self, request, ingestion):
+        if ingestion.user_id != request.user.id:
+            return self.get_payment_reference_used_response()
 
-        # Getting the count of customers under these referrers to update is_level_four_completed of referrer
-        fourth_leg_count = 0
-        for fourth_level_customer in z2hcustomer_under_referrer_fourth:
-            for third_level_customer in Z2HCustomers.objects.filter(referrer=fourth_level_customer).exclude(is_admin_user=True):
-                for customer in Z2HCustomers.objects.filter(referrer=third_level_customer).exclude(is_admin_user=True):
-                    fourth_leg_count += Z2HCustomers.objects.filter(referrer=customer).exclude(
-                        is_admin_user=True
-                    ).count()
-        
-        if fourth_leg_count == QUATERNARY_LEG_COUNT:
-            z2hcustomer_referrer_fourth.is_level_four_completed = True
-            z2hcustomer_referrer_fourth.level_four_completed_date = timezone.now()
-            z2hcustomer_referrer_fourth.plan_end_date = timezone.now()
-            z2hcustomer_referrer_fourth.save()
+        return Response(data=ingestion.response_data, status=ingestion.response_status, headers={'Idempotent-Replayed': 'true'})
 
-        
     def post(self, request, *args, **kwargs):
         data = {
             'status': 'success',
             'message': 'Data Saved Successfully!!!',
         }
 
+        # A retry of a payment that was already checked out gets the first response back, without a second order
+        ingestion = get_payment_ingestion(request)
+        if ingestion:
+            return self.get_replayed_response(request, ingestion)
+
         request_data = request.data
         request_data_keys = request_data.keys()
         request_data_keys = list(request_data_keys)
@@ -620,36 +561,53 @@ class PostPaymentView(APIView):
             data['status'] = 'error'
             data['message'] = 'Payment Failed!!!'
             return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
+
+        if not get_payment_reference(request):
+            data['status'] = 'error'
+            data['message'] = 'Payment Reference Required!!!'
+            return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
         
-        product_exists = self.check_product_exists(request_data['product'])
+        product = self.get_product(request_data['product'])
 
-        if not product_exists:
+        if not product:
             data['status'] = 'error'
             data['message'] = 'Product Not Found!!!'
             return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
 
-        create_order = self.create_order(request, request_data)
-        create_order.save()
+        register_user = RegisterUser.objects.select_related('referred_by').filter(user=request.user).first()
 
-        create_order_details = self.create_order_details(request, request_data, create_order)
-        create_order_details.save()
+        # Numbers come from in-process blocks that a rollback cannot return, so they are taken outside the
+        # transaction; a failed checkout only leaves a gap in the sequences
+        order_number = get_next_number(ORDER_NUMBER)
+        order_item_number = get_next_number(ORDER_ITEM_NUMBER)
+        customer_number = get_next_number(CUSTOMER_NUMBER)
 
-        update_order_details = self.update_order_details(request, create_order)
+        order_items = [self.build_order_item(product, order_item_number)]
 
-        if update_order_details:
-            self.update_customer_details(request, create_order)
-            self.update_referrer_level(request)
-        
-        user_customer = Z2HCustomers.objects.filter(user=request.user, is_level_four_completed=False).first()
-        data["customer_uid"] = str(user_customer.customer_number)
+        # The customer, its referral tree paths, the order and the referrers' level completions commit together or not at all
+        with transaction.atomic():
+            ingestion = claim_payment_ingestion(request)
+
+            if ingestion:
+                customer = self.create_customer(request, register_user, customer_number)
+                order = self.create_order(request, request_data, order_number, customer, order_items)
+                self.update_referrer_level(request, customer)
+
+                data["customer_uid"] = str(customer.customer_number)
+                complete_payment_ingestion(ingestion, order, status.HTTP_200_OK, data)
+
+        if not ingestion:
+            # A concurrent request with the same key or payment reference checked out first
+            return self.get_replayed_response(request, get_payment_ingestion(request))
 
         return Response(data=data, status=status.HTTP_200_OK)
     
 class Z2HWebPagesView(ListAPIView):
     queryset = Z2HWebPages.objects.all()
     serializer_class = Z2HWebPageSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated, WebPagePermission]
+    authentication_classes = [CachedTokenAuthentication]
+    web_page = 'settings'
 
     def get(self, request, *args, **kwargs):
         role = Role.objects.filter(login_mode='web')
@@ -661,176 +619,12 @@ class Z2HWebPagesView(ListAPIView):
         return Response(data, status=status.HTTP_200_OK)
     
 class SaveWebUserSettingsView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
-
-    def update_web_page_user(self, request_data, system_role_uid, users_page_uid):
-        web_page_role = None
-
-        if request_data['users'] == True:
-            user_web_page_exists = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=users_page_uid
-            ).first()
-            if not user_web_page_exists:
-                web_page_role = Z2HWebPageRoles.objects.create(
-                    role_uid=system_role_uid,
-                    web_page_uid=users_page_uid
-                )
-            if user_web_page_exists:
-                user_web_page_exists.is_active = True
-                user_web_page_exists.save()
-
-        elif request_data['users'] == False:
-            web_page_role = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=users_page_uid
-            ).first()
-            if web_page_role:
-                web_page_role.is_active = False
-
-        if web_page_role:
-            web_page_role.save()
-    
-    def update_web_page_products(self, request_data, system_role_uid, products_page_uid):
-        web_page_role = None
-
-        if request_data['products'] == True:
-            products_web_page_exists = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=products_page_uid
-            ).first()
-            if not products_web_page_exists:
-                web_page_role = Z2HWebPageRoles.objects.create(
-                    role_uid=system_role_uid,
-                    web_page_uid=products_page_uid
-                )
-            if products_web_page_exists:
-                products_web_page_exists.is_active = True
-                products_web_page_exists.save()
-
-        elif request_data['products'] == False:
-            web_page_role = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=products_page_uid
-            ).first()
-            if web_page_role:
-                web_page_role.is_active = False
-
-        if web_page_role:
-            web_page_role.save()
-    
-    def update_web_page_orders(self, request_data, system_role_uid, orders_page_uid):
-        web_page_role = None
-
-        if request_data['orders'] == True:
-            orders_web_page_exists = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=orders_page_uid
-            ).first()
-            if not orders_web_page_exists:
-                web_page_role = Z2HWebPageRoles.objects.create(
-                    role_uid=system_role_uid,
-                    web_page_uid=orders_page_uid
-                )
-            if orders_web_page_exists:
-                orders_web_page_exists.is_active = True
-                orders_web_page_exists.save()
-
-        elif request_data['orders'] == False:
-            web_page_role = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=orders_page_uid
-            ).first()
-            if web_page_role:
-                web_page_role.is_active = False
-
-        if web_page_role:
-            web_page_role.save()
-    
-    def update_web_page_customer(self, request_data, system_role_uid, customers_page_uid):
-        web_page_role = None
-
-        if request_data['customers'] == True:
-            customers_web_page_exists = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=customers_page_uid
-            ).first()
-            if not customers_web_page_exists:
-                web_page_role = Z2HWebPageRoles.objects.create(
-                    role_uid=system_role_uid,
-                    web_page_uid=customers_page_uid
-                )
-            if customers_web_page_exists:
-                customers_web_page_exists.is_active = True
-                customers_web_page_exists.save()
-
-        elif request_data['customers'] == False:
-            web_page_role = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=customers_page_uid
-            ).first()
-            if web_page_role:
-                web_page_role.is_active = False
-
-        if web_page_role:
-            web_page_role.save()
-    
-    def update_web_page_reports(self, request_data, system_role_uid, reports_page_uid):
-        web_page_role = None
-
-        if request_data['reports'] == True:
-            reports_web_page_exists = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=reports_page_uid
-            ).first()
-            if not reports_web_page_exists:
-                web_page_role = Z2HWebPageRoles.objects.create(
-                    role_uid=system_role_uid,
-                    web_page_uid=reports_page_uid
-                )
-            if reports_web_page_exists:
-                reports_web_page_exists.is_active = True
-                reports_web_page_exists.save()
-
-        elif request_data['reports'] == False:
-            web_page_role = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=reports_page_uid
-            ).first()
-            if web_page_role:
-                web_page_role.is_active = False
-
-        if web_page_role:
-            web_page_role.save()
-    
-    def update_web_page_settings(self, request_data, system_role_uid, settings_page_uid):
-        web_page_role = None
-
-        if request_data['settings'] == True:
-            settings_web_page_exists = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=settings_page_uid
-            ).first()
-            if not settings_web_page_exists:
-                web_page_role = Z2HWebPageRoles.objects.create(
-                    role_uid=system_role_uid,
-                    web_page_uid=settings_page_uid
-                )
-            if settings_web_page_exists:
-                settings_web_page_exists.is_active = True
-                settings_web_page_exists.save()
-
-        elif request_data['settings'] == False:
-            web_page_role = Z2HWebPageRoles.objects.filter(
-                role_uid=system_role_uid,
-                web_page_uid=settings_page_uid
-            ).first()
-            if web_page_role:
-                web_page_role.is_active = False
-
-        if web_page_role:
-            web_page_role.save()
+    permission_classes = [permissions.IsAuthenticated, WebPagePermission]
+    authentication_classes = [CachedTokenAuthentication]
+    web_page = 'settings'
+
+    # Request keys, each naming the web page it switches on or off for the role
+    web_page_names = ('users', 'products', 'orders', 'customers', 'reports', 'settings')
 
     def post(self, request, *args, **kwargs):
         data = {
@@ -841,33 +635,37 @@ class SaveWebUserSettingsView(APIView):
         request_data = request.data
 
         system_role_uid = request_data['systemRoleUid']
-        users_page = Z2HWebPages.objects.filter(name='users').first()
-        products_page = Z2HWebPages.objects.filter(name='products').first()
-        orders_page = Z2HWebPages.objects.filter(name='orders').first()
-        customers_page = Z2HWebPages.objects.filter(name='customers').first()
-        reports_page = Z2HWebPages.objects.filter(name='reports').first()
-        settings_page = Z2HWebPages.objects.filter(name='settings').first()
-
-        self.update_web_page_user(request_data, system_role_uid, users_page.uid)
-        self.update_web_page_products(request_data, system_role_uid, products_page.uid)
-        self.update_web_page_orders(request_data, system_role_uid, orders_page.uid)
-        self.update_web_page_customer(request_data, system_role_uid, customers_page.uid)
-        self.update_web_page_reports(request_data, system_role_uid, reports_page.uid)
-        self.update_web_page_settings(request_data, system_role_uid, settings_page.uid)
+        web_page_uids = {name: uid for uid, name in get_web_page_names().items()}
+
+        web_page_roles = [
+            Z2HWebPageRoles(role_uid=system_role_uid, web_page_uid=web_page_uids[name], is_active=request_data[name])
+            for name in self.web_page_names
+            if request_data.get(name) in (True, False) and name in web_page_uids
+        ]
+
+        # One statement for the whole row of the matrix; pages switched off keep their row, inactive
+        Z2HWebPageRoles.objects.bulk_create(
+            web_page_roles,
+            update_conflicts=True,
+            unique_fields=['role_uid', 'web_page_uid'],
+            update_fields=['is_active', 'modified'],
+        )
+        invalidate_role_web_pages(system_role_uid)
 
         return Response(data=data, status=status.HTTP_200_OK)
     
 class Z2HWebPageRolesView(ListAPIView):
     queryset = Z2HWebPageRoles.objects.all()
     serializer_class = Z2HWebPageRolesSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated, WebPagePermission]
+    authentication_classes = [CachedTokenAuthentication]
+    web_page = 'settings'
 
 class Z2HProductsReturedViewset(ModelViewSet):
     queryset = Z2HProductsReturned.objects.all()
     serializer_class = Z2HProductsReturedSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
 def z2h_get_orders_template(request, from_date, to_date, order_status):
     orders = Z2HOrders.objects.filter(
@@ -879,47 +677,33 @@ def z2h_get_orders_template(request, from_date, to_date, order_status):
             order_date__range=[from_date, to_date]
         )
 
-    orders_data = Z2HOrderSerializer(orders, many=True).data
+    orders = orders.values_list(
+        'order_number', 'order_date', 'ordered_by__name', 'ordered_by__user__mobile_number', 'order_total_amount',
+        'delivery_details', 'ordered_by__user__address',
+    ).order_by('id')
 
     file_headers = [
         'ORDER ID', 'ORDER DATE', 'CUSTOMER NAME', 'MOBILE NO.', 'ORDER TOTAL AMOUNT', 'DELIVERY ADDRESS', 'COURIER NAME', 'COURIER DATE [dd-mm-yyyy]', 
         'COURIER TRACKING NO.'
     ]
 
-    csv_data = io.StringIO()
-    csv_writer = csv.writer(csv_data)
-
-    csv_writer.writerow(file_headers)
-
-    for order in orders_data:
-        delivery_address = order.get("delivery_address", None) or order.get("customer_address")
-
-        data = [
-            order["order_number"], 
-            order["order_date"], 
-            order["customer_name"], 
-            order["mobile_number"], 
-            order["order_total_amount"],
-            delivery_address, 
-            '', 
-            '', 
-            '',
-        ]
-
-        csv_writer.writerow(data)
-
-    file_path = '/tmp/orders_download.csv'
-
-    # Save the CSV data to a temporary file
-    with open(file_path, 'w') as file:
-        file.write(csv_data.getvalue())
-
-    csv_file = open(file_path, 'rb')
-    csv_data = csv_file.read().decode('utf-8')
-    csv_file.close()
-
-    os.remove(file_path)
-
-    return FileResponse(csv_data, content_type='text/csv', filename='yet_to_be_couriered_orders.csv')
-
-    
\ No newline at end of file
+    def get_order_rows():
+        # Rows are fetched from a server-side cursor in chunks, so memory stays flat for large exports
+        for (
+            order_number, order_date, customer_name, mobile_number, order_total_amount, delivery_details, customer_address
+        ) in orders.iterator(chunk_size=2000):
+            delivery_address = (delivery_details or {}).get("delivery_address", None) or customer_address
+
+            yield [
+                order_number, 
+                order_date.strftime("%d-%m-%Y") if order_date else None, 
+                customer_name, 
+                mobile_number, 
+                order_total_amount,
+                delivery_address, 
+                '', 
+                '', 
+                '',
+            ]
+
+    return stream_csv_response('yet_to_be_couriered_orders.csv', file_headers, get_order_rows())
@@ -4,7 +4,11 @@ from apps.user.models import (
     Role,
     Z2HCustomers,
     RegisterUser,
-    Z2HUserRoles
+    Z2HUserRoles,
+    Z2HReferralTree,
+    Z2HDashboardSnapshot,
+    Z2HCommissions,
+    Z2HNotifications,
 )
 
 User = get_user_model()
@@ -30,9 +34,27 @@ class RegisterUserAdmin(admin.ModelAdmin):
 class Z2HUserRolesAdmin(admin.ModelAdmin):
     list_display = ('uid', 'user_uid', 'role_uid')
 
+class Z2HReferralTreeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'ancestor', 'descendant', 'depth')
+
+
+class Z2HCommissionsAdmin(admin.ModelAdmin):
+    list_display = ['uid', 'customer', 'level', 'commission_amount', 'tds_amount', 'amount_payable', 'status', 'completed_date', 'paid_date', 'is_active']
+    list_filter = ['level', 'status']
+
+class Z2HNotificationsAdmin(admin.ModelAdmin):
+    list_display = ['uid', 'user', 'notification_type', 'level', 'is_read', 'created', 'read_date']
+    list_filter = ['notification_type', 'is_read']
+
+class Z2HDashboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['uid', 'created', 'is_active']
 
 admin.site.register(User, UserAdmin)
 admin.site.register(Role, RoleAdmin)
 admin.site.register(Z2HCustomers, Z2HCustomersAdmin)
 admin.site.register(RegisterUser, RegisterUserAdmin)
-admin.site.register(Z2HUserRoles, Z2HUserRolesAdmin)
\ No newline at end of file
+admin.site.register(Z2HUserRoles, Z2HUserRolesAdmin)
+admin.site.register(Z2HReferralTree, Z2HReferralTreeAdmin)
+admin.site.register(Z2HDashboardSnapshot, Z2HDashboardSnapshotAdmin)
+admin.site.register(Z2HCommissions, Z2HCommissionsAdmin)
+admin.site.register(Z2HNotifications, Z2HNotificationsAdmin)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from apps.user.models import Z2HUser
+
+# Token -> credentials in process (least recently used first, at most AUTH_TOKEN_LOCAL_CACHE_SIZE entries), backed by
+# the shared cache. Revocation clears the shared entry and this process's entry; other processes drop theirs within
+# AUTH_TOKEN_LOCAL_CACHE_TIMEOUT.
+_local_tokens = OrderedDict()
+_local_tokens_lock = threading.Lock()
+_counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'revocations': 0, 'evictions': 0}
+
+# Only what authentication, the permission classes and the user info views read is cached, never the password hash;
+# any other field is loaded from the database the first time a view reads it
+CACHED_USER_FIELDS = ('id', 'uid', 'email', 'name', 'is_active', 'is_staff', 'is_superuser', 'is_first_login')
+
+def get_token_cache_key(key):
+    return f"auth_token:{key}"
+
+def _count(name, amount=1):
+    with _local_tokens_lock:
+        _counters[name] += amount
+
+def get_auth_cache_stats():
+    """Return this process's token cache counters."""
+    with _local_tokens_lock:
+        stats = dict(_counters)
+        stats['local_entries'] = len(_local_tokens)
+
+    lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+    stats['hit_ratio'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else None
+
+    return stats
+
+def revoke_tokens(*keys):
+    """Drop cached resolutions for the given token keys."""
+    if not keys:
+        return
+
+    cache.delete_many([get_token_cache_key(key) for key in keys])
+
+    with _local_tokens_lock:
+        for key in keys:
+            _local_tokens.pop(key, None)
+        _counters['revocations'] += len(keys)
+
+def revoke_user_tokens(user_id):
+    revoke_tokens(*Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+def load_credentials(key):
+    """The token's creation time and its user's CACHED_USER_FIELDS, as plain values."""
+    credentials = Token.objects.filter(key=key).values(
+        'created', 'user_id', *[f"user__{field}" for field in CACHED_USER_FIELDS if field != 'id']
+    ).first()
+
+    if credentials is None:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    return credentials
+
+def _from_values(model, values):
+    """An instance of model with only the given attnames loaded; from_db wants them in concrete field order."""
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+
+    return model.from_db(None, field_names, [values[field_name] for field_name in field_names])
+
+def build_user_and_token(key, credentials):
+    """A user with only CACHED_USER_FIELDS loaded and its token, both fresh instances for this request."""
+    user = _from_values(Z2HUser, {
+        field: credentials['user_id'] if field == 'id' else credentials[f"user__{field}"] for field in CACHED_USER_FIELDS
+    })
+    token = _from_values(Token, {'key': key, 'user_id': credentials['user_id'], 'created': credentials['created']})
+    token.user = user
+
+    return user, token
+
+def _set_local_credentials(key, expires, credentials):
+    with _local_tokens_lock:
+        _local_tokens[key] = (expires, credentials)
+        _local_tokens.move_to_end(key)
+
+        while len(_local_tokens) > settings.AUTH_TOKEN_LOCAL_CACHE_SIZE:
+            _local_tokens.popitem(last=False)
+            _counters['evictions'] += 1
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that resolves a token without a database query while it is cached."""
+
+    def get_cached_credentials(self, key):
+        now = time.monotonic()
+
+        with _local_tokens_lock:
+            entry = _local_tokens.get(key)
+            if entry and entry[0] <= now:
+                del _local_tokens[key]
+                entry = None
+            elif entry:
+                _local_tokens.move_to_end(key)
+
+        if entry:
+            _count('local_hits')
+            return entry[1]
+
+        credentials = cache.get(get_token_cache_key(key))
+        if credentials is not None:
+            _count('shared_hits')
+        else:
+            _count('misses')
+            credentials = load_credentials(key)
+            cache.set(get_token_cache_key(key), credentials, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+        _set_local_credentials(key, now + settings.AUTH_TOKEN_LOCAL_CACHE_TIMEOUT, credentials)
+
+        return credentials
+
+    def authenticate_credentials(self, key):
+        user, token = build_user_and_token(key, self.get_cached_credentials(key))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (user, token)
+
+# Logout deletes the token and deactivation saves the user; both must take effect before the TTL runs out.
+
+@receiver(post_delete, sender=Token)
+def revoke_deleted_token(sender, instance, **kwargs):
+    revoke_tokens(instance.key)
+
+@receiver(post_save, sender=Z2HUser)
+def revoke_saved_user_tokens(sender, instance, created, **kwargs):
+    if not created:
+        revoke_user_tokens(instance.id)
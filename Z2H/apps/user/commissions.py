@@ -0,0 +1,97 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from apps.user.models import Z2HCommissions, Z2HCustomers, REFERRAL_LEVEL_NAMES
+from apps.utils.cache import get_plan
+
+TDS_PERCENTAGE = Decimal('10')
+# Level names as sent by the admin commission screens
+COMMISSION_LEVEL_NUMBERS = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4}
+COMMISSION_LEVEL_NAMES = {level: name for name, level in COMMISSION_LEVEL_NUMBERS.items()}
+# Ledger statuses behind each commission status filter; a payment issue is still yet to be paid
+COMMISSION_STATUS_FILTERS = {
+    'Yet to be paid': ['unpaid', 'payment_issue'],
+    'Paid': ['paid'],
+    'Issue with payments': ['payment_issue'],
+}
+COMMISSION_STATUS_NAMES = {'unpaid': 'Yet to be paid', 'paid': 'Paid', 'payment_issue': 'Payment Issue'}
+CENT = Decimal('0.01')
+
+def round_amount(amount):
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def get_level_commission_amount(plan, level):
+    """Gross commission of a plan level: the flat value, or a percentage of the registration fee."""
+    level_name = REFERRAL_LEVEL_NAMES[level]
+
+    flat_value = getattr(plan, f"level_{level_name}_flat_value")
+    percentage_value = getattr(plan, f"level_{level_name}_percentage_value")
+
+    # Levels are flat by default, so an explicit percentage setting takes precedence
+    if getattr(plan, f"is_level_{level_name}_percentage") and percentage_value is not None and plan.registration_fee is not None:
+        amount = plan.registration_fee * percentage_value / 100
+    elif getattr(plan, f"is_level_{level_name}_flat") and flat_value is not None:
+        amount = flat_value
+    else:
+        amount = getattr(plan, f"level_{level_name}_amount") or Decimal('0')
+
+    return round_amount(Decimal(amount))
+
+def get_commission_amounts(plan, level):
+    """Return (gross, tds, payable) for a plan level."""
+    commission_amount = get_level_commission_amount(plan, level)
+    tds_amount = round_amount(commission_amount * TDS_PERCENTAGE / 100)
+
+    return commission_amount, tds_amount, commission_amount - tds_amount
+
+def get_customer_commission_status(customer, level):
+    level_name = REFERRAL_LEVEL_NAMES[level]
+
+    if getattr(customer, f"is_level_{level_name}_payment_issue"):
+        return 'payment_issue'
+
+    if getattr(customer, f"is_level_{level_name}_commission_paid"):
+        return 'paid'
+
+    return 'unpaid'
+
+def build_commission(customer, level):
+    """Ledger row for a completed level, carrying over the payment state kept on the customer."""
+    level_name = REFERRAL_LEVEL_NAMES[level]
+    commission_amount, tds_amount, amount_payable = get_commission_amounts(get_plan(customer.active_plan_uid), level)
+
+    return Z2HCommissions(
+        customer=customer,
+        level=level,
+        commission_amount=commission_amount,
+        tds_amount=tds_amount,
+        amount_payable=amount_payable,
+        status=get_customer_commission_status(customer, level),
+        completed_date=getattr(customer, f"level_{level_name}_completed_date"),
+        paid_date=getattr(customer, f"level_{level_name}_commission_paid_date"),
+        comments=dict(getattr(customer, f"level_{level_name}_commission_details")).get('comments', None),
+    )
+
+def record_completed_levels(customer_levels):
+    """Create ledger rows for (customer, level) pairs that were just completed, in one INSERT."""
+    commissions = [
+        build_commission(customer, level) for customer, level in customer_levels if not customer.is_admin_user
+    ]
+
+    return Z2HCommissions.objects.bulk_create(commissions, ignore_conflicts=True)
+
+def update_commission_payment(customer, level, paid_date, comments):
+    """Copy a customer's payment state for a level onto its ledger row."""
+    return Z2HCommissions.objects.filter(customer=customer, level=level).update(
+        status=get_customer_commission_status(customer, level),
+        paid_date=paid_date,
+        comments=comments,
+    )
+
+def build_all_commissions(batch_size=1000):
+    """Yield ledger rows for every completed level of every non-admin customer."""
+    customers = Z2HCustomers.objects.filter(is_admin_user=False).order_by('id')
+
+    for customer in customers.iterator(chunk_size=batch_size):
+        for level, level_name in REFERRAL_LEVEL_NAMES.items():
+            if getattr(customer, f"is_level_{level_name}_completed") and getattr(customer, f"level_{level_name}_completed_date"):
+                yield build_commission(customer, level)
@@ -0,0 +1,46 @@
+from django.db.models import Count, Exists, OuterRef, Q
+from apps.app.models import Z2HOrders
+from apps.user.models import Z2HCustomers, RegisterUser, Z2HDashboardSnapshot
+
+def build_dashboard_report():
+    """Compute the admin dashboard counts with one aggregate query per table."""
+    order_counts = Z2HOrders.objects.aggregate(
+        yet_to_be_couriered_orders_count=Count('id', filter=Q(order_status="yet_to_be_couriered")),
+        in_transit_orders_count=Count('id', filter=Q(order_status="in_transit")),
+        delivered_orders_count=Count('id', filter=Q(order_status="delivered")),
+        cancelled_orders_count=Count('id', filter=Q(order_status="cancelled")),
+    )
+
+    register_user_count = RegisterUser.objects.filter(
+        ~Exists(Z2HCustomers.objects.filter(user_id=OuterRef('user_id'))),
+        is_active=True,
+        is_admin_user=False,
+    ).count()
+
+    commission_counts = Z2HCustomers.objects.exclude(is_admin_user=True).aggregate(
+        customers_level_one_commission_not_got_paid_count=Count(
+            'id', filter=Q(is_level_one_completed=True) & Q(is_level_one_commission_paid=False)
+        ),
+        customer_level_two_commission_not_got_paid_count=Count(
+            'id', filter=Q(is_level_two_completed=True) & Q(is_level_two_commission_paid=False)
+        ),
+        customer_level_three_commission_not_got_paid_count=Count(
+            'id', filter=Q(is_level_three_completed=True) & Q(is_level_three_commission_paid=False)
+        ),
+        customer_level_four_commission_not_got_paid_count=Count(
+            'id', filter=Q(is_level_four_completed=True) & Q(is_level_four_commission_paid=False)
+        ),
+    )
+
+    return {
+        **order_counts,
+        "register_user_count": register_user_count,
+        **commission_counts,
+    }
+
+def refresh_dashboard_snapshot():
+    """Store a fresh dashboard snapshot and drop the older ones."""
+    snapshot = Z2HDashboardSnapshot.objects.create(data=build_dashboard_report())
+    Z2HDashboardSnapshot.objects.exclude(id=snapshot.id).delete()
+
+    return snapshot
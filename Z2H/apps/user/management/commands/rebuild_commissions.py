@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from apps.user.commissions import build_all_commissions
+from apps.user.models import Z2HCommissions
+
+class Command(BaseCommand):
+    help = "Create the missing commission ledger rows for every completed customer level."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recalculate',
+            action='store_true',
+            help="Also recompute the amounts of existing rows from the current plan settings.",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        existing = dict(
+            ((customer_id, level), commission_id)
+            for customer_id, level, commission_id in Z2HCommissions.objects.values_list('customer_id', 'level', 'id')
+        )
+
+        new_commissions = []
+        recalculated_commissions = []
+        for commission in build_all_commissions(batch_size=batch_size):
+            commission_id = existing.get((commission.customer_id, commission.level))
+
+            if commission_id is None:
+                new_commissions.append(commission)
+            elif options['recalculate']:
+                commission.id = commission_id
+                recalculated_commissions.append(commission)
+
+        Z2HCommissions.objects.bulk_create(new_commissions, batch_size=batch_size, ignore_conflicts=True)
+        Z2HCommissions.objects.bulk_update(
+            recalculated_commissions, ['commission_amount', 'tds_amount', 'amount_payable'], batch_size=batch_size
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(new_commissions)} and recalculated {len(recalculated_commissions)} commission rows."
+        ))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.user.models import Z2HCustomers, REFERRAL_LEVEL_NAMES, REFERRAL_TREE_MAX_DEPTH
+
+class Command(BaseCommand):
+    help = "Recompute the per-level downline counters of every customer from the referrer links."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only report customers whose stored counters are wrong, without saving.",
+        )
+
+    def get_expected_counts(self, customers):
+        expected_counts = {customer_id: [0] * REFERRAL_TREE_MAX_DEPTH for customer_id in customers}
+
+        for customer_id, (referrer_id, is_admin_user) in customers.items():
+            if is_admin_user:
+                continue
+
+            depth = 1
+            ancestor_id = referrer_id
+            while ancestor_id and depth <= REFERRAL_TREE_MAX_DEPTH:
+                expected_counts[ancestor_id][depth - 1] += 1
+                ancestor_id = customers[ancestor_id][0]
+                depth += 1
+
+        return expected_counts
+
+    def handle(self, *args, **options):
+        counter_fields = [f"level_{level}_downline_count" for level in REFERRAL_LEVEL_NAMES.values()]
+
+        customers = {
+            customer_id: (referrer_id, is_admin_user)
+            for customer_id, referrer_id, is_admin_user in Z2HCustomers.objects.values_list('id', 'referrer_id', 'is_admin_user')
+        }
+        expected_counts = self.get_expected_counts(customers)
+
+        mismatched_customers = []
+        for customer in Z2HCustomers.objects.only('id', 'customer_number', *counter_fields).iterator(chunk_size=2000):
+            stored_counts = [getattr(customer, field) for field in counter_fields]
+            if stored_counts == expected_counts[customer.id]:
+                continue
+
+            self.stdout.write(
+                f"{customer.customer_number}: stored {stored_counts}, expected {expected_counts[customer.id]}"
+            )
+            for field, count in zip(counter_fields, expected_counts[customer.id]):
+                setattr(customer, field, count)
+            mismatched_customers.append(customer)
+
+        if options['verify']:
+            if mismatched_customers:
+                raise CommandError(f"{len(mismatched_customers)} customers have wrong downline counters.")
+
+            self.stdout.write(self.style.SUCCESS("All downline counters are correct."))
+            return
+
+        Z2HCustomers.objects.bulk_update(mismatched_customers, counter_fields, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt downline counters for {len(mismatched_customers)} customers."))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from apps.user.dashboard import refresh_dashboard_snapshot
+
+class Command(BaseCommand):
+    help = "Recompute the admin dashboard counts and store them as the current snapshot. Meant to be run periodically (cron)."
+
+    def handle(self, *args, **options):
+        snapshot = refresh_dashboard_snapshot()
+        self.stdout.write(self.style.SUCCESS(f"Dashboard snapshot refreshed at {snapshot.created}: {snapshot.data}"))
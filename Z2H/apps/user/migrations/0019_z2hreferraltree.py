@@ -0,0 +1,56 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def build_referral_tree(apps, schema_editor):
+    Z2HCustomers = apps.get_model('user', 'Z2HCustomers')
+    Z2HReferralTree = apps.get_model('user', 'Z2HReferralTree')
+
+    referrers = dict(Z2HCustomers.objects.values_list('id', 'referrer_id'))
+
+    tree_paths = []
+    for customer_id in referrers:
+        tree_paths.append(Z2HReferralTree(ancestor_id=customer_id, descendant_id=customer_id, depth=0))
+
+        ancestor_id = referrers.get(customer_id)
+        depth = 1
+        while ancestor_id and depth <= 4 and ancestor_id != customer_id:
+            tree_paths.append(Z2HReferralTree(ancestor_id=ancestor_id, descendant_id=customer_id, depth=depth))
+            ancestor_id = referrers.get(ancestor_id)
+            depth += 1
+
+    Z2HReferralTree.objects.bulk_create(tree_paths, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0018_rename_is_referrer_got_notified_for_level_four_completion_z2hcustomers_is_user_got_notified_for_leve'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Z2HReferralTree',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_paths', to='user.z2hcustomers')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_paths', to='user.z2hcustomers')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ancestor', 'depth'], name='referral_tree_ancestor_depth'), models.Index(fields=['descendant', 'depth'], name='referral_tree_descendant_depth')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='z2hreferraltree',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_referral_tree_path'),
+        ),
+        migrations.RunPython(build_referral_tree, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:32
+
+from django.db import migrations, models
+from django.db.models import Count
+
+LEVEL_NAMES = {1: 'one', 2: 'two', 3: 'three', 4: 'four'}
+
+
+def populate_downline_counts(apps, schema_editor):
+    Z2HCustomers = apps.get_model('user', 'Z2HCustomers')
+    Z2HReferralTree = apps.get_model('user', 'Z2HReferralTree')
+
+    downline_counts = Z2HReferralTree.objects.filter(
+        depth__gte=1, depth__lte=4,
+    ).exclude(
+        descendant__is_admin_user=True
+    ).values('ancestor_id', 'depth').annotate(downline_count=Count('id'))
+
+    customers = {}
+    for row in downline_counts:
+        customer = customers.setdefault(row['ancestor_id'], Z2HCustomers(id=row['ancestor_id']))
+        setattr(customer, f"level_{LEVEL_NAMES[row['depth']]}_downline_count", row['downline_count'])
+
+    Z2HCustomers.objects.bulk_update(
+        customers.values(),
+        [f"level_{level}_downline_count" for level in LEVEL_NAMES.values()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0019_z2hreferraltree'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='z2hcustomers',
+            name='level_four_downline_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='z2hcustomers',
+            name='level_one_downline_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='z2hcustomers',
+            name='level_three_downline_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='z2hcustomers',
+            name='level_two_downline_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_downline_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+
+LEVEL_NAMES = {1: 'one', 2: 'two', 3: 'three', 4: 'four'}
+CENT = Decimal('0.01')
+
+
+def get_level_commission_amount(plan, level_name):
+    flat_value = getattr(plan, f"level_{level_name}_flat_value")
+    percentage_value = getattr(plan, f"level_{level_name}_percentage_value")
+
+    if getattr(plan, f"is_level_{level_name}_percentage") and percentage_value is not None and plan.registration_fee is not None:
+        amount = plan.registration_fee * percentage_value / 100
+    elif getattr(plan, f"is_level_{level_name}_flat") and flat_value is not None:
+        amount = flat_value
+    else:
+        amount = getattr(plan, f"level_{level_name}_amount") or Decimal('0')
+
+    return Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def populate_commissions(apps, schema_editor):
+    Z2HCustomers = apps.get_model('user', 'Z2HCustomers')
+    Z2HCommissions = apps.get_model('user', 'Z2HCommissions')
+    Z2HPlanDetails = apps.get_model('app', 'Z2HPlanDetails')
+
+    plans = {str(plan.uid): plan for plan in Z2HPlanDetails.objects.all()}
+
+    commissions = []
+    for customer in Z2HCustomers.objects.filter(is_admin_user=False).iterator(chunk_size=1000):
+        plan = plans.get(customer.active_plan_uid)
+        if plan is None:
+            continue
+
+        for level, level_name in LEVEL_NAMES.items():
+            completed_date = getattr(customer, f"level_{level_name}_completed_date")
+            if not getattr(customer, f"is_level_{level_name}_completed") or not completed_date:
+                continue
+
+            if getattr(customer, f"is_level_{level_name}_payment_issue"):
+                commission_status = 'payment_issue'
+            elif getattr(customer, f"is_level_{level_name}_commission_paid"):
+                commission_status = 'paid'
+            else:
+                commission_status = 'unpaid'
+
+            commission_amount = get_level_commission_amount(plan, level_name)
+            tds_amount = (commission_amount * 10 / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+
+            commissions.append(Z2HCommissions(
+                customer_id=customer.id,
+                level=level,
+                commission_amount=commission_amount,
+                tds_amount=tds_amount,
+                amount_payable=commission_amount - tds_amount,
+                status=commission_status,
+                completed_date=completed_date,
+                paid_date=getattr(customer, f"level_{level_name}_commission_paid_date"),
+                comments=dict(getattr(customer, f"level_{level_name}_commission_details")).get('comments', None),
+            ))
+
+    Z2HCommissions.objects.bulk_create(commissions, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_z2hproductsreturned'),
+        ('user', '0021_z2hdashboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Z2HCommissions',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('level', models.PositiveSmallIntegerField()),
+                ('commission_amount', models.DecimalField(decimal_places=2, default=0, max_digits=13)),
+                ('tds_amount', models.DecimalField(decimal_places=2, default=0, max_digits=13)),
+                ('amount_payable', models.DecimalField(decimal_places=2, default=0, max_digits=13)),
+                ('status', models.CharField(choices=[('unpaid', 'unpaid'), ('paid', 'paid'), ('payment_issue', 'payment_issue')], default='unpaid', max_length=64)),
+                ('completed_date', models.DateTimeField()),
+                ('paid_date', models.DateTimeField(blank=True, null=True)),
+                ('comments', models.TextField(blank=True, null=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commissions', to='user.z2hcustomers')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='z2hcommissions',
+            constraint=models.UniqueConstraint(fields=('customer', 'level'), name='unique_customer_commission_level'),
+        ),
+        migrations.RunPython(populate_commissions, migrations.RunPython.noop),
+    ]
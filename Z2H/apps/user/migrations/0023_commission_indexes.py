@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0022_z2hcommissions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='z2hcommissions',
+            index=models.Index(fields=['level', 'status', 'completed_date'], name='commission_level_status_date'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hcommissions',
+            index=models.Index(fields=['status', 'completed_date'], name='commission_status_date'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hcommissions',
+            index=models.Index(fields=['completed_date'], name='commission_completed_date'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0023_commission_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registeruser',
+            index=models.Index(fields=['email_address', 'mobile_number'], name='register_user_email_mobile'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hcustomers',
+            index=models.Index(fields=['customer_number'], name='customer_customer_number'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hcustomers',
+            index=models.Index(fields=['referrer', 'is_admin_user'], name='customer_referrer_admin'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hcustomers',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='customer_active'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hcustomers',
+            index=models.Index(condition=models.Q(('is_level_one_commission_paid', False), ('is_level_one_completed', True)), fields=['level_one_completed_date'], name='customer_level_one_unpaid'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hcustomers',
+            index=models.Index(condition=models.Q(('is_level_two_commission_paid', False), ('is_level_two_completed', True)), fields=['level_two_completed_date'], name='customer_level_two_unpaid'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hcustomers',
+            index=models.Index(condition=models.Q(('is_level_three_commission_paid', False), ('is_level_three_completed', True)), fields=['level_three_completed_date'], name='customer_level_three_unpaid'),
+        ),
+        migrations.AddIndex(
+            model_name='z2hcustomers',
+            index=models.Index(condition=models.Q(('is_level_four_commission_paid', False), ('is_level_four_completed', True)), fields=['level_four_completed_date'], name='customer_level_four_unpaid'),
+        ),
+        migrations.AddIndex(
+            model_name='z2huserroles',
+            index=models.Index(fields=['user_uid'], name='user_roles_user_uid'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+LEVEL_NAMES = {1: 'one', 2: 'two', 3: 'three', 4: 'four'}
+
+
+def populate_notifications(apps, schema_editor):
+    # Queue an unread notification for everything the boolean columns still mark as not notified
+    Z2HCustomers = apps.get_model('user', 'Z2HCustomers')
+    RegisterUser = apps.get_model('user', 'RegisterUser')
+    Z2HNotifications = apps.get_model('user', 'Z2HNotifications')
+
+    customer_user_ids = set(Z2HCustomers.objects.values_list('user_id', flat=True))
+    register_users = {register_user.user_id: register_user for register_user in RegisterUser.objects.exclude(user=None)}
+
+    notifications = []
+    for register_user in RegisterUser.objects.filter(
+        is_referrer_got_notified_for_joining=False, referred_by__isnull=False,
+    ).select_related('referred_by').iterator(chunk_size=1000):
+        if register_user.user_id in customer_user_ids:
+            continue
+
+        notifications.append(Z2HNotifications(
+            user_id=register_user.referred_by.user_id,
+            notification_type='user_registration',
+            data={
+                "name": register_user.name,
+                "mobile_number": register_user.mobile_number,
+                "register_uid": str(register_user.uid),
+            },
+        ))
+
+    for customer in Z2HCustomers.objects.select_related('referrer').iterator(chunk_size=1000):
+        register_user = register_users.get(customer.user_id)
+        if customer.referrer_id and register_user and not customer.is_referrer_got_notified_for_joined_level_one:
+            notifications.append(Z2HNotifications(
+                user_id=customer.referrer.user_id,
+                notification_type='product_purchase',
+                data={
+                    "name": register_user.name,
+                    "mobile_number": register_user.mobile_number,
+                    "customer_number": customer.customer_number,
+                    "customer_uid": str(customer.uid),
+                },
+            ))
+
+        for level_name in LEVEL_NAMES.values():
+            customer_data = {"customer_number": customer.customer_number, "customer_uid": str(customer.uid)}
+
+            if getattr(customer, f"is_level_{level_name}_completed") \
+                and not getattr(customer, f"is_user_got_notified_for_level_{level_name}_completion"):
+                notifications.append(Z2HNotifications(
+                    user_id=customer.user_id, notification_type='level_completion', level=level_name, data=customer_data,
+                ))
+
+            if getattr(customer, f"is_level_{level_name}_commission_paid") \
+                and not getattr(customer, f"is_user_got_notified_for_level_{level_name}_commission_paid"):
+                notifications.append(Z2HNotifications(
+                    user_id=customer.user_id, notification_type='commission_payment', level=level_name, data=customer_data,
+                ))
+
+    Z2HNotifications.objects.bulk_create(notifications, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0024_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Z2HNotifications',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('notification_type', models.CharField(choices=[('user_registration', 'user_registration'), ('product_purchase', 'product_purchase'), ('level_completion', 'level_completion'), ('commission_payment', 'commission_payment')], max_length=64)),
+                ('level', models.CharField(blank=True, max_length=16, null=True)),
+                ('data', models.JSONField(default=dict)),
+                ('is_read', models.BooleanField(default=False)),
+                ('read_date', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('is_read', False)), fields=['user', 'id'], name='notification_user_unread')],
+            },
+        ),
+        migrations.RunPython(populate_notifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0025_z2hnotifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registeruser',
+            name='profile_photo_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0026_profile_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registeruser',
+            index=models.Index(fields=['profile_photo_path'], name='register_user_profile_photo'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 01:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0027_image_url_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='z2hcustomers',
+            name='customer_active',
+        ),
+    ]
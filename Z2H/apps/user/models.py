@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Case, F, Q, When
 from django.contrib.auth.models import (
     AbstractBaseUser, 
     BaseUserManager, 
@@ -100,10 +101,140 @@ class Z2HCustomers(ZeroToHeroBaseModel):
     is_user_got_notified_for_level_two_commission_paid = models.BooleanField(default=False)
     is_user_got_notified_for_level_three_commission_paid = models.BooleanField(default=False)
     is_user_got_notified_for_level_four_commission_paid = models.BooleanField(default=False)
+    level_one_downline_count = models.PositiveIntegerField(default=0)
+    level_two_downline_count = models.PositiveIntegerField(default=0)
+    level_three_downline_count = models.PositiveIntegerField(default=0)
+    level_four_downline_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer_number'], name='customer_customer_number'),
+            models.Index(fields=['referrer', 'is_admin_user'], name='customer_referrer_admin'),
+            models.Index(
+                fields=['level_one_completed_date'],
+                condition=Q(is_level_one_completed=True, is_level_one_commission_paid=False),
+                name='customer_level_one_unpaid',
+            ),
+            models.Index(
+                fields=['level_two_completed_date'],
+                condition=Q(is_level_two_completed=True, is_level_two_commission_paid=False),
+                name='customer_level_two_unpaid',
+            ),
+            models.Index(
+                fields=['level_three_completed_date'],
+                condition=Q(is_level_three_completed=True, is_level_three_commission_paid=False),
+                name='customer_level_three_unpaid',
+            ),
+            models.Index(
+                fields=['level_four_completed_date'],
+                condition=Q(is_level_four_completed=True, is_level_four_commission_paid=False),
+                name='customer_level_four_unpaid',
+            ),
+        ]
 
     def __str__(self):
         return self.customer_number
 
+# Commissions are only paid for four levels, so paths deeper than that are not stored.
+REFERRAL_TREE_MAX_DEPTH = 4
+REFERRAL_LEVEL_NAMES = {1: 'one', 2: 'two', 3: 'three', 4: 'four'}
+
+class ReferralTreeManager(models.Manager):
+    """Manager for the referral tree closure table."""
+
+    def add_customer(self, customer):
+        """Link a newly created customer under all of its referrer's ancestors."""
+        tree_paths = [self.model(ancestor=customer, descendant=customer, depth=0)]
+        ancestor_ids = {}
+
+        if customer.referrer_id:
+            referrer_paths = self.filter(
+                descendant_id=customer.referrer_id,
+                depth__lt=REFERRAL_TREE_MAX_DEPTH,
+            ).values_list('ancestor_id', 'depth')
+
+            for ancestor_id, depth in referrer_paths:
+                tree_paths.append(self.model(ancestor_id=ancestor_id, descendant=customer, depth=depth + 1))
+                ancestor_ids[depth + 1] = ancestor_id
+
+        tree_paths = self.bulk_create(tree_paths)
+
+        if not customer.is_admin_user:
+            self.increment_downline_counts(ancestor_ids)
+
+        return tree_paths
+
+    def increment_downline_counts(self, ancestor_ids):
+        """Bump the per-level downline counters of up to four ancestors in one UPDATE."""
+        if not ancestor_ids:
+            return 0
+
+        counter_updates = {}
+        for depth, ancestor_id in ancestor_ids.items():
+            counter_field = f"level_{REFERRAL_LEVEL_NAMES[depth]}_downline_count"
+            counter_updates[counter_field] = Case(
+                When(id=ancestor_id, then=F(counter_field) + 1),
+                default=F(counter_field),
+                output_field=models.PositiveIntegerField(),
+            )
+
+        return Z2HCustomers.objects.filter(id__in=ancestor_ids.values()).update(**counter_updates)
+
+class Z2HReferralTree(ZeroToHeroBaseModel):
+    ancestor = models.ForeignKey(Z2HCustomers, on_delete=models.CASCADE, related_name="descendant_paths", null=False, blank=False)
+    descendant = models.ForeignKey(Z2HCustomers, on_delete=models.CASCADE, related_name="ancestor_paths", null=False, blank=False)
+    depth = models.PositiveSmallIntegerField(null=False, blank=False)
+
+    objects = ReferralTreeManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_referral_tree_path'),
+        ]
+        indexes = [
+            models.Index(fields=['ancestor', 'depth'], name='referral_tree_ancestor_depth'),
+            models.Index(fields=['descendant', 'depth'], name='referral_tree_descendant_depth'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} - {self.descendant_id} ({self.depth})"
+
+class Z2HCommissions(ZeroToHeroBaseModel):
+    STATUS_CHOICES = (
+        ('unpaid', 'unpaid'),
+        ('paid', 'paid'),
+        ('payment_issue', 'payment_issue'),
+    )
+
+    customer = models.ForeignKey(Z2HCustomers, on_delete=models.CASCADE, related_name="commissions", null=False, blank=False)
+    level = models.PositiveSmallIntegerField(null=False, blank=False)
+    commission_amount = models.DecimalField(max_digits=13, decimal_places=2, default=0)
+    tds_amount = models.DecimalField(max_digits=13, decimal_places=2, default=0)
+    amount_payable = models.DecimalField(max_digits=13, decimal_places=2, default=0)
+    status = models.CharField(max_length=64, choices=STATUS_CHOICES, default='unpaid')
+    completed_date = models.DateTimeField(null=False, blank=False)
+    paid_date = models.DateTimeField(null=True, blank=True)
+    comments = models.TextField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'level'], name='unique_customer_commission_level'),
+        ]
+        indexes = [
+            models.Index(fields=['level', 'status', 'completed_date'], name='commission_level_status_date'),
+            models.Index(fields=['status', 'completed_date'], name='commission_status_date'),
+            models.Index(fields=['completed_date'], name='commission_completed_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id} - {self.level}"
+
+class Z2HDashboardSnapshot(ZeroToHeroBaseModel):
+    data = models.JSONField(default=dict)
+
+    def __str__(self):
+        return str(self.created)
+
 class RegisterUser(ZeroToHeroBaseModel):
 
     MARITAL_CHOICES = (
@@ -140,11 +271,18 @@ class RegisterUser(ZeroToHeroBaseModel):
     bank_branch = models.CharField(max_length=128, null=False, blank=False)
     account_number = models.CharField(max_length=64, null=False, blank=False)
     profile_photo_path = models.CharField(max_length=256, null=True, blank=True)
+    profile_photo_variants = models.JSONField(default=dict, blank=True)
     email_address = models.CharField(max_length=256, null=False, blank=False)
     alternate_mobile_number = models.CharField(max_length=64, null=True, blank=True)
     is_admin_user = models.BooleanField(default=False)
     is_referrer_got_notified_for_joining = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['email_address', 'mobile_number'], name='register_user_email_mobile'),
+            models.Index(fields=['profile_photo_path'], name='register_user_profile_photo'),
+        ]
+
     def __str__(self):
         return self.name
     
@@ -152,5 +290,33 @@ class Z2HUserRoles(ZeroToHeroBaseModel):
     user_uid = models.CharField(max_length=64, null=False, blank=False)
     role_uid = models.CharField(max_length=64, null=False, blank=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_uid'], name='user_roles_user_uid'),
+        ]
+
+    def __str__(self):
+        return self.user_uid
+
+class Z2HNotifications(ZeroToHeroBaseModel):
+    TYPE_CHOICES = (
+        ('user_registration', 'user_registration'),
+        ('product_purchase', 'product_purchase'),
+        ('level_completion', 'level_completion'),
+        ('commission_payment', 'commission_payment'),
+    )
+
+    user = models.ForeignKey(Z2HUser, on_delete=models.CASCADE, related_name="notifications", null=False, blank=False)
+    notification_type = models.CharField(max_length=64, choices=TYPE_CHOICES, null=False, blank=False)
+    level = models.CharField(max_length=16, null=True, blank=True)
+    data = models.JSONField(default=dict)
+    is_read = models.BooleanField(default=False)
+    read_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='notification_user_unread', condition=models.Q(is_read=False)),
+        ]
+
     def __str__(self):
-        return self.user_uid
\ No newline at end of file
+        return f"{self.user_id} - {self.notification_type}"
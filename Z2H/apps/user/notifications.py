@@ -0,0 +1,191 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from apps.user.models import Z2HNotifications, Z2HCustomers, RegisterUser, REFERRAL_LEVEL_NAMES
+from apps.user.user_info import invalidate_user_info
+
+USER_REGISTRATION = 'user_registration'
+PRODUCT_PURCHASE = 'product_purchase'
+LEVEL_COMPLETION = 'level_completion'
+COMMISSION_PAYMENT = 'commission_payment'
+
+NOTIFICATION_PAGE_SIZE = 50
+NOTIFICATION_HEARTBEAT_INTERVAL = 15
+
+# Payloads are copied onto the row when it is written, so reading the outbox never joins back to the source tables.
+
+def build_user_registration_notification(register_user):
+    return Z2HNotifications(
+        user_id=register_user.referred_by.user_id,
+        notification_type=USER_REGISTRATION,
+        data={
+            "name": register_user.name,
+            "mobile_number": register_user.mobile_number,
+            "register_uid": str(register_user.uid),
+        },
+    )
+
+def build_product_purchase_notification(customer, register_user):
+    return Z2HNotifications(
+        user_id=customer.referrer.user_id,
+        notification_type=PRODUCT_PURCHASE,
+        data={
+            "name": register_user.name,
+            "mobile_number": register_user.mobile_number,
+            "customer_number": customer.customer_number,
+            "customer_uid": str(customer.uid),
+        },
+    )
+
+def build_customer_notification(customer, notification_type, level):
+    return Z2HNotifications(
+        user_id=customer.user_id,
+        notification_type=notification_type,
+        level=level,
+        data={
+            "customer_number": customer.customer_number,
+            "customer_uid": str(customer.uid),
+        },
+    )
+
+def notify_user_registration(register_user):
+    """Tell the referrer that a new user registered under them."""
+    if register_user.referred_by_id:
+        build_user_registration_notification(register_user).save()
+
+def notify_product_purchase(customer, register_user):
+    """Tell the referrer that a user under them bought a plan."""
+    if customer.referrer_id:
+        build_product_purchase_notification(customer, register_user).save()
+
+def notify_level_completions(completed_levels):
+    """Tell each referrer about the levels it just completed, given (customer, level) pairs."""
+    Z2HNotifications.objects.bulk_create([
+        build_customer_notification(customer, LEVEL_COMPLETION, REFERRAL_LEVEL_NAMES[level])
+        for customer, level in completed_levels
+    ])
+
+def notify_commission_paid(customer, level):
+    """Tell a customer that the commission of a level was paid."""
+    build_customer_notification(customer, COMMISSION_PAYMENT, REFERRAL_LEVEL_NAMES[level]).save()
+
+def get_notifications(user, after=None, unread_only=True, limit=NOTIFICATION_PAGE_SIZE):
+    """Return up to limit of a user's notifications with an id above after, oldest first."""
+    notifications = Z2HNotifications.objects.filter(user=user)
+
+    if unread_only:
+        notifications = notifications.filter(is_read=False)
+
+    if after:
+        notifications = notifications.filter(id__gt=after)
+
+    return list(notifications.order_by('id').values(
+        'id', 'uid', 'notification_type', 'level', 'data', 'is_read', 'created',
+    )[:limit])
+
+def mark_legacy_flags(notifications):
+    """Set the is_*_got_notified_* columns the older app builds still read for the given notifications."""
+    register_uids = []
+    purchase_customer_uids = []
+    level_customer_uids = {}
+    commission_customer_uids = {}
+
+    for notification in notifications:
+        data = notification.data
+        if notification.notification_type == USER_REGISTRATION:
+            register_uids.append(data.get('register_uid'))
+        elif notification.notification_type == PRODUCT_PURCHASE:
+            purchase_customer_uids.append(data.get('customer_uid'))
+        elif notification.notification_type == LEVEL_COMPLETION:
+            level_customer_uids.setdefault(notification.level, []).append(data.get('customer_uid'))
+        elif notification.notification_type == COMMISSION_PAYMENT:
+            commission_customer_uids.setdefault(notification.level, []).append(data.get('customer_uid'))
+
+    if register_uids:
+        RegisterUser.objects.filter(uid__in=register_uids).update(is_referrer_got_notified_for_joining=True)
+
+    if purchase_customer_uids:
+        Z2HCustomers.objects.filter(uid__in=purchase_customer_uids).update(is_referrer_got_notified_for_joined_level_one=True)
+
+    for level, customer_uids in level_customer_uids.items():
+        Z2HCustomers.objects.filter(uid__in=customer_uids).update(
+            **{f"is_user_got_notified_for_level_{level}_completion": True}
+        )
+
+    for level, customer_uids in commission_customer_uids.items():
+        Z2HCustomers.objects.filter(uid__in=customer_uids).update(
+            **{f"is_user_got_notified_for_level_{level}_commission_paid": True}
+        )
+
+def acknowledge_notifications(user, uids=None, up_to=None):
+    """Mark a user's unread notifications read, by uid or every one up to an id, and return how many changed."""
+    notifications = Z2HNotifications.objects.filter(user=user, is_read=False)
+
+    if uids is not None:
+        notifications = notifications.filter(uid__in=uids)
+
+    if up_to is not None:
+        notifications = notifications.filter(id__lte=up_to)
+
+    notifications = list(notifications.only('id', 'notification_type', 'level', 'data'))
+    if not notifications:
+        return 0
+
+    Z2HNotifications.objects.filter(id__in=[notification.id for notification in notifications]).update(
+        is_read=True, read_date=timezone.now(),
+    )
+    mark_legacy_flags(notifications)
+    invalidate_user_info(user.id)
+
+    return len(notifications)
+
+def acknowledge_legacy_notification(user, notification_type, register_uid=None, customer_uid=None, level=None):
+    """Mark the outbox rows behind a notification acknowledged through UpdateNotificationsView."""
+    if notification_type == USER_REGISTRATION:
+        matching = Q(data__register_uid=str(register_uid))
+    elif notification_type == PRODUCT_PURCHASE:
+        matching = Q(data__customer_uid=str(customer_uid))
+    else:
+        matching = Q(data__customer_uid=str(customer_uid), level=level)
+
+    return Z2HNotifications.objects.filter(
+        matching, user=user, notification_type=notification_type, is_read=False,
+    ).update(is_read=True, read_date=timezone.now())
+
+def format_notification_event(notification):
+    return f"id: {notification['id']}\nevent: notification\ndata: {json.dumps(notification, cls=DjangoJSONEncoder)}\n\n"
+
+def is_asgi_request(request):
+    """True when the request came through Z2H/asgi.py, where a streaming response does not hold a worker."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+async def stream_notification_events(user, after=None):
+    """Server-sent events for a user's unread notifications, ending after NOTIFICATION_STREAM_TIMEOUT so clients reconnect."""
+    fetch_notifications = sync_to_async(get_notifications)
+    deadline = time.monotonic() + settings.NOTIFICATION_STREAM_TIMEOUT
+    last_sent = time.monotonic()
+
+    yield f"retry: {settings.NOTIFICATION_POLL_INTERVAL * 1000}\n\n"
+
+    while time.monotonic() < deadline:
+        notifications = await fetch_notifications(user, after=after)
+
+        for notification in notifications:
+            after = notification['id']
+            yield format_notification_event(notification)
+
+        if notifications:
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= NOTIFICATION_HEARTBEAT_INTERVAL:
+            # Comment line so proxies don't close an idle connection
+            last_sent = time.monotonic()
+            yield ": keep-alive\n\n"
+
+        await asyncio.sleep(settings.NOTIFICATION_POLL_INTERVAL)
@@ -3,10 +3,13 @@ from django.contrib.auth import (
     authenticate,
 )
 from django.utils.translation import gettext as _
+from django.db.models import Prefetch, Subquery, OuterRef
 from rest_framework import serializers
-from .models import RegisterUser, Z2HUser, Role, Z2HCustomers
+from .models import RegisterUser, Z2HUser, Role, Z2HCustomers, REFERRAL_LEVEL_NAMES
 from apps.app.models import Z2HPlanDetails, Z2HOrders
 from apps.app.serializers import Z2HOrderSerializer
+from apps.utils.cache import get_plan, get_role_by_id
+from apps.user.commissions import build_commission
 import os
 from datetime import datetime
 
@@ -113,7 +116,7 @@ class RegisterUserSerializer(serializers.ModelSerializer):
         return Z2HUser.objects.get(id=obj.user_id).email
     
     def get_system_role(self, obj):
-        return Role.objects.get(id=obj.role_id).name
+        return get_role_by_id(obj.role_id).name
 
     def create(self, validated_data):
         request = self.context.get('request', None)
@@ -131,8 +134,9 @@ class UpdateRegisterUserDetailsSerializer(serializers.ModelSerializer):
         fields = [
             'address', 'marital_status', 'pan', 'aadhar_number', 'district', 'city', 'town', 'address', 'pin_code',
             'name_of_bank', 'name_as_in_bank', 'ifsc_code', 'bank_branch', 'account_number', 'alternate_mobile_number',
-            'profile_photo_path',
+            'profile_photo_path', 'profile_photo_variants',
         ]
+        read_only_fields = ['profile_photo_variants']
 
 class RegisterUserDetailsSerializer(serializers.ModelSerializer):
     referrer_name = serializers.SerializerMethodField()
@@ -148,6 +152,15 @@ class RegisterUserDetailsSerializer(serializers.ModelSerializer):
         model = RegisterUser
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Join the referrer, district and state, and annotate the referrer's first customer number."""
+        return queryset.select_related('referred_by__user', 'district__state').annotate(
+            referrer_customer_number=Subquery(
+                Z2HCustomers.objects.filter(user_id=OuterRef('referred_by__user_id')).order_by('id').values('customer_number')[:1]
+            ),
+        )
+
     def get_referrer(self, obj):
         return Z2HCustomers.objects.filter(user_id=obj.referred_by.user).first()
 
@@ -155,6 +168,9 @@ class RegisterUserDetailsSerializer(serializers.ModelSerializer):
         return obj.referred_by.user.name
 
     def get_referrer_id(self, obj):
+        if hasattr(obj, 'referrer_customer_number'):
+            return obj.referrer_customer_number
+
         return self.get_referrer(obj).customer_number
     
     def get_district(self, obj):
@@ -167,14 +183,13 @@ class RegisterUserDetailsSerializer(serializers.ModelSerializer):
         return obj.created.strftime("%d-%m-%Y")
     
     def get_date_of_birth(self, obj):
-        date_of_birth = RegisterUser.objects.get(user_id=obj.user_id).date_of_birth
-        return date_of_birth.strftime("%d-%m-%Y") if date_of_birth else ""
+        return obj.date_of_birth.strftime("%d-%m-%Y") if obj.date_of_birth else ""
     
     def get_gender(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).gender.capitalize()
+        return obj.gender.capitalize()
     
     def get_nominee_name(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).nominee_name
+        return obj.nominee_name
     
 class RoleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -240,114 +255,105 @@ class CustomerSerializer(serializers.ModelSerializer):
             'customer_number', 'district', 'state', 'user_status', 'customer_uid','is_level_four_completed'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the user, KYC details, referrer and orders of every customer up front."""
+        return queryset.select_related(
+            'user__user__district__state',
+            'referrer__user',
+        ).prefetch_related(
+            Prefetch('z2horders_set', queryset=Z2HOrderSerializer.setup_eager_loading(Z2HOrders.objects.all())),
+        )
+
+    def get_register_user(self, obj):
+        return obj.user.user
+
+    def get_plan_details(self, obj):
+        return get_plan(obj.active_plan_uid)
+
     def get_email_address(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).email_address
+        return self.get_register_user(obj).email_address
     
     def get_date_of_birth(self, obj):
-        date_of_birth = RegisterUser.objects.get(user_id=obj.user_id).date_of_birth
+        date_of_birth = self.get_register_user(obj).date_of_birth
         return date_of_birth.strftime("%d-%m-%Y") if date_of_birth else ""
     
     def get_gender(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).gender.capitalize()
+        return self.get_register_user(obj).gender.capitalize()
     
     def get_marital_status(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).marital_status.capitalize()
+        return self.get_register_user(obj).marital_status.capitalize()
     
     def get_mobile_number(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).mobile_number
+        return self.get_register_user(obj).mobile_number
     
     def get_nominee_name(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).nominee_name
+        return self.get_register_user(obj).nominee_name
     
     def get_aadhar_number(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).aadhar_number
+        return self.get_register_user(obj).aadhar_number
     
     def get_pan(self, obj):
-        pan = RegisterUser.objects.get(user_id=obj.user_id).pan
+        pan = self.get_register_user(obj).pan
         return pan.upper() if pan else ""
     
     def get_city(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).city
+        return self.get_register_user(obj).city
     
     def get_town(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).town
+        return self.get_register_user(obj).town
     
     def get_address(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).address
+        return self.get_register_user(obj).address
     
     def get_pin_code(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).pin_code
+        return self.get_register_user(obj).pin_code
     
     def get_name_of_bank(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).name_of_bank
+        return self.get_register_user(obj).name_of_bank
     
     def get_name_as_in_bank(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).name_as_in_bank
+        return self.get_register_user(obj).name_as_in_bank
     
     def get_ifsc_code(self, obj):
-        ifsc_code = RegisterUser.objects.get(user_id=obj.user_id).ifsc_code
+        ifsc_code = self.get_register_user(obj).ifsc_code
         return ifsc_code.upper() if ifsc_code else ""
     
     def get_bank_branch(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).bank_branch
+        return self.get_register_user(obj).bank_branch
     
     def get_account_number(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).account_number
-    
-    def get_email_address(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).email_address
+        return self.get_register_user(obj).account_number
     
     def get_plan(self, obj):
-        return Z2HPlanDetails.objects.filter(uid=obj.active_plan_uid).first().name
+        return self.get_plan_details(obj).name
     
     def get_district(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).district.name
+        return self.get_register_user(obj).district.name
     
     def get_state(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).district.state.name
+        return self.get_register_user(obj).district.state.name
     
     def get_plan_start_date(self, obj):
         return obj.plan_start_date.strftime("%d-%m-%Y") if obj.plan_start_date else None
     
     def get_level_one_count(self, obj):
-        count = Z2HCustomers.objects.filter(referrer=obj).count()
-        return f"{count} / {PRIMARY_LEG_COUNT}"
+        return f"{obj.level_one_downline_count} / {PRIMARY_LEG_COUNT}"
     
     def get_level_two_count(self, obj):
-        count = 0
-        customers = Z2HCustomers.objects.filter(referrer=obj)
-        for customer in customers:
-            count += Z2HCustomers.objects.filter(referrer=customer).count()
-
-        return f"{count} / {SECONDARY_LEG_COUNT}"
+        return f"{obj.level_two_downline_count} / {SECONDARY_LEG_COUNT}"
     
     def get_level_three_count(self, obj):
-        count = 0
-        customers = Z2HCustomers.objects.filter(referrer=obj)
-        for first_level_customer in customers:
-            customers_next_level = Z2HCustomers.objects.filter(referrer=first_level_customer)
-            for customer in customers_next_level:
-                count += Z2HCustomers.objects.filter(referrer=customer).count()
-
-        return f"{count} / {TERTIARY_LEG_COUNT}"
+        return f"{obj.level_three_downline_count} / {TERTIARY_LEG_COUNT}"
     
     def get_level_four_count(self, obj):
-        count = 0
-        customers = Z2HCustomers.objects.filter(referrer=obj)
-        for first_level_customer in customers:
-            customers_next_level = Z2HCustomers.objects.filter(referrer=first_level_customer)
-            for second_level_customer in customers_next_level:
-                customers_next_level = Z2HCustomers.objects.filter(referrer=second_level_customer)
-                for customer in customers_next_level:
-                    count += Z2HCustomers.objects.filter(referrer=customer).count()
-
-        return f"{count} / {QUATERNARY_LEG_COUNT}"
+        return f"{obj.level_four_downline_count} / {QUATERNARY_LEG_COUNT}"
     
     def get_referrer_name(self, obj):
         return obj.referrer.user.name if obj.referrer else ""
     
     def get_referrer_id(self, obj):
-        return obj.referrer.customer_number
+        return obj.referrer.customer_number if obj.referrer else ""
     
     def get_level_one_completed(self, obj):
         if obj.is_level_one_completed:
@@ -410,14 +416,53 @@ class CustomerSerializer(serializers.ModelSerializer):
         return UNPAID
     
     def get_order_details(self, obj):
-        orders = Z2HOrders.objects.filter(customer=obj)
-        return Z2HOrderSerializer(orders, many=True).data
+        return Z2HOrderSerializer(obj.z2horders_set.all(), many=True).data
     
     def get_user_status(self, obj):
         if obj.user.is_active:
             return "Active"
         
         return "Inactive"
+
+class DownlineMemberSerializer(serializers.ModelSerializer):
+    """One row of the downline explorer; only columns of the customer, its user and its referrer."""
+    customer_uid = serializers.CharField(source='uid')
+    name = serializers.CharField(source='user.name')
+    mobile_number = serializers.CharField(source='user.user.mobile_number')
+    referrer_id = serializers.SerializerMethodField()
+    plan_start_date = serializers.SerializerMethodField()
+    level_counts = serializers.SerializerMethodField()
+    level_completed = serializers.SerializerMethodField()
+    user_status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Z2HCustomers
+        fields = [
+            'customer_uid', 'customer_number', 'name', 'mobile_number', 'referrer_id', 'plan_start_date', 'level_counts',
+            'level_completed', 'user_status',
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user__user', 'referrer')
+
+    def get_referrer_id(self, obj):
+        return obj.referrer.customer_number if obj.referrer else ""
+
+    def get_plan_start_date(self, obj):
+        return obj.plan_start_date.strftime("%d-%m-%Y") if obj.plan_start_date else None
+
+    def get_level_counts(self, obj):
+        return {name: getattr(obj, f"level_{name}_downline_count") for name in REFERRAL_LEVEL_NAMES.values()}
+
+    def get_level_completed(self, obj):
+        return {name: getattr(obj, f"is_level_{name}_completed") for name in REFERRAL_LEVEL_NAMES.values()}
+
+    def get_user_status(self, obj):
+        if obj.user.is_active:
+            return "Active"
+        
+        return "Inactive"
     
 class Z2HCommissionSerializer(serializers.ModelSerializer):
     customer_name = serializers.SerializerMethodField()
@@ -468,31 +513,60 @@ class Z2HCommissionSerializer(serializers.ModelSerializer):
         model = Z2HCustomers
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load register users and commission ledger rows for every customer up front."""
+        return queryset.select_related('user__user').prefetch_related('commissions')
+
+    def get_register_user(self, obj):
+        return obj.user.user
+
+    def get_commission(self, obj, level):
+        """Ledger row of a level, or an unsaved row with the plan amounts while the level is still in progress."""
+        if not hasattr(obj, '_commissions_by_level'):
+            obj._commissions_by_level = {commission.level: commission for commission in obj.commissions.all()}
+
+        if level not in obj._commissions_by_level:
+            obj._commissions_by_level[level] = build_commission(obj, level)
+
+        return obj._commissions_by_level[level]
+
+    def get_commission_paid_status(self, obj, level):
+        commission_status = self.get_commission(obj, level).status
+
+        if commission_status == 'payment_issue':
+            return PAYMENT_ISSUE
+
+        if commission_status == 'paid':
+            return PAID
+
+        return UNPAID
+
     def get_customer_name(self, obj):
         return obj.user.name
     
     def get_mobile_number(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).mobile_number
+        return self.get_register_user(obj).mobile_number
     
     def get_name_of_bank(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).name_of_bank
+        return self.get_register_user(obj).name_of_bank
     
     def get_account_number(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).account_number
+        return self.get_register_user(obj).account_number
     
     def get_ifsc_code(self, obj):
-        ifsc_code = RegisterUser.objects.get(user_id=obj.user_id).ifsc_code
+        ifsc_code = self.get_register_user(obj).ifsc_code
         return ifsc_code.upper() if ifsc_code else ""
     
     def get_pan(self, obj):
-        pan = RegisterUser.objects.get(user_id=obj.user_id).pan
+        pan = self.get_register_user(obj).pan
         return pan.upper() if pan else ""
     
     def get_plan(self, obj):
-        return Z2HPlanDetails.objects.filter(uid=obj.active_plan_uid).first().name
+        return get_plan(obj.active_plan_uid).name
     
     def get_registration_fee(self, obj):
-        return Z2HPlanDetails.objects.filter(uid=obj.active_plan_uid).first().registration_fee
+        return get_plan(obj.active_plan_uid).registration_fee
     
     def get_commission_from_date(self, obj):
         commission_from_date = self.context['request'].query_params.get('commission_from_date', None)
@@ -512,34 +586,23 @@ class Z2HCommissionSerializer(serializers.ModelSerializer):
         return obj.level_one_completed_date.strftime("%d-%m-%Y") if obj.level_one_completed_date else None
     
     def get_level_one_commission_amount(self, obj):
-        level_one_amount = Z2HPlanDetails.objects.filter(uid=obj.active_plan_uid).first().level_one_amount
-        return float("{:.2f}".format(level_one_amount)) if level_one_amount else 0.0
+        return float(self.get_commission(obj, 1).commission_amount)
     
     def get_level_one_tds_amount(self, obj):
-        level_one_commission_amount = self.get_level_one_commission_amount(obj)
-        level_one_tds_amount = (level_one_commission_amount * 10) / 100
-        return float("{:.2f}".format(level_one_tds_amount))
+        return float(self.get_commission(obj, 1).tds_amount)
     
     def get_level_one_amount_payable(self, obj):
-        level_one_commission_amount = self.get_level_one_commission_amount(obj)
-        level_one_tds_amount = self.get_level_one_tds_amount(obj)
-        level_one_amount_payable = level_one_commission_amount - level_one_tds_amount
-        return float("{:.2f}".format(level_one_amount_payable))
+        return float(self.get_commission(obj, 1).amount_payable)
     
     def get_level_one_commission_paid_status(self, obj):
-        if obj.is_level_one_payment_issue:
-            return PAYMENT_ISSUE
-        
-        if obj.is_level_one_commission_paid:
-            return PAID
-
-        return UNPAID
+        return self.get_commission_paid_status(obj, 1)
     
     def get_level_one_commission_paid_date(self, obj):
-        return obj.level_one_commission_paid_date.strftime("%d-%m-%Y") if obj.level_one_commission_paid_date else None
+        paid_date = self.get_commission(obj, 1).paid_date
+        return paid_date.strftime("%d-%m-%Y") if paid_date else None
     
     def get_level_one_payment_comments(self, obj):
-        return dict(obj.level_one_commission_details).get('comments', None)
+        return self.get_commission(obj, 1).comments
     
     def get_level_two_completion_status(self, obj):
         if obj.is_level_two_completed:
@@ -551,31 +614,23 @@ class Z2HCommissionSerializer(serializers.ModelSerializer):
         return obj.level_two_completed_date.strftime("%d-%m-%Y") if obj.level_two_completed_date else None
     
     def get_level_two_commission_amount(self, obj):
-        level_two_amount = Z2HPlanDetails.objects.filter(uid=obj.active_plan_uid).first().level_two_amount
-        return float("{:.2f}".format(level_two_amount)) if level_two_amount else 0.0
+        return float(self.get_commission(obj, 2).commission_amount)
     
     def get_level_two_tds_amount(self, obj):
-        level_two_commission_amount = self.get_level_two_commission_amount(obj)
-        level_two_tds_amount = (level_two_commission_amount * 10) / 100
-        return float("{:.2f}".format(level_two_tds_amount))
+        return float(self.get_commission(obj, 2).tds_amount)
     
     def get_level_two_amount_payable(self, obj):
-        level_two_commission_amount = self.get_level_two_commission_amount(obj)
-        level_two_tds_amount = self.get_level_two_tds_amount(obj)
-        level_two_amount_payable = level_two_commission_amount - level_two_tds_amount
-        return float("{:.2f}".format(level_two_amount_payable))
-
+        return float(self.get_commission(obj, 2).amount_payable)
+    
     def get_level_two_commission_paid_status(self, obj):
-        if obj.is_level_two_commission_paid:
-            return PAID
-
-        return UNPAID
+        return self.get_commission_paid_status(obj, 2)
     
     def get_level_two_commission_paid_date(self, obj):
-        return obj.level_two_commission_paid_date.strftime("%d-%m-%Y") if obj.level_two_commission_paid_date else None
+        paid_date = self.get_commission(obj, 2).paid_date
+        return paid_date.strftime("%d-%m-%Y") if paid_date else None
     
     def get_level_two_payment_comments(self, obj):
-        return dict(obj.level_two_commission_details).get('comments', None)
+        return self.get_commission(obj, 2).comments
     
     def get_level_three_completion_status(self, obj):
         if obj.is_level_three_completed:
@@ -587,31 +642,23 @@ class Z2HCommissionSerializer(serializers.ModelSerializer):
         return obj.level_three_completed_date.strftime("%d-%m-%Y") if obj.level_three_completed_date else None
     
     def get_level_three_commission_amount(self, obj):
-        level_three_amount = Z2HPlanDetails.objects.filter(uid=obj.active_plan_uid).first().level_three_amount
-        return float("{:.2f}".format(level_three_amount)) if level_three_amount else 0.0
+        return float(self.get_commission(obj, 3).commission_amount)
     
     def get_level_three_tds_amount(self, obj):
-        level_three_commission_amount = self.get_level_three_commission_amount(obj)
-        level_three_tds_amount = (level_three_commission_amount * 10) / 100
-        return float("{:.2f}".format(level_three_tds_amount))
+        return float(self.get_commission(obj, 3).tds_amount)
     
     def get_level_three_amount_payable(self, obj):
-        level_three_commission_amount = self.get_level_three_commission_amount(obj)
-        level_three_tds_amount = self.get_level_three_tds_amount(obj)
-        level_three_amount_payable = level_three_commission_amount - level_three_tds_amount
-        return float("{:.2f}".format(level_three_amount_payable))
-
+        return float(self.get_commission(obj, 3).amount_payable)
+    
     def get_level_three_commission_paid_status(self, obj):
-        if obj.is_level_three_commission_paid:
-            return PAID
-
-        return UNPAID
+        return self.get_commission_paid_status(obj, 3)
     
     def get_level_three_commission_paid_date(self, obj):
-        return obj.level_three_commission_paid_date.strftime("%d-%m-%Y") if obj.level_three_commission_paid_date else None
+        paid_date = self.get_commission(obj, 3).paid_date
+        return paid_date.strftime("%d-%m-%Y") if paid_date else None
     
     def get_level_three_payment_comments(self, obj):
-        return dict(obj.level_three_commission_details).get('comments', None)
+        return self.get_commission(obj, 3).comments
     
     def get_level_four_completion_status(self, obj):
         if obj.is_level_four_completed:
@@ -623,31 +670,23 @@ class Z2HCommissionSerializer(serializers.ModelSerializer):
         return obj.level_four_completed_date.strftime("%d-%m-%Y") if obj.level_four_completed_date else None
     
     def get_level_four_commission_amount(self, obj):
-        level_four_amount = Z2HPlanDetails.objects.filter(uid=obj.active_plan_uid).first().level_four_amount
-        return float("{:.2f}".format(level_four_amount)) if level_four_amount else 0.0
+        return float(self.get_commission(obj, 4).commission_amount)
     
     def get_level_four_tds_amount(self, obj):
-        level_four_commission_amount = self.get_level_four_commission_amount(obj)
-        level_four_tds_amount = (level_four_commission_amount * 10) / 100
-        return float("{:.2f}".format(level_four_tds_amount))
+        return float(self.get_commission(obj, 4).tds_amount)
     
     def get_level_four_amount_payable(self, obj):
-        level_four_commission_amount = self.get_level_four_commission_amount(obj)
-        level_four_tds_amount = self.get_level_four_tds_amount(obj)
-        level_four_amount_payable = level_four_commission_amount - level_four_tds_amount
-        return float("{:.2f}".format(level_four_amount_payable))
-
+        return float(self.get_commission(obj, 4).amount_payable)
+    
     def get_level_four_commission_paid_status(self, obj):
-        if obj.is_level_four_commission_paid:
-            return PAID
-
-        return UNPAID
+        return self.get_commission_paid_status(obj, 4)
     
     def get_level_four_commission_paid_date(self, obj):
-        return obj.level_four_commission_paid_date.strftime("%d-%m-%Y") if obj.level_four_commission_paid_date else None
+        paid_date = self.get_commission(obj, 4).paid_date
+        return paid_date.strftime("%d-%m-%Y") if paid_date else None
     
     def get_level_four_payment_comments(self, obj):
-        return dict(obj.level_four_commission_details).get('comments', None)
+        return self.get_commission(obj, 4).comments
     
     def get_user_status(self, obj):
         if obj.user.is_active:
@@ -660,7 +699,6 @@ class CustomerNotGotDownlineSerializer(serializers.ModelSerializer):
     mobile_number = serializers.SerializerMethodField()
     register_date = serializers.SerializerMethodField()
     pending_days = serializers.SerializerMethodField()
-    mobile_number = serializers.SerializerMethodField()
     referrer_id = serializers.SerializerMethodField()
     referrer_name = serializers.SerializerMethodField()
     referrer_mobile_number = serializers.SerializerMethodField()
@@ -671,12 +709,17 @@ class CustomerNotGotDownlineSerializer(serializers.ModelSerializer):
             'customer_name', 'mobile_number', 'register_date', 'pending_days', 'customer_number', 'referrer_id', 'referrer_name',
             'referrer_mobile_number',
         ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Join the register users of every customer and its referrer."""
+        return queryset.select_related('user__user', 'referrer__user__user')
     
     def get_customer_name(self, obj):
         return obj.user.name
     
     def get_mobile_number(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).mobile_number
+        return obj.user.user.mobile_number
     
     def get_register_date(self, obj):
         return obj.plan_start_date.strftime("%d-%m-%Y")
@@ -684,9 +727,6 @@ class CustomerNotGotDownlineSerializer(serializers.ModelSerializer):
     def get_pending_days(self, obj):
         return (datetime.now().date() - obj.plan_start_date.date()).days
     
-    def get_mobile_number(self, obj):
-        return RegisterUser.objects.get(user_id=obj.user_id).mobile_number
-    
     def get_referrer_id(self, obj):
         return obj.referrer.customer_number if obj.referrer else None
     
@@ -694,6 +734,6 @@ class CustomerNotGotDownlineSerializer(serializers.ModelSerializer):
         return obj.referrer.user.name if obj.referrer else None
     
     def get_referrer_mobile_number(self, obj):
-        return RegisterUser.objects.get(user_id=obj.referrer.user_id).mobile_number if obj.referrer else None
+        return obj.referrer.user.user.mobile_number if obj.referrer else None
 
     
@@ -1,4 +1,455 @@
-from django.test import TestCase
+import io
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from apps.app.models import (
+    Z2HPlanDetails,
+    Z2HProductCategories,
+    Z2HProductSubCategories,
+    Z2HProducts,
+    Z2HOrders,
+    Z2HOrderItems,
+)
+from apps.user.authentication import CachedTokenAuthentication, get_token_cache_key, revoke_tokens
+from apps.user.commissions import get_commission_amounts, record_completed_levels
+from apps.user.models import Z2HUser, Z2HCustomers, RegisterUser, Role, Z2HReferralTree, Z2HCommissions, REFERRAL_TREE_MAX_DEPTH
+from apps.utils.cache import clear_config_cache, get_plan
+from apps.utils.models import State, District
 
 # Create your tests here.
-# Unit Test
\ No newline at end of file
+
+def create_plan_and_product():
+    plan = Z2HPlanDetails.objects.create(
+        name='Silver', registration_fee=Decimal('200.00'), level_one_amount=Decimal('10.00'),
+        level_two_amount=Decimal('40.00'), level_three_amount=Decimal('30.00'), level_four_amount=Decimal('30.00'),
+    )
+    category = Z2HProductCategories.objects.create(name='Category')
+    sub_category = Z2HProductSubCategories.objects.create(name='Sub Category', category=category)
+    product = Z2HProducts.objects.create(name='Product', sub_category=sub_category, plan=plan, hsn_code='1234', is_active=True)
+
+    return plan, product
+
+def create_register_user(district, role, index, referred_by=None, is_admin_user=False):
+    mobile_number = str(9000000000 + index)
+    user = Z2HUser.objects.create_user(f"{mobile_number}@z2h.com", 'password', name=f"User {index}")
+
+    RegisterUser.objects.create(
+        role=role, user=user, referred_by=referred_by, name=f"User {index}", nominee_name='Nominee', date_of_birth='1990-01-01',
+        marital_status='single', gender='male', aadhar_number='000000000000', mobile_number=mobile_number, district=district,
+        city='City', town='Town', address='Address', pin_code='600001', name_of_bank='Bank', name_as_in_bank='User',
+        ifsc_code='IFSC0000000', bank_branch='Branch', account_number='0', email_address=f"{mobile_number}@z2h.com",
+        is_admin_user=is_admin_user,
+    )
+
+    return user
+
+def create_customer(user, plan, index, referrer=None, is_admin_user=False):
+    customer = Z2HCustomers.objects.create(
+        user=user, referrer=referrer, customer_number=f"CUS{100 + index}", active_plan_uid=plan.uid,
+        plan_start_date=timezone.now(), is_admin_user=is_admin_user,
+    )
+    Z2HReferralTree.objects.add_customer(customer)
+
+    return customer
+
+def create_order(customer, product, index):
+    order = Z2HOrders.objects.create(
+        ordered_by=customer.user, customer=customer, order_number=f"ORD{100 + index}", order_date=timezone.now(),
+        order_total_amount=Decimal('200.00'),
+    )
+    Z2HOrderItems.objects.create(
+        order=order, product=product, order_item_number=f"ITM{100 + index}", quantity=1, price=Decimal('195.00'),
+        total_amount=Decimal('200.00'),
+    )
+
+    return order
+
+def create_customer_tree(count):
+    """An admin root with count customers under it, two per referrer, each with one order."""
+    district = District.objects.create(state=State.objects.create(name='State'), name='District')
+    role = Role.objects.create(name='customer')
+    plan, product = create_plan_and_product()
+
+    root = create_customer(create_register_user(district, role, 0, is_admin_user=True), plan, 0, is_admin_user=True)
+    customers = [root]
+
+    for index in range(1, count + 1):
+        referrer = customers[(index - 1) // 2]
+        customer = create_customer(create_register_user(district, role, index, referred_by=referrer), plan, index, referrer=referrer)
+        create_order(customer, product, index)
+        customers.append(customer)
+
+    return customers, product
+
+class CustomerQueryCountTests(APITestCase):
+    """The customer endpoints must cost the same number of queries whatever the page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers, cls.product = create_customer_tree(12)
+
+    def setUp(self):
+        cache.clear()
+        clear_config_cache()
+        self.client.force_authenticate(self.customers[0].user)
+
+    def test_customer_list_query_count(self):
+        for rows_per_page in (2, 10):
+            cache.clear()
+            clear_config_cache()
+            with self.assertNumQueries(6):
+                response = self.client.get('/api/z2h/user/customer/', {'page': 1, 'rowsPerPage': rows_per_page})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['data']), rows_per_page)
+
+    def test_customer_details_query_count(self):
+        for customer, expected_rows in ((self.customers[1], 6), (self.customers[2], 4)):
+            cache.clear()
+            clear_config_cache()
+            with self.assertNumQueries(15):
+                response = self.client.get('/api/z2h/user/customer/customer_details/', {'customer_uid': customer.uid})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                sum(len(response.data[f"{level}_level_customers"]) for level in ('first', 'second', 'third', 'fourth')),
+                expected_rows,
+            )
+
+    def test_customer_details_page_query_count(self):
+        for row_per_page in (1, 4):
+            cache.clear()
+            clear_config_cache()
+            with self.assertNumQueries(19):
+                response = self.client.get(
+                    '/api/z2h/user/customer/customer_details/',
+                    {'customer_uid': self.customers[0].uid, 'page': 1, 'rowPerPage': row_per_page},
+                )
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['second_level_customers']), row_per_page)
+
+    def test_downline_page_query_count(self):
+        for rows_per_page in (1, 4):
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    '/api/z2h/user/customer/downline/',
+                    {'customer_uid': self.customers[0].uid, 'level': 2, 'rowsPerPage': rows_per_page},
+                )
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['customers']), rows_per_page)
+
+    def test_lists_reject_invalid_paging(self):
+        invalid_params = (
+            {'rowsPerPage': 0}, {'rowsPerPage': -1}, {'rowsPerPage': 'abc'}, {'rowsPerPage': settings.MAX_ROWS_PER_PAGE + 1},
+            {'page': 0}, {'page': 'abc'},
+        )
+
+        for path in ('/api/z2h/user/customer/', '/api/z2h/user/customer/commission_details/'):
+            for params in invalid_params:
+                for extra_params in ({}, {'cursor': ''}):
+                    with self.subTest(path=path, **params, **extra_params):
+                        response = self.client.get(
+                            path, {'commission_status': 'All', 'commission_level': 'All', **params, **extra_params},
+                        )
+
+                        self.assertEqual(response.status_code, 400)
+
+            response = self.client.get(path, {'commission_status': 'All', 'commission_level': 'All', 'page': 1, 'rowsPerPage': 2})
+            self.assertEqual(response.status_code, 200)
+
+    def test_downline_views_reject_invalid_paging(self):
+        customer_uid = self.customers[0].uid
+
+        for path, params in (
+            ('/api/z2h/user/customer/customer_details/', {'page': 1, 'rowPerPage': 0}),
+            ('/api/z2h/user/customer/customer_details/', {'page': 1, 'rowPerPage': 'abc'}),
+            ('/api/z2h/user/customer/customer_details/', {'page': 'abc'}),
+            ('/api/z2h/user/customer/downline/', {'level': 1, 'rowsPerPage': 0}),
+            ('/api/z2h/user/customer/downline/', {'level': 1, 'rowsPerPage': 'abc'}),
+        ):
+            with self.subTest(path=path, **params):
+                self.assertEqual(self.client.get(path, {'customer_uid': customer_uid, **params}).status_code, 400)
+
+    def test_reports_reject_invalid_paging(self):
+        for path in ('/api/z2h/user/web_user/registered_users/', '/api/z2h/user/no_downline/'):
+            for params in ({'page': 1, 'rowsPerPage': 0}, {'page': 1, 'rowsPerPage': 'abc'}, {'page': 'abc'}, {'cursor': '', 'rowsPerPage': 0}):
+                with self.subTest(path=path, **params):
+                    self.assertEqual(self.client.get(path, params).status_code, 400)
+
+            self.assertEqual(self.client.get(path, {'page': 1, 'rowsPerPage': 2}).status_code, 200)
+
+class ReferralTreeTests(TestCase):
+    """Each customer is linked to itself and to its referrers up to REFERRAL_TREE_MAX_DEPTH levels up."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.district = District.objects.create(state=State.objects.create(name='State'), name='District')
+        cls.role = Role.objects.create(name='customer')
+        cls.plan, cls.product = create_plan_and_product()
+
+    def create_chain(self, length):
+        """Customers each referred by the one before, under an admin root."""
+        chain = [create_customer(create_register_user(self.district, self.role, 0, is_admin_user=True), self.plan, 0, is_admin_user=True)]
+
+        for index in range(1, length + 1):
+            referrer = chain[-1]
+            user = create_register_user(self.district, self.role, index, referred_by=referrer)
+            chain.append(create_customer(user, self.plan, index, referrer=referrer))
+
+        return chain
+
+    def get_ancestor_depths(self, customer):
+        return list(Z2HReferralTree.objects.filter(descendant=customer).order_by('depth').values_list('ancestor_id', 'depth'))
+
+    def test_paths_link_every_referrer_with_its_depth(self):
+        chain = self.create_chain(3)
+
+        self.assertEqual(self.get_ancestor_depths(chain[0]), [(chain[0].id, 0)])
+        self.assertEqual(
+            self.get_ancestor_depths(chain[3]),
+            [(chain[3].id, 0), (chain[2].id, 1), (chain[1].id, 2), (chain[0].id, 3)],
+        )
+
+    def test_paths_stop_at_max_depth(self):
+        chain = self.create_chain(6)
+
+        self.assertEqual(
+            self.get_ancestor_depths(chain[6]),
+            [(chain[6 - depth].id, depth) for depth in range(REFERRAL_TREE_MAX_DEPTH + 1)],
+        )
+        self.assertEqual(
+            list(Z2HReferralTree.objects.filter(ancestor=chain[1]).order_by('depth').values_list('descendant_id', 'depth')),
+            [(chain[1 + depth].id, depth) for depth in range(REFERRAL_TREE_MAX_DEPTH + 1)],
+        )
+
+class DownlineCounterTests(TestCase):
+    """Adding a non-admin customer bumps one counter on each of its referrers, and the rebuild command agrees."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers, cls.product = create_customer_tree(12)
+
+    def get_counts(self, customer):
+        customer.refresh_from_db()
+
+        return [getattr(customer, f"level_{level}_downline_count") for level in ('one', 'two', 'three', 'four')]
+
+    def test_counters_count_each_level(self):
+        self.assertEqual(self.get_counts(self.customers[0]), [2, 4, 6, 0])
+        self.assertEqual(self.get_counts(self.customers[1]), [2, 4, 0, 0])
+        self.assertEqual(self.get_counts(self.customers[12]), [0, 0, 0, 0])
+
+    def test_admin_customer_is_not_counted(self):
+        register_user = RegisterUser.objects.select_related('district', 'role').get(user=self.customers[0].user)
+        user = create_register_user(register_user.district, register_user.role, 50, referred_by=self.customers[12], is_admin_user=True)
+        create_customer(user, get_plan(self.customers[0].active_plan_uid), 50, referrer=self.customers[12], is_admin_user=True)
+
+        self.assertEqual(self.get_counts(self.customers[12]), [0, 0, 0, 0])
+        self.assertEqual(self.get_counts(self.customers[0]), [2, 4, 6, 0])
+
+    def test_rebuild_restores_counters(self):
+        call_command('rebuild_downline_counts', '--verify', stdout=io.StringIO())
+
+        Z2HCustomers.objects.filter(id=self.customers[1].id).update(level_two_downline_count=0)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_downline_counts', '--verify', stdout=io.StringIO())
+
+        call_command('rebuild_downline_counts', stdout=io.StringIO())
+
+        self.assertEqual(self.get_counts(self.customers[1]), [2, 4, 0, 0])
+
+class CommissionAmountTests(SimpleTestCase):
+    """A level pays its flat value, or a percentage of the registration fee, less TDS."""
+
+    def get_amounts(self, **plan_fields):
+        return get_commission_amounts(Z2HPlanDetails(registration_fee=Decimal('200.00'), level_one_amount=Decimal('10.00'), **plan_fields), 1)
+
+    def test_flat_value(self):
+        self.assertEqual(
+            self.get_amounts(level_one_flat_value=Decimal('50.00')),
+            (Decimal('50.00'), Decimal('5.00'), Decimal('45.00')),
+        )
+
+    def test_percentage_of_registration_fee(self):
+        self.assertEqual(
+            self.get_amounts(is_level_one_flat=False, is_level_one_percentage=True, level_one_percentage_value=Decimal('12.50')),
+            (Decimal('25.00'), Decimal('2.50'), Decimal('22.50')),
+        )
+
+    def test_percentage_takes_precedence_over_flat(self):
+        self.assertEqual(
+            self.get_amounts(
+                level_one_flat_value=Decimal('50.00'), is_level_one_percentage=True, level_one_percentage_value=Decimal('12.50'),
+            ),
+            (Decimal('25.00'), Decimal('2.50'), Decimal('22.50')),
+        )
+
+    def test_level_amount_without_a_value(self):
+        self.assertEqual(self.get_amounts(), (Decimal('10.00'), Decimal('1.00'), Decimal('9.00')))
+
+    def test_amounts_round_half_up_to_cents(self):
+        self.assertEqual(
+            self.get_amounts(is_level_one_percentage=True, level_one_percentage_value=Decimal('3.33')),
+            (Decimal('6.66'), Decimal('0.67'), Decimal('5.99')),
+        )
+
+class CommissionLedgerTests(TestCase):
+    """Completed levels of non-admin customers get one ledger row each."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers, cls.product = create_customer_tree(1)
+
+    def test_completed_levels_are_recorded_once(self):
+        for customer in self.customers:
+            customer.is_level_one_completed = True
+            customer.level_one_completed_date = timezone.now()
+
+        record_completed_levels([(customer, 1) for customer in self.customers])
+        record_completed_levels([(self.customers[1], 1)])
+
+        commission = Z2HCommissions.objects.get()
+        self.assertEqual((commission.customer, commission.level, commission.status), (self.customers[1], 1, 'unpaid'))
+        self.assertEqual(
+            (commission.commission_amount, commission.tds_amount, commission.amount_payable),
+            (Decimal('10.00'), Decimal('1.00'), Decimal('9.00')),
+        )
+
+class CommissionDetailsTests(APITestCase):
+    """commission_details lists the customers whose ledger rows match the level, status and completion date filters."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers, cls.product = create_customer_tree(4)
+
+        for customer, level, commission_status, completed_date in (
+            (cls.customers[1], 1, 'unpaid', '2026-01-10'),
+            (cls.customers[2], 1, 'paid', '2026-02-10'),
+            (cls.customers[3], 2, 'payment_issue', '2026-03-10'),
+            (cls.customers[4], 3, 'unpaid', '2026-04-10'),
+        ):
+            Z2HCommissions.objects.create(
+                customer=customer, level=level, status=commission_status,
+                completed_date=timezone.make_aware(timezone.datetime.fromisoformat(f"{completed_date}T12:00:00")),
+            )
+
+    def setUp(self):
+        cache.clear()
+        clear_config_cache()
+        self.client.force_authenticate(self.customers[0].user)
+
+    def get_customer_numbers(self, **params):
+        response = self.client.get(
+            '/api/z2h/user/customer/commission_details/', {'commission_status': 'All', 'commission_level': 'All', **params},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        return {commission['customer_number'] for commission in response.data['commissions']}
+
+    def test_filters(self):
+        for params, expected_customers in (
+            ({}, [1, 2, 3, 4]),
+            ({'commission_status': 'Yet to be paid'}, [1, 3, 4]),
+            ({'commission_status': 'Paid'}, [2]),
+            ({'commission_status': 'Issue with payments'}, [3]),
+            ({'commission_level': 'One'}, [1, 2]),
+            ({'commission_level': 'One', 'commission_status': 'Paid'}, [2]),
+            ({'commission_from_date': '2026-02-01', 'commission_to_date': '2026-03-31'}, [2, 3]),
+            ({'commission_to_date': '2026-01-10'}, [1]),
+            ({'commission_from_date': '2026-04-10', 'commission_level': 'Three'}, [4]),
+        ):
+            with self.subTest(**params):
+                self.assertEqual(
+                    self.get_customer_numbers(**params), {self.customers[index].customer_number for index in expected_customers},
+                )
+
+    def test_page_counts_matching_customers(self):
+        response = self.client.get('/api/z2h/user/customer/commission_details/', {
+            'commission_status': 'Yet to be paid', 'commission_level': 'All', 'page': 1, 'rowsPerPage': 2,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_page_count'], 2)
+        self.assertEqual(len(response.data['commissions']), 2)
+
+    def test_unknown_filters_are_rejected(self):
+        for params in ({'commission_status': 'Unknown'}, {'commission_level': 'Five'}):
+            with self.subTest(**params):
+                response = self.client.get(
+                    '/api/z2h/user/customer/commission_details/', {'commission_status': 'All', 'commission_level': 'All', **params},
+                )
+
+                self.assertEqual(response.status_code, 400)
+
+class NotificationDeliveryTests(APITestCase):
+    """Notification endpoints must never hold a WSGI worker."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Z2HUser.objects.create_user('notifications@z2h.com', 'password', name='Notifications')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_poll_answers_with_retry_hint(self):
+        response = self.client.get('/api/z2h/user/notifications/', {'waitSeconds': 25})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data'], [])
+        self.assertEqual(response.data['retry_after'], settings.NOTIFICATION_POLL_INTERVAL)
+
+    def test_stream_needs_asgi(self):
+        response = self.client.get('/api/z2h/user/notifications/stream/', HTTP_ACCEPT='application/json')
+
+        self.assertEqual(response.status_code, 501)
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """The token cache keeps only the auth fields of a user and resolves the token without a query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Z2HUser.objects.create_user('auth@z2h.com', 'password', name='Auth')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        clear_config_cache()
+        revoke_tokens(self.token.key)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cached_credentials_hold_no_password(self):
+        self.client.get('/api/z2h/user/me/')
+        credentials = cache.get(get_token_cache_key(self.token.key))
+
+        self.assertEqual(credentials['user_id'], self.user.id)
+        self.assertNotIn(self.user.password, repr(credentials))
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/z2h/user/me/')
+
+        self.assertEqual(response.data, {'email': 'auth@z2h.com', 'name': 'Auth'})
+
+    def test_user_info_fields_need_no_query(self):
+        self.client.get('/api/z2h/user/me/')
+        user, token = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            self.assertEqual((user.name, user.email, user.is_first_login), ('Auth', 'auth@z2h.com', True))
+
+    def test_auth_cache_stats_needs_settings_page(self):
+        self.assertEqual(self.client.get('/api/z2h/user/auth_cache_stats/').status_code, 403)
+
+        self.user.is_superuser = True
+        self.user.save()
+
+        self.assertEqual(self.client.get('/api/z2h/user/auth_cache_stats/').status_code, 200)
@@ -24,4 +24,8 @@ urlpatterns += [
     path('dashborad_reports/', views.DashboardReportView.as_view(), name='dashboard-reports'),
     path('no_downline/', views.NoDownlineReportsView.as_view(), name='no-downline'),
     path('update_notifications/', views.UpdateNotificationsView.as_view(), name="update-notifications"),
+    path('notifications/', views.NotificationsView.as_view(), name="notifications"),
+    path('notifications/acknowledge/', views.AcknowledgeNotificationsView.as_view(), name="acknowledge-notifications"),
+    path('notifications/stream/', views.NotificationStreamView.as_view(), name="notification-stream"),
+    path('auth_cache_stats/', views.AuthCacheStatsView.as_view(), name="auth-cache-stats"),
 ]
\ No newline at end of file
@@ -0,0 +1,65 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from apps.user.models import Z2HUser, Z2HCustomers, RegisterUser
+
+def get_user_info_cache_key(user_id):
+    return f"mobile_user_info:{user_id}"
+
+def get_cached_user_info(user_id, loader):
+    """Return (user_info, etag) for the mobile home payload, building it with loader() on a miss."""
+    key = get_user_info_cache_key(user_id)
+
+    entry = cache.get(key)
+    if entry is not None:
+        return entry['user_info'], entry['etag']
+
+    user_info = loader()
+    if user_info is None:
+        return None, None
+
+    payload = json.dumps(user_info, cls=DjangoJSONEncoder, sort_keys=True)
+    etag = hashlib.md5(payload.encode()).hexdigest()
+
+    cache.set(key, {'user_info': user_info, 'etag': etag}, settings.MOBILE_USER_INFO_CACHE_TIMEOUT)
+
+    return user_info, etag
+
+def invalidate_user_info(*user_ids):
+    keys = [get_user_info_cache_key(user_id) for user_id in user_ids if user_id]
+
+    # Inside a transaction the entries go once it commits, so a concurrent read can't cache the old rows again
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+# Registration, payment, level completion, commission payout and login all save one of these rows.
+# Flag-only changes made with queryset.update() call invalidate_user_info() themselves.
+
+@receiver(post_save, sender=Z2HUser)
+def invalidate_z2h_user(sender, instance, **kwargs):
+    invalidate_user_info(instance.id)
+
+@receiver(post_save, sender=RegisterUser)
+def invalidate_register_user(sender, instance, created, **kwargs):
+    user_ids = [instance.user_id]
+
+    # A new registrant shows up in the referrer's registered_users_under_user
+    if created and instance.referred_by_id:
+        user_ids.append(Z2HCustomers.objects.filter(id=instance.referred_by_id).values_list('user_id', flat=True).first())
+
+    invalidate_user_info(*user_ids)
+
+@receiver(post_save, sender=Z2HCustomers)
+def invalidate_customer(sender, instance, created, **kwargs):
+    user_ids = [instance.user_id]
+
+    # A new customer shows up in the referrer's product_purchased_users_under_user
+    if created and instance.referrer_id:
+        user_ids.append(Z2HCustomers.objects.filter(id=instance.referrer_id).values_list('user_id', flat=True).first())
+
+    invalidate_user_info(*user_ids)
@@ -1,9 +1,10 @@
-from rest_framework import generics, authentication, permissions, viewsets, status
+from rest_framework import generics, permissions, viewsets, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.settings import api_settings
+from rest_framework.renderers import JSONRenderer
 from apps.user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
@@ -16,22 +17,64 @@ from apps.user.serializers import (
     Z2HCommissionSerializer,
     RegisterUserDetailsSerializer,
     CustomerNotGotDownlineSerializer,
+    DownlineMemberSerializer,
 )
 from apps.user.permissions import ReferrerLimitPermission
-from apps.user.models import Z2HUser, Z2HCustomers, Z2HUserRoles, Role, RegisterUser
-from apps.app.models import Z2HWebPages, Z2HWebPageRoles, Z2HOrders
+from apps.user.authentication import CachedTokenAuthentication, get_auth_cache_stats
+from apps.user.models import (
+    Z2HUser, Z2HCustomers, Z2HUserRoles, Role, RegisterUser, Z2HDashboardSnapshot, Z2HCommissions, REFERRAL_LEVEL_NAMES,
+)
+from apps.user.dashboard import build_dashboard_report
+from apps.user.user_info import get_cached_user_info, invalidate_user_info
+from apps.user.notifications import (
+    notify_user_registration,
+    notify_commission_paid,
+    get_notifications,
+    acknowledge_notifications,
+    acknowledge_legacy_notification,
+    stream_notification_events,
+    is_asgi_request,
+)
+from apps.utils.renderers import EventStreamRenderer
+from apps.user.commissions import (
+    update_commission_payment,
+    COMMISSION_LEVEL_NUMBERS,
+    COMMISSION_LEVEL_NAMES,
+    COMMISSION_STATUS_FILTERS,
+    COMMISSION_STATUS_NAMES,
+)
+from apps.utils.export import stream_csv_response
+from apps.app.models import Z2HOrders
+from apps.app.permissions import WebPagePermission
 from apps.utils.tasks import send_email
+from apps.utils.cache import get_role, get_role_by_id, get_user_role_uid, get_role_web_pages
 import random
 import string
 from rest_framework.decorators import action
-from django.db.models import Q
+from django.db.models import Q, Subquery, Exists, OuterRef
 from django.utils import timezone
 from django.utils.dateparse import parse_date
-from datetime import timedelta
-from django.core.paginator import Paginator
+from django.utils.http import parse_etags, quote_etag
+from datetime import datetime, timedelta
+from django.conf import settings
+from apps.utils.pagination import (
+    get_cursor_pagination_data,
+    get_page_pagination_data,
+    get_page_number,
+    get_rows_per_page,
+    CURSOR_QUERY_PARAM,
+    DEFAULT_ROWS_PER_PAGE,
+)
+from django.http import StreamingHttpResponse
+from django.core.exceptions import ValidationError
+import math
+import os
 
 LOOKUP_REGEX = '[0-9a-f-]{36}'
 
+# Response key prefix of each downline level in get_customer_details
+DOWNLINE_LEVEL_NAMES = {1: 'first', 2: 'second', 3: 'third', 4: 'fourth'}
+
 def generate_password(length=8):
     required_password_char_length = length - 2
     letters = string.ascii_letters
@@ -60,7 +103,7 @@ class CreateUserView(generics.CreateAPIView):
 class ManageUserView(generics.RetrieveAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
@@ -135,29 +178,26 @@ class UserLoginView(ObtainAuthToken):
         return Response(data, status=status.HTTP_200_OK)
     
 class GetUserInfoView(APIView):
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_user_info(self, user):
-        user_role = Z2HUserRoles.objects.filter(user_uid=str(user.uid)).first()
-        role = Role.objects.filter(uid=user_role.role_uid).first()
-        web_page_roles = Z2HWebPageRoles.objects.filter(role_uid=role.uid, is_active=True)
-        web_pages = Z2HWebPages.objects.filter(uid__in=[web_page_role.web_page_uid for web_page_role in web_page_roles])
+        role = get_role(get_user_role_uid(user.uid))
 
         user_info = {
             'uid': user.uid,
             'name': user.name,
             'email': user.email,
             'role': role.name,
-            'web_pages': [web_page.name for web_page in web_pages],
+            'web_pages': get_role_web_pages(role.uid),
         }
 
         return user_info
     
-    def get_check_user(self, request):
+    def get_check_user(self, user_customers):
         enable_payment = False
         is_existing_user = False
-        customer = Z2HCustomers.objects.filter(user=request.user).first()
+        customer = user_customers[0] if user_customers else None
 
         if not customer:
             enable_payment = True
@@ -172,121 +212,83 @@ class GetUserInfoView(APIView):
         return enable_payment, is_existing_user
     
     def get_registered_users_under_user(self, request):
-        registered_users_under_user_all = RegisterUser.objects.filter(
+        # Registered users not yet present in Z2HCustomers
+        registered_users_under_user = RegisterUser.objects.filter(
             referred_by__user=request.user, is_referrer_got_notified_for_joining=False
-        ).all()
-
-        # Remove registered users present in Z2hCustomers
-        registered_users_under_user = []
-        for registered_user in registered_users_under_user_all:
-            customer = Z2HCustomers.objects.filter(user=registered_user.user).first()
-            if not customer:
-                registered_users_under_user.append({
-                    "name": registered_user.name,
-                    "mobile_number": registered_user.mobile_number,
-                    "id": registered_user.id,
-                    "uid": registered_user.uid,
-                })
-
-        return registered_users_under_user
+        ).filter(
+            ~Exists(Z2HCustomers.objects.filter(user_id=OuterRef('user_id')))
+        ).values('name', 'mobile_number', 'id', 'uid')
+
+        return list(registered_users_under_user)
     
-    def get_product_purchased_users_under_user(self, request):
-        referrer = Z2HCustomers.objects.filter(user=request.user).first()
+    def get_product_purchased_users_under_user(self, user_customers):
+        if not user_customers:
+            return []
 
         customers_under_referrer = Z2HCustomers.objects.filter(
-            referrer=referrer, is_referrer_got_notified_for_joined_level_one=False,
-        ).all()
-
-        product_purchased_users_under_user = []
-        for customer in customers_under_referrer:
-            register_user = RegisterUser.objects.filter(user=customer.user).first()
-            if register_user:
-                product_purchased_users_under_user.append({
-                    "name": register_user.name,
-                    "mobile_number": register_user.mobile_number,
-                    "customer_number": customer.customer_number,
-                    "customer_uid": customer.uid,
-                })
-
-
-        return product_purchased_users_under_user
-
-    def get_level_completed_status_of_user(self, request):
-        level_one_completed_status = Z2HCustomers.objects.filter(
-            user=request.user, is_level_one_completed=True, is_user_got_notified_for_level_four_completion=False
-        )
-        level_two_completed_status = Z2HCustomers.objects.filter(
-            user=request.user, is_level_two_completed=True, is_user_got_notified_for_level_four_completion=False
-        )
-        level_three_completed_status = Z2HCustomers.objects.filter(
-            user=request.user, is_level_three_completed=True, is_user_got_notified_for_level_four_completion=False
-        )
-        level_four_completed_status = Z2HCustomers.objects.filter(
-            user=request.user, is_level_four_completed=True, is_user_got_notified_for_level_four_completion=False
-        )
+            referrer=user_customers[0], is_referrer_got_notified_for_joined_level_one=False, user__user__isnull=False,
+        ).values('user__user__name', 'user__user__mobile_number', 'customer_number', 'uid')
+
+        return [
+            {
+                "name": customer['user__user__name'],
+                "mobile_number": customer['user__user__mobile_number'],
+                "customer_number": customer['customer_number'],
+                "customer_uid": customer['uid'],
+            }
+            for customer in customers_under_referrer
+        ]
+
+    def get_level_completed_status_of_user(self, user_customers):
+        not_notified_customers = [
+            customer for customer in user_customers if not customer.is_user_got_notified_for_level_four_completion
+        ]
 
         level_completed_status_of_user = {
-            "level_one_completed": level_one_completed_status.exists(),
-            "level_two_completed": level_two_completed_status.exists(),
-            "level_three_completed": level_three_completed_status.exists(),
-            "level_four_completed": level_four_completed_status.exists(),
+            "level_one_completed": any(customer.is_level_one_completed for customer in not_notified_customers),
+            "level_two_completed": any(customer.is_level_two_completed for customer in not_notified_customers),
+            "level_three_completed": any(customer.is_level_three_completed for customer in not_notified_customers),
+            "level_four_completed": any(customer.is_level_four_completed for customer in not_notified_customers),
         }
 
         return level_completed_status_of_user
     
 
-    def get_commission_paid_status_of_user(self, request):
-        level_one_commission_paid_status = Z2HCustomers.objects.filter(
-            user=request.user, is_level_one_commission_paid=True, is_user_got_notified_for_level_one_commission_paid=False
-        )
-        level_two_commission_paid_status = Z2HCustomers.objects.filter(
-            user=request.user, is_level_two_commission_paid=True, is_user_got_notified_for_level_two_commission_paid=False
-        )
-        level_three_commission_paid_status = Z2HCustomers.objects.filter(
-            user=request.user, is_level_three_commission_paid=True, is_user_got_notified_for_level_three_commission_paid=False
-        )
-        level_four_commission_paid_status = Z2HCustomers.objects.filter(
-            user=request.user, is_level_four_commission_paid=True, is_user_got_notified_for_level_four_commission_paid=False
-        )
+    def get_commission_paid_status_of_user(self, user_customers):
+        commission_paid_status_of_user = {}
 
-        commission_paid_status_of_user = {
-            "level_one_commission_paid": level_one_commission_paid_status.exists(),
-            "level_two_commission_paid": level_two_commission_paid_status.exists(),
-            "level_three_commission_paid": level_three_commission_paid_status.exists(),
-            "level_four_commission_paid": level_four_commission_paid_status.exists(),
-        }
+        for level in ("one", "two", "three", "four"):
+            commission_paid_status_of_user[f"level_{level}_commission_paid"] = any(
+                getattr(customer, f"is_level_{level}_commission_paid")
+                and not getattr(customer, f"is_user_got_notified_for_level_{level}_commission_paid")
+                for customer in user_customers
+            )
 
         return commission_paid_status_of_user
 
-    
-    def get_user_info_for_mobile(self, request):
-        data = {
-            'status': 'success',
-            'message': 'User Infomation!!!',
-        }
-        
-        user = RegisterUser.objects.filter(user=request.user).first()
+    def build_user_info_for_mobile(self, request):
+        user = RegisterUser.objects.select_related(
+            'district__state', 'referred_by__user__user',
+        ).filter(user=request.user).first()
 
         if not user:
-            data['status'] = 'error'
-            data['message'] = 'User Not Found'
-            return Response(data, status=status.HTTP_200_OK)
-
-        customer = Z2HCustomers.objects.filter(id=user.referred_by.id).first()
+            return None
 
-        referrer = RegisterUser.objects.filter(user=customer.user).first()
+        customer = user.referred_by
+        referrer = getattr(customer.user, 'user', None) if customer else None
 
-        user_customer = Z2HCustomers.objects.filter(user=request.user).first()
+        user_customers = list(Z2HCustomers.objects.filter(user=request.user).order_by('id'))
+        user_customer = user_customers[0] if user_customers else None
 
-        enable_payment, is_existing_user = self.get_check_user(request)
+        enable_payment, is_existing_user = self.get_check_user(user_customers)
 
         registered_users_under_user = self.get_registered_users_under_user(request)
 
-        product_purchased_users_under_user = self.get_product_purchased_users_under_user(request)
+        product_purchased_users_under_user = self.get_product_purchased_users_under_user(user_customers)
 
-        level_completed_status_of_user = self.get_level_completed_status_of_user(request)
+        level_completed_status_of_user = self.get_level_completed_status_of_user(user_customers)
 
-        commission_paid_status_of_user = self.get_commission_paid_status_of_user(request)
+        commission_paid_status_of_user = self.get_commission_paid_status_of_user(user_customers)
         
         user_info = {
             'registered_date': user.created,
@@ -310,12 +312,13 @@ class GetUserInfoView(APIView):
             'email_address': user.email_address,
             'district': user.district.name,
             'state': user.district.state.name,
-            'referrer_uid': customer.customer_number,
-            'referrer_name': referrer.name,
-            'referrer_city': referrer.city,
-            'referrer_town': referrer.town,
-            'referrer_mobile_number': referrer.mobile_number,
+            'referrer_uid': customer.customer_number if customer else None,
+            'referrer_name': referrer.name if referrer else None,
+            'referrer_city': referrer.city if referrer else None,
+            'referrer_town': referrer.town if referrer else None,
+            'referrer_mobile_number': referrer.mobile_number if referrer else None,
             'profile_photo_path': user.profile_photo_path,
+            'profile_photo_variants': user.profile_photo_variants,
             'enable_payment': enable_payment,
             "is_existing_user": is_existing_user,
             "user_customer_uid": user_customer.uid if user_customer else None,
@@ -328,9 +331,31 @@ class GetUserInfoView(APIView):
             "commission_paid_status_of_user": commission_paid_status_of_user,
         }
 
+        return user_info
+
+    def get_user_info_for_mobile(self, request):
+        data = {
+            'status': 'success',
+            'message': 'User Infomation!!!',
+        }
+
+        user_info, etag = get_cached_user_info(request.user.id, lambda: self.build_user_info_for_mobile(request))
+
+        if not user_info:
+            data['status'] = 'error'
+            data['message'] = 'User Not Found'
+            return Response(data, status=status.HTTP_200_OK)
+
+        etag = quote_etag(etag)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and etag in parse_etags(if_none_match):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
         data['user_info'] = user_info
 
-        return Response(data, status=status.HTTP_200_OK)
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
 
     def get(self, request, *args, **kwargs):
         accessed_from = request.GET.get('accessed_from', None)
@@ -351,7 +376,7 @@ class GetUserInfoView(APIView):
         return Response(data, status=status.HTTP_200_OK)
     
 class UserLogoutView(APIView):
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
@@ -359,11 +384,11 @@ class UserLogoutView(APIView):
             'status': 'success',
             'message': 'Logout Successful',
         }
-        request.user.auth_token.delete()
+        request.auth.delete()
         return Response(data, status=status.HTTP_200_OK)
     
 class UpdatePasswordView(APIView):
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def patch(self, request, *args, **kwargs):
@@ -452,7 +477,8 @@ class RegisterUserView(APIView):
                 }
                 return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
 
-            serializer.save()
+            register_user = serializer.save()
+            notify_user_registration(register_user)
 
             user_uid = Z2HUser.objects.get(email=new_user_password['email']).uid
 
@@ -512,6 +538,7 @@ class RegisterUserView(APIView):
             address=address,
             pin_code=pin_code,
         )
+        invalidate_user_info(user.id)
 
         if user_status == 'Active':
             user.is_active = True
@@ -524,7 +551,7 @@ class RegisterUserView(APIView):
         return Response(data, status=status.HTTP_200_OK)
     
 class UpdateRegisterUderDetailsView(APIView):
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
@@ -633,7 +660,7 @@ class ForgotPasswordView(APIView):
         return Response(data=data, status=status.HTTP_200_OK)
 
 class WebUserViewSet(viewsets.ModelViewSet):
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = RegisterUserSerializer
     queryset = RegisterUser.objects.all()
@@ -666,7 +693,7 @@ class WebUserViewSet(viewsets.ModelViewSet):
     def get_update_user_role(self, email):
         user = Z2HUser.objects.filter(email=email).first()
         register_user = RegisterUser.objects.filter(user=user).first()
-        role = Role.objects.filter(id=register_user.role.id).first()
+        role = get_role_by_id(register_user.role_id)
 
         Z2HUserRoles.objects.create(user_uid=user.uid, role_uid=role.uid)
 
@@ -700,20 +727,48 @@ class WebUserViewSet(viewsets.ModelViewSet):
         data['message'] = serializer.errors
         return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
     
+    def get_registered_users_csv_response(self, register_users):
+        register_user_rows = register_users.values_list(
+            'name', 'mobile_number', 'email_address', 'referrer_customer_number', 'referred_by__user__name', 'district__name',
+            'district__state__name', 'created',
+        )
+
+        file_headers = ['NAME', 'MOBILE NO.', 'EMAIL', 'REFERRER ID', 'REFERRER NAME', 'DISTRICT', 'STATE', 'REGISTERED DATE']
+
+        def get_register_user_rows():
+            for (
+                name, mobile_number, email_address, referrer_id, referrer_name, district, state, created,
+            ) in register_user_rows.iterator(chunk_size=2000):
+                yield [name, mobile_number, email_address, referrer_id, referrer_name, district, state, created.strftime("%d-%m-%Y")]
+
+        return stream_csv_response('registered_users.csv', file_headers, get_register_user_rows())
+
     @action(detail=False, methods=['GET', ], url_path='registered_users', url_name='registered-users')
     def get_registered_users(self, request, *args, **kwargs):
-        customers = Z2HCustomers.objects.all().values_list('user', flat=True)
+        # Registered users who have not bought a plan yet
+        register_user = RegisterUserDetailsSerializer.setup_eager_loading(
+            RegisterUser.objects.filter(
+                ~Exists(Z2HCustomers.objects.filter(user_id=OuterRef('user_id'))),
+                is_active=True,
+                is_admin_user=False,
+            ).order_by('id')
+        )
 
-        register_user = RegisterUser.objects.exclude(
-            Q(user__id__in=list(customers))
-        ).filter(is_active=True, is_admin_user=False).order_by('id')
+        if request.query_params.get('export', None) == 'csv':
+            return self.get_registered_users_csv_response(register_user)
 
         data = {
             "status": "success",
             "message": "Registered Users Fetched Successfully!!!",
-            "data": RegisterUserDetailsSerializer(register_user, many=True).data,
         }
 
+        try:
+            register_user = get_report_page(request, register_user, data)
+        except ValueError as e:
+            return Response({"status": "Error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data["data"] = RegisterUserDetailsSerializer(register_user, many=True).data
+
         return Response(data=data, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['DELETE', ], url_path='delete_registered_user', url_name='delete-registered-user')
@@ -729,7 +784,7 @@ class WebUserViewSet(viewsets.ModelViewSet):
         return Response(data={"status": "success"}, status=status.HTTP_200_OK)
 
 class CustomerViewSet(viewsets.ModelViewSet):
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CustomerSerializer
     queryset = Z2HCustomers.objects.all()
@@ -737,39 +792,37 @@ class CustomerViewSet(viewsets.ModelViewSet):
     lookup_url_kwarg = 'uid'
     lookup_value_regex = LOOKUP_REGEX
 
-    def get_paginationData(self, queryset, page="1", rowsPerPage="10"):
-        paginator = Paginator(queryset, rowsPerPage)
-        page_obj = paginator.get_page(page)
-        data = {
-            "data": page_obj.object_list,
-            "total_page_count":round(queryset.count()/int(rowsPerPage)),
-        }
-        return data
+    def get_paginationData(self, queryset, page=1, rowsPerPage=DEFAULT_ROWS_PER_PAGE):
+        return get_page_pagination_data(queryset, page, rowsPerPage)
     
     def get_queryset(self):
-        queryset = self.queryset.filter(is_active=True).order_by('id')
-        
-        first_record = queryset.first()
-        if first_record:
-            queryset = queryset.exclude(id=first_record.id)
+        # The first customer is the admin root of the referral tree and is never listed
+        first_customer_id = Z2HCustomers.objects.filter(is_active=True).order_by('id').values('id')[:1]
 
-        return queryset
+        return CustomerSerializer.setup_eager_loading(
+            self.queryset.filter(is_active=True).exclude(id=Subquery(first_customer_id)).order_by('id')
+        )
     
     def list(self, request, *args, **kwargs): 
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        page = self.request.query_params.get('page', None)
-        rowsPerPage = self.request.query_params.get('rowsPerPage', None)
 
-        pagination_data = self.get_paginationData(queryset, page=page, rowsPerPage=rowsPerPage)
+        try:
+            page = get_page_number(request, default=1)
+            rowsPerPage = get_rows_per_page(request)
+
+            if CURSOR_QUERY_PARAM in self.request.query_params:
+                pagination_data = get_cursor_pagination_data(request, queryset, ('id', ), rowsPerPage)
+            else:
+                pagination_data = self.get_paginationData(queryset, page=page, rowsPerPage=rowsPerPage)
+        except ValueError as e:
+            return Response({"status": "Error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         pagination_data['data'] = self.get_serializer(pagination_data['data'], many=True).data
         return Response(pagination_data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['GET', ], url_path='customer_details', url_name='customer-details')
     def get_customer_details(self, request, *args, **kwargs):
         customer_uid = request.query_params.get('customer_uid', None)
-        page = request.query_params.get('page', None)
-        row_per_page = request.query_params.get('rowPerPage', None)
         
         if not customer_uid:
             data = {
@@ -778,401 +831,133 @@ class CustomerViewSet(viewsets.ModelViewSet):
             }
             return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
 
-        customer = Z2HCustomers.objects.filter(uid=customer_uid).first()
-
-        first_level_customers = Z2HCustomers.objects.filter(referrer=customer)
-        first_level_customers_data = CustomerSerializer(first_level_customers, many=True).data
+        try:
+            page = get_page_number(request)
+            row_per_page = get_rows_per_page(request, 'rowPerPage')
+        except ValueError as e:
+            return Response({"status": "Error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        second_level_customers = Z2HCustomers.objects.filter(referrer__in=first_level_customers)
-        second_level_customers_data = CustomerSerializer(second_level_customers, many=True).data
+        customer = CustomerSerializer.setup_eager_loading(Z2HCustomers.objects.filter(uid=customer_uid)).first()
 
-        third_level_customers = Z2HCustomers.objects.filter(referrer__in=second_level_customers)
-        third_level_customers_data = CustomerSerializer(third_level_customers, many=True).data
-
-        fourth_level_customers = Z2HCustomers.objects.filter(referrer__in=third_level_customers)
-        fourth_level_customers_data = CustomerSerializer(fourth_level_customers, many=True).data
+        if not customer:
+            return Response(data={"status": "Error", "message": "Customer Not Found!!!"}, status=status.HTTP_404_NOT_FOUND)
 
         data = {
             "customer": CustomerSerializer(customer).data,
-            "first_level_customers": first_level_customers_data,
-            "second_level_customers": second_level_customers_data,
-            "third_level_customers": third_level_customers_data,
-            "fourth_level_customers": fourth_level_customers_data,
         }
 
-        return Response(data=data, status=status.HTTP_200_OK)
-    
-    def get_level_one_customers_not_got_paid_commission(self, commission_from_date, commission_to_date):
-        customers_not_got_paid_for_level_one_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_one_completed_date__gte=commission_from_date) & Q(level_one_completed_date__lte=commission_to_date)
-        )
-
-        customers_not_got_paid_for_level_one_completion = customers_not_got_paid_for_level_one_completion_within_dates.filter(
-            Q(is_level_one_completed=True) & Q(is_level_one_commission_paid=False)
-        )
-
-        return customers_not_got_paid_for_level_one_completion
-    
-    def get_level_one_customers_got_paid_commission(self, commission_from_date, commission_to_date):
-        customers_got_paid_for_level_one_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_one_completed_date__gte=commission_from_date) & Q(level_one_completed_date__lte=commission_to_date)
-        )
-
-        customers_got_paid_for_level_one_completion = customers_got_paid_for_level_one_completion_within_dates.filter(
-            Q(is_level_one_completed=True) & Q(is_level_one_commission_paid=True)
-        )
-
-        return customers_got_paid_for_level_one_completion
-    
-    def get_level_one_customers_commission(self, commission_from_date, commission_to_date):
-        customers_for_level_one_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_one_completed_date__gte=commission_from_date) & Q(level_one_completed_date__lte=commission_to_date)
-        )
-
-        customers_for_level_one_completion = customers_for_level_one_completion_within_dates.filter(
-            Q(is_level_one_completed=True)
-        )
-
-        return customers_for_level_one_completion
-    
-    def get_level_one_customers_with_issue_in_payments(self, commission_from_date, commission_to_date):
-        customers_for_level_one_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_one_completed_date__gte=commission_from_date) & Q(level_one_completed_date__lte=commission_to_date)
-        )
-
-        customers_for_level_one_completion = customers_for_level_one_completion_within_dates.filter(
-            Q(is_level_one_completed=True) & Q(is_level_one_payment_issue=True)
-        )
-
-        return customers_for_level_one_completion
-    
-    def get_level_two_customers_not_got_paid_commission(self, commission_from_date, commission_to_date):
-        customers_not_got_paid_for_level_two_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_two_completed_date__gte=commission_from_date) & Q(level_two_completed_date__lte=commission_to_date)
-        )
-
-        customers_not_got_paid_for_level_two_completion = customers_not_got_paid_for_level_two_completion_within_dates.filter(
-            Q(is_level_two_completed=True) & Q(is_level_two_commission_paid=False)
-        )
-
-        return customers_not_got_paid_for_level_two_completion
-    
-    def get_level_two_customers_got_paid_commission(self, commission_from_date, commission_to_date):
-        customers_got_paid_for_level_two_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_two_completed_date__gte=commission_from_date) & Q(level_two_completed_date__lte=commission_to_date)
-        )
-
-        customers_got_paid_for_level_two_completion = customers_got_paid_for_level_two_completion_within_dates.filter(
-            Q(is_level_two_completed=True) & Q(is_level_two_commission_paid=True)
-        )
-
-        return customers_got_paid_for_level_two_completion
-    
-    def get_level_two_customers_commission(self, commission_from_date, commission_to_date):
-        customers_for_level_two_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_two_completed_date__gte=commission_from_date) & Q(level_two_completed_date__lte=commission_to_date)
-        )
-
-        customers_for_level_two_completion = customers_for_level_two_completion_within_dates.filter(
-            Q(is_level_two_completed=True)
-        )
-
-        return customers_for_level_two_completion
-    
-    def get_level_two_customers_with_issue_in_payments(self, commission_from_date, commission_to_date):
-        customers_for_level_two_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_two_completed_date__gte=commission_from_date) & Q(level_two_completed_date__lte=commission_to_date)
-        )
-
-        customers_for_level_two_completion = customers_for_level_two_completion_within_dates.filter(
-            Q(is_level_two_completed=True) & Q(is_level_two_payment_issue=True)
-        )
-
-        return customers_for_level_two_completion
-    
-    def get_level_three_customers_not_got_paid_commission(self, commission_from_date, commission_to_date):
-        customers_not_got_paid_for_level_three_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_three_completed_date__gte=commission_from_date) & Q(level_three_completed_date__lte=commission_to_date)
-        )
-
-        customers_not_got_paid_for_level_three_completion = customers_not_got_paid_for_level_three_completion_within_dates.filter(
-            Q(is_level_three_completed=True) & Q(is_level_three_commission_paid=False)
-        )
-
-        return customers_not_got_paid_for_level_three_completion
-    
-    def get_level_three_customers_got_paid_commission(self, commission_from_date, commission_to_date):
-        customers_got_paid_for_level_three_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_three_completed_date__gte=commission_from_date) & Q(level_three_completed_date__lte=commission_to_date)
-        )
-
-        customers_got_paid_for_level_three_completion = customers_got_paid_for_level_three_completion_within_dates.filter(
-            Q(is_level_three_completed=True) & Q(is_level_three_commission_paid=True)
-        )
-
-        return customers_got_paid_for_level_three_completion
-    
-    def get_level_three_customers_commission(self, commission_from_date, commission_to_date):
-        customers_for_level_three_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_three_completed_date__gte=commission_from_date) & Q(level_three_completed_date__lte=commission_to_date)
-        )
-
-        customers_for_level_three_completion = customers_for_level_three_completion_within_dates.filter(
-            Q(is_level_three_completed=True)
-        )
-
-        return customers_for_level_three_completion
-    
-    def get_level_three_customers_with_issue_in_payments(self, commission_from_date, commission_to_date):
-        customers_for_level_three_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_three_completed_date__gte=commission_from_date) & Q(level_three_completed_date__lte=commission_to_date)
-        )
-
-        customers_for_level_three_completion = customers_for_level_three_completion_within_dates.filter(
-            Q(is_level_three_completed=True) & Q(is_level_three_payment_issue=True)
-        )
-
-        return customers_for_level_three_completion
-    
-    def get_level_four_customers_not_got_paid_commission(self, commission_from_date, commission_to_date):
-        customers_not_got_paid_for_level_four_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_four_completed_date__gte=commission_from_date) & Q(level_four_completed_date__lte=commission_to_date)
-        )
-
-        customers_not_got_paid_for_level_four_completion = customers_not_got_paid_for_level_four_completion_within_dates.filter(
-            Q(is_level_four_completed=True) & Q(is_level_four_commission_paid=False)
-        )
-
-        return customers_not_got_paid_for_level_four_completion
-    
-    def get_level_four_customers_got_paid_commission(self, commission_from_date, commission_to_date):
-        customers_got_paid_for_level_four_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_four_completed_date__gte=commission_from_date) & Q(level_four_completed_date__lte=commission_to_date)
-        )
-
-        customers_got_paid_for_level_four_completion = customers_got_paid_for_level_four_completion_within_dates.filter(
-            Q(is_level_four_completed=True) & Q(is_level_four_commission_paid=True)
-        )
-
-        return customers_got_paid_for_level_four_completion
-    
-    def get_level_four_customers_commission(self, commission_from_date, commission_to_date):
-        customers_for_level_four_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_four_completed_date__gte=commission_from_date) & Q(level_four_completed_date__lte=commission_to_date)
-        )
-
-        customers_for_level_four_completion = customers_for_level_four_completion_within_dates.filter(
-            Q(is_level_four_completed=True)
-        )
-
-        return customers_for_level_four_completion
-    
-    def get_level_four_customers_with_issue_in_payments(self, commission_from_date, commission_to_date):
-        customers_for_level_four_completion_within_dates = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(level_four_completed_date__gte=commission_from_date) & Q(level_four_completed_date__lte=commission_to_date)
-        )
-
-        customers_for_level_four_completion = customers_for_level_four_completion_within_dates.filter(
-            Q(is_level_four_completed=True) & Q(is_level_four_payment_issue=True)
-        )
-
-        return customers_for_level_four_completion
-    
-    def get_all_customers_not_got_paid_commission(self, commission_from_date, commission_to_date):
-        first_level = self.get_level_one_customers_not_got_paid_commission(
-            commission_from_date, commission_to_date
-        )
-
-        second_level = self.get_level_two_customers_not_got_paid_commission(
-            commission_from_date, commission_to_date
-        )
-
-        third_level = self.get_level_three_customers_not_got_paid_commission(
-            commission_from_date, commission_to_date
-        )
-
-        fourth_level = self.get_level_four_customers_not_got_paid_commission(
-            commission_from_date, commission_to_date
-        )
-
-        commission_queryset = first_level | second_level | third_level | fourth_level
-        
-        return commission_queryset
-    
-    def get_all_customers_got_paid_commission(self, commission_from_date, commission_to_date):
-        first_level = self.get_level_one_customers_got_paid_commission(
-            commission_from_date, commission_to_date
-        )
-
-        second_level = self.get_level_two_customers_got_paid_commission(
-            commission_from_date, commission_to_date
-        )
-
-        third_level = self.get_level_three_customers_got_paid_commission(
-            commission_from_date, commission_to_date
-        )
-
-        fourth_level = self.get_level_four_customers_got_paid_commission(
-            commission_from_date, commission_to_date
-        )
-
-        commission_queryset = first_level | second_level | third_level | fourth_level
-
-        return commission_queryset
-    
-    def get_all_level_customers_commission(self, commission_from_date, commission_to_date):
-        first_level = self.get_level_one_customers_commission(
-            commission_from_date, commission_to_date
-        )
-
-        second_level = self.get_level_two_customers_commission(
-            commission_from_date, commission_to_date
-        )
-
-        third_level = self.get_level_three_customers_commission(
-            commission_from_date, commission_to_date
-        )
+        # Each level is one indexed lookup on the referral tree; with page given, only that page of every level is serialized
+        for level, level_name in DOWNLINE_LEVEL_NAMES.items():
+            level_customers = CustomerSerializer.setup_eager_loading(self.get_downline_queryset(customer, level))
 
-        fourth_level = self.get_level_four_customers_commission(
-            commission_from_date, commission_to_date
-        )
-
-        commission_queryset = first_level | second_level | third_level | fourth_level
-
-        return commission_queryset
-    
-    def get_all_customers_with_issue_in_payments(self, commission_from_date, commission_to_date):
-        first_level = self.get_level_one_customers_with_issue_in_payments(
-            commission_from_date, commission_to_date
-        )
+            if page:
+                pagination_data = get_page_pagination_data(level_customers, page, row_per_page)
+                level_customers = pagination_data['data']
+                data[f"{level_name}_level_total_page_count"] = pagination_data['total_page_count']
 
-        second_level = self.get_level_two_customers_with_issue_in_payments(
-            commission_from_date, commission_to_date
-        )
-
-        third_level = self.get_level_three_customers_with_issue_in_payments(
-            commission_from_date, commission_to_date
-        )
+            data[f"{level_name}_level_customers"] = CustomerSerializer(level_customers, many=True).data
 
-        fourth_level = self.get_level_four_customers_with_issue_in_payments(
-            commission_from_date, commission_to_date
-        )
+        return Response(data=data, status=status.HTTP_200_OK)
 
-        commission_queryset = first_level | second_level | third_level | fourth_level
+    def get_downline_queryset(self, customer, level):
+        return Z2HCustomers.objects.filter(ancestor_paths__ancestor=customer, ancestor_paths__depth=level).order_by('id')
 
-        return commission_queryset
-    
-    def get_queryset_for_unpaid_commission_status(self, commission_level, commission_from_date, commission_to_date):
-        if commission_level == 'One':
-            commission_queryset = self.get_level_one_customers_not_got_paid_commission(
-                commission_from_date, commission_to_date
-            )
+    @action(detail=False, methods=['GET', ], url_path='downline', url_name='downline')
+    def get_downline(self, request, *args, **kwargs):
+        """
+        Per-level downline counts of a customer, or with level given, one cursor page of the customers at that level.
+        """
+        customer_uid = request.query_params.get('customer_uid', None)
+        level = request.query_params.get('level', None)
 
-        if commission_level == 'Two':
-            commission_queryset = self.get_level_two_customers_not_got_paid_commission(
-                commission_from_date, commission_to_date
+        if not customer_uid:
+            return Response(
+                data={"status": "Error", "message": "Customer UID is required!!!"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        if commission_level == 'Three':
-            commission_queryset = self.get_level_three_customers_not_got_paid_commission(
-                commission_from_date, commission_to_date
-            )
+        customer = DownlineMemberSerializer.setup_eager_loading(Z2HCustomers.objects.filter(uid=customer_uid)).first()
 
-        if commission_level == 'Four':
-            commission_queryset = self.get_level_four_customers_not_got_paid_commission(
-                commission_from_date, commission_to_date
-            )
+        if not customer:
+            return Response(data={"status": "Error", "message": "Customer Not Found!!!"}, status=status.HTTP_404_NOT_FOUND)
 
-        if commission_level == 'All':
-            commission_queryset = self.get_all_customers_not_got_paid_commission(
-                commission_from_date, commission_to_date
-            )
+        data = {
+            "status": "success",
+            "message": "Downline Fetched Successfully!!!",
+            "customer": DownlineMemberSerializer(customer).data,
+        }
 
-        return commission_queryset
-    
-    def get_queryset_for_paid_commission_status(self, commission_level, commission_from_date, commission_to_date):
-        if commission_level == 'One':
-            commission_queryset = self.get_level_one_customers_got_paid_commission(
-                commission_from_date, commission_to_date
-            )
+        if not level:
+            return Response(data=data, status=status.HTTP_200_OK)
 
-        if commission_level == 'Two':
-            commission_queryset = self.get_level_two_customers_got_paid_commission(
-                commission_from_date, commission_to_date
-            )
+        if not level.isdigit() or int(level) not in REFERRAL_LEVEL_NAMES:
+            return Response(data={"status": "Error", "message": "Invalid level!!!"}, status=status.HTTP_400_BAD_REQUEST)
 
-        if commission_level == 'Three':
-            commission_queryset = self.get_level_three_customers_got_paid_commission(
-                commission_from_date, commission_to_date
-            )
+        level_customers = DownlineMemberSerializer.setup_eager_loading(self.get_downline_queryset(customer, int(level)))
 
-        if commission_level == 'Four':
-            commission_queryset = self.get_level_four_customers_got_paid_commission(
-                commission_from_date, commission_to_date
-            )
+        try:
+            pagination_data = get_cursor_pagination_data(request, level_customers, ('id', ), get_rows_per_page(request))
+        except ValueError as e:
+            return Response({"status": "Error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if commission_level == 'All':
-            commission_queryset = self.get_all_customers_got_paid_commission(
-                commission_from_date, commission_to_date
-            )
+        data["level"] = int(level)
+        data["customers"] = DownlineMemberSerializer(pagination_data.pop('data'), many=True).data
+        data.update(pagination_data)
 
-        return commission_queryset
+        return Response(data=data, status=status.HTTP_200_OK)
     
-    def get_queryset_for_all_commission_status(self, commission_level, commission_from_date, commission_to_date):
-        if commission_level == 'One':
-            commission_queryset = self.get_level_one_customers_commission(
-                commission_from_date, commission_to_date
-            )
+    def get_commission_queryset(self, commission_level, commission_status, commission_from_date, commission_to_date):
+        commissions = Z2HCommissions.objects.all()
 
-        if commission_level == 'Two':
-            commission_queryset = self.get_level_two_customers_commission(
-                commission_from_date, commission_to_date
-            )
+        if commission_from_date:
+            commissions = commissions.filter(completed_date__gte=commission_from_date)
 
-        if commission_level == 'Three':
-            commission_queryset = self.get_level_three_customers_commission(
-                commission_from_date, commission_to_date
-            )
+        if commission_to_date:
+            commissions = commissions.filter(completed_date__lte=commission_to_date)
 
-        if commission_level == 'Four':
-            commission_queryset = self.get_level_four_customers_commission(
-                commission_from_date, commission_to_date
-            )
+        if commission_level != 'All':
+            commissions = commissions.filter(level=COMMISSION_LEVEL_NUMBERS[commission_level])
 
-        if commission_level == 'All':
-            commission_queryset = self.get_all_level_customers_commission(
-                commission_from_date, commission_to_date
-            )
+        if commission_status != 'All':
+            commissions = commissions.filter(status__in=COMMISSION_STATUS_FILTERS[commission_status])
 
-        return commission_queryset
+        return commissions
     
-    def get_queryset_for_issue_with_payments(self, commission_level, commission_from_date, commission_to_date):
-        if commission_level == 'One':
-            commission_queryset = self.get_level_one_customers_with_issue_in_payments(
-                commission_from_date, commission_to_date
-            )
-
-        if commission_level == 'Two':
-            commission_queryset = self.get_level_two_customers_with_issue_in_payments(
-                commission_from_date, commission_to_date
-            )
-
-        if commission_level == 'Three':
-            commission_queryset = self.get_level_three_customers_with_issue_in_payments(
-                commission_from_date, commission_to_date
-            )
-
-        if commission_level == 'Four':
-            commission_queryset = self.get_level_four_customers_with_issue_in_payments(
-                commission_from_date, commission_to_date
-            )
-
-        if commission_level == 'All':
-            commission_queryset = self.get_all_customers_with_issue_in_payments(
-                commission_from_date, commission_to_date
-            )
-
-        return commission_queryset
+    def get_commission_csv_response(self, commissions):
+        commission_rows = commissions.values_list(
+            'customer__customer_number', 'customer__user__name', 'customer__user__user__mobile_number', 'level', 'completed_date',
+            'commission_amount', 'tds_amount', 'amount_payable', 'status', 'paid_date', 'comments', 'customer__user__user__name_of_bank',
+            'customer__user__user__account_number', 'customer__user__user__ifsc_code', 'customer__user__user__pan',
+        ).order_by('customer_id', 'level')
+
+        file_headers = [
+            'CUSTOMER NUMBER', 'CUSTOMER NAME', 'MOBILE NO.', 'LEVEL', 'COMPLETION DATE', 'COMMISSION AMOUNT', 'TDS AMOUNT', 
+            'AMOUNT PAYABLE', 'STATUS', 'PAID DATE', 'COMMENTS', 'BANK', 'ACCOUNT NUMBER', 'IFSC CODE', 'PAN',
+        ]
+
+        def get_commission_rows():
+            for (
+                customer_number, customer_name, mobile_number, level, completed_date, commission_amount, tds_amount, amount_payable,
+                commission_status, paid_date, comments, name_of_bank, account_number, ifsc_code, pan,
+            ) in commission_rows.iterator(chunk_size=2000):
+                yield [
+                    customer_number,
+                    customer_name,
+                    mobile_number,
+                    COMMISSION_LEVEL_NAMES[level],
+                    completed_date.strftime("%d-%m-%Y") if completed_date else None,
+                    commission_amount,
+                    tds_amount,
+                    amount_payable,
+                    COMMISSION_STATUS_NAMES[commission_status],
+                    paid_date.strftime("%d-%m-%Y") if paid_date else None,
+                    comments,
+                    name_of_bank,
+                    account_number,
+                    ifsc_code.upper() if ifsc_code else "",
+                    pan.upper() if pan else "",
+                ]
+
+        return stream_csv_response('commissions.csv', file_headers, get_commission_rows())
     
     @action(detail=False, methods=['GET', ], url_path="commission_details", url_name="commission-details")
     def get_commission_details(self, request, *args, **kwargs):
@@ -1180,11 +965,17 @@ class CustomerViewSet(viewsets.ModelViewSet):
         commission_to_date = request.query_params.get('commission_to_date', None)
         commission_status = request.query_params.get('commission_status', None)
         commission_level = request.query_params.get('commission_level', None)
-        
-        unpaid_status = 'Yet to be paid'
-        paid_status = 'Paid'
-        payment_issue = 'Issue with payments'
-        all_status = 'All'
+        try:
+            page = get_page_number(request)
+            rowsPerPage = get_rows_per_page(request)
+        except ValueError as e:
+            return Response({"status": "Error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if commission_status != 'All' and commission_status not in COMMISSION_STATUS_FILTERS:
+            return Response(data={"status": "Error", "message": "Invalid commission status!!!"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if commission_level != 'All' and commission_level not in COMMISSION_LEVEL_NUMBERS:
+            return Response(data={"status": "Error", "message": "Invalid commission level!!!"}, status=status.HTTP_400_BAD_REQUEST)
 
         if commission_from_date:
             commission_from_date = timezone.make_aware(
@@ -1195,36 +986,35 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 timezone.datetime.combine(parse_date(commission_to_date), timezone.datetime.max.time())
             )
 
-        if commission_status == unpaid_status:
-            commission_queryset = self.get_queryset_for_unpaid_commission_status(
-                commission_level, commission_from_date, commission_to_date
-            )
+        commissions = self.get_commission_queryset(commission_level, commission_status, commission_from_date, commission_to_date)
 
-        if commission_status == paid_status:
-            commission_queryset = self.get_queryset_for_paid_commission_status(
-                commission_level, commission_from_date, commission_to_date
-            )
-
-        if commission_status == all_status:
-            commission_queryset = self.get_queryset_for_all_commission_status(
-                commission_level, commission_from_date, commission_to_date
-            )
+        if request.query_params.get('export', None) == 'csv':
+            return self.get_commission_csv_response(commissions)
 
-        if commission_status == payment_issue:
-            commission_queryset = self.get_queryset_for_issue_with_payments(
-                commission_level, commission_from_date, commission_to_date
-            )
-
-        commission_queryset_ordered = commission_queryset.order_by('id')
-
-        commission_data = Z2HCommissionSerializer(commission_queryset_ordered, many=True, context={'request': request}).data
+        commission_queryset = Z2HCommissionSerializer.setup_eager_loading(
+            Z2HCustomers.objects.filter(id__in=commissions.values('customer_id')).order_by('id')
+        )
 
         data = {
             "status": "success",
             "message": "Commission Details Fetched Successfully!!!",
-            "commissions": commission_data,
         }
 
+        if CURSOR_QUERY_PARAM in request.query_params:
+            try:
+                pagination_data = get_cursor_pagination_data(request, commission_queryset, ('id', ), rowsPerPage)
+            except ValueError as e:
+                return Response({"status": "Error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            commission_queryset = pagination_data.pop('data')
+            data.update(pagination_data)
+        elif page:
+            pagination_data = self.get_paginationData(commission_queryset, page=page, rowsPerPage=rowsPerPage)
+            commission_queryset = pagination_data.pop('data')
+            data.update(pagination_data)
+
+        data["commissions"] = Z2HCommissionSerializer(commission_queryset, many=True, context={'request': request}).data
+
         return Response(data=data, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['PATCH', ], url_path="update_commission_details", url_name="update-commission-details")
@@ -1236,6 +1026,10 @@ class CustomerViewSet(viewsets.ModelViewSet):
         customer_number = request.data["customerNumber"]
 
         customer = Z2HCustomers.objects.get(customer_number=customer_number)
+        commission_level_number = COMMISSION_LEVEL_NUMBERS.get(commission_level)
+        was_commission_paid = commission_level_number and getattr(
+            customer, f"is_level_{REFERRAL_LEVEL_NAMES[commission_level_number]}_commission_paid"
+        )
 
         if commission_level == "One":
             customer.level_one_commission_paid_date = commission_pay_date
@@ -1275,6 +1069,12 @@ class CustomerViewSet(viewsets.ModelViewSet):
             
         customer.save()
 
+        if commission_level_number:
+            update_commission_payment(customer, commission_level_number, commission_pay_date, comments)
+
+            if commission_status == "paid" and not was_commission_paid:
+                notify_commission_paid(customer, commission_level_number)
+
         data = {
             "status": "success",
             "message": "Commission Details Updated Successfully!!!",
@@ -1284,72 +1084,102 @@ class CustomerViewSet(viewsets.ModelViewSet):
 
 class DashboardReportView(APIView):
     def get(self, request, *args, **kwargs):
+        if settings.DASHBOARD_SNAPSHOT_MAX_AGE:
+            snapshot = Z2HDashboardSnapshot.objects.filter(
+                created__gte=timezone.now() - timedelta(seconds=settings.DASHBOARD_SNAPSHOT_MAX_AGE)
+            ).order_by('-created').first()
 
-        orders = Z2HOrders.objects.all()
+            if snapshot:
+                return Response(data=snapshot.data, status=status.HTTP_200_OK)
 
-        yet_to_be_couriered_orders_count = orders.filter(order_status="yet_to_be_couriered").count()
-        in_transit_orders_count = orders.filter(order_status="in_transit").count()
-        delivered_orders_count = orders.filter(order_status="delivered").count()
-        cancelled_orders_count = orders.filter(order_status="cancelled").count()
+        data = build_dashboard_report()
 
-        customers = Z2HCustomers.objects.all().values_list('user', flat=True)
+        return Response(data=data, status=status.HTTP_200_OK)
+    
+def get_report_page(request, queryset, data):
+    """
+    Narrow a report queryset to the request's cursor or numbered page, adding the pagination keys to data.
+    Raises ValueError for an invalid page or rowsPerPage.
+    """
+    rows_per_page = get_rows_per_page(request)
+    page = get_page_number(request)
+
+    if CURSOR_QUERY_PARAM in request.query_params:
+        pagination_data = get_cursor_pagination_data(request, queryset, ('id', ), rows_per_page)
+    elif page:
+        pagination_data = get_page_pagination_data(queryset, page, rows_per_page)
+    else:
+        return queryset
 
-        register_user_count = RegisterUser.objects.exclude(
-            Q(user__id__in=list(customers))
-        ).filter(is_active=True, is_admin_user=False).count()
+    page_queryset = pagination_data.pop('data')
+    data.update(pagination_data)
 
-        customers_level_one_commission_not_got_paid_count = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(is_level_one_completed=True) & Q(is_level_one_commission_paid=False)
-        ).count()
+    return page_queryset
 
-        customer_level_two_commission_not_got_paid_count = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(is_level_two_completed=True) & Q(is_level_two_commission_paid=False)
-        ).count()
+class NoDownlineReportsView(APIView):
 
-        customer_level_three_commission_not_got_paid_count = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(is_level_three_completed=True) & Q(is_level_three_commission_paid=False)
-        ).count()
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
 
-        customer_level_four_commission_not_got_paid_count = Z2HCustomers.objects.exclude(is_admin_user=True).filter(
-            Q(is_level_four_completed=True) & Q(is_level_four_commission_paid=False)
-        ).count()
+    def get_queryset(self):
+        # Customers with no non-admin customer under them, ten days after they joined
+        return Z2HCustomers.objects.filter(
+            ~Exists(Z2HCustomers.objects.filter(referrer=OuterRef('pk')).exclude(is_admin_user=True)),
+            plan_start_date__lte=timezone.now() - timedelta(days=10),
+        ).exclude(is_admin_user=True).order_by('id')
+
+    def get_csv_response(self, queryset):
+        customer_rows = queryset.values_list(
+            'customer_number', 'user__name', 'user__user__mobile_number', 'plan_start_date', 'referrer__customer_number',
+            'referrer__user__name', 'referrer__user__user__mobile_number',
+        )
 
-        data = {
-            "yet_to_be_couriered_orders_count": yet_to_be_couriered_orders_count,
-            "in_transit_orders_count": in_transit_orders_count,
-            "delivered_orders_count": delivered_orders_count,
-            "cancelled_orders_count": cancelled_orders_count,
-            "register_user_count": register_user_count,
-            "customers_level_one_commission_not_got_paid_count": customers_level_one_commission_not_got_paid_count,
-            "customer_level_two_commission_not_got_paid_count": customer_level_two_commission_not_got_paid_count,
-            "customer_level_three_commission_not_got_paid_count": customer_level_three_commission_not_got_paid_count,
-            "customer_level_four_commission_not_got_paid_count": customer_level_four_commission_not_got_paid_count,
-        }
+        file_headers = [
+            'CUSTOMER NUMBER', 'CUSTOMER NAME', 'MOBILE NO.', 'REGISTER DATE', 'PENDING DAYS', 'REFERRER ID', 'REFERRER NAME',
+            'REFERRER MOBILE NO.',
+        ]
+
+        def get_customer_rows():
+            today = datetime.now().date()
+            for (
+                customer_number, customer_name, mobile_number, plan_start_date, referrer_id, referrer_name, referrer_mobile_number,
+            ) in customer_rows.iterator(chunk_size=2000):
+                yield [
+                    customer_number,
+                    customer_name,
+                    mobile_number,
+                    plan_start_date.strftime("%d-%m-%Y"),
+                    (today - plan_start_date.date()).days,
+                    referrer_id,
+                    referrer_name,
+                    referrer_mobile_number,
+                ]
+
+        return stream_csv_response('customers_not_got_downline.csv', file_headers, get_customer_rows())
 
-        return Response(data=data, status=status.HTTP_200_OK)
-    
-class NoDownlineReportsView(APIView):
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
 
-    authentication_classes = [authentication.TokenAuthentication]
-    permission_classes = [permissions.IsAuthenticated]
+        if request.query_params.get('export', None) == 'csv':
+            return self.get_csv_response(queryset)
 
-    def get(self, request, *args, **kwargs):
-        customer = Z2HCustomers.objects.exclude(is_admin_user=True).values_list('id', flat=True)
+        data = {}
 
-        customer_not_got_downline = Z2HCustomers.objects.exclude(
-            Q(customer__id__in=list(customer)) | Q(is_admin_user=True)
-        ).filter(plan_start_date__lte=timezone.now() - timedelta(days=10))
+        try:
+            customer_not_got_downline = get_report_page(
+                request, CustomerNotGotDownlineSerializer.setup_eager_loading(queryset), data,
+            )
+        except ValueError as e:
+            return Response({"status": "Error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        customer_not_got_downline_data = CustomerNotGotDownlineSerializer(customer_not_got_downline, many=True).data
+        data["customers_not_got_downline"] = CustomerNotGotDownlineSerializer(customer_not_got_downline, many=True).data
 
-        return Response(data={
-            "customers_not_got_downline": customer_not_got_downline_data
-        }, status=status.HTTP_200_OK)
+        return Response(data=data, status=status.HTTP_200_OK)
 
 
 class UpdateNotificationsView(APIView):
 
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_update_user_registration_status(self, register_uid):
@@ -1462,8 +1292,124 @@ class UpdateNotificationsView(APIView):
         if notification_type == "commission_payment" and customer_uid and level:
             self.get_update_commisison_paid_status(customer_uid, level)
 
+        acknowledge_legacy_notification(request.user, notification_type, register_uid, customer_uid, level)
+
+        # The flags above are set with queryset.update(), which sends no post_save
+        invalidate_user_info(request.user.id)
+
         data["status"] = "Success"
         data["message"] = "Notification Updated Successfully!!!"
 
         return Response(data=data, status=success_response)
 
+
+class NotificationsView(APIView):
+    """
+    Unread notifications from the outbox, oldest first, after the `after` id; `status=all` includes read ones.
+    Answers at once and never holds the worker: clients poll again after `retry_after` seconds.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        after = request.GET.get('after', None)
+        unread_only = request.GET.get('status', 'unread') != 'all'
+
+        try:
+            after = int(after) if after else None
+        except ValueError:
+            return Response({'status': 'error', 'message': 'Invalid after'}, status=status.HTTP_400_BAD_REQUEST)
+
+        notifications = get_notifications(request.user, after=after, unread_only=unread_only)
+
+        data = {
+            'status': 'success',
+            'message': 'Notifications!!!',
+            'data': notifications,
+            'last_id': notifications[-1]['id'] if notifications else after,
+            'retry_after': settings.NOTIFICATION_POLL_INTERVAL,
+        }
+
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class AcknowledgeNotificationsView(APIView):
+    """Mark notifications read in one call, either the listed `notificationUids` or every one up to the `upTo` id."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        notification_uids = request.data.get('notificationUids', None)
+        up_to = request.data.get('upTo', None)
+
+        if notification_uids is None and up_to is None:
+            return Response(
+                {'status': 'error', 'message': 'notificationUids or upTo is required'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            acknowledged_count = acknowledge_notifications(request.user, uids=notification_uids, up_to=up_to)
+        except (ValueError, ValidationError):
+            return Response(
+                {'status': 'error', 'message': 'Invalid notificationUids or upTo'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = {
+            'status': 'success',
+            'message': 'Notifications Acknowledged Successfully!!!',
+            'acknowledged_count': acknowledged_count,
+        }
+
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class NotificationStreamView(APIView):
+    """
+    Pushes unread notifications as server-sent events. Only served through the ASGI entry point (Z2H/asgi.py):
+    under WSGI the stream would pin a worker and be buffered, so it answers 501 and clients poll NotificationsView.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [EventStreamRenderer, JSONRenderer]
+
+    def get(self, request, *args, **kwargs):
+        if not is_asgi_request(request):
+            data = {
+                'status': 'error',
+                'message': 'Notification Stream Needs ASGI, Poll Notifications Instead!!!',
+                'retry_after': settings.NOTIFICATION_POLL_INTERVAL,
+            }
+
+            return Response(data, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        after = request.headers.get('Last-Event-ID') or request.GET.get('after', None)
+
+        try:
+            after = int(after) if after else None
+        except ValueError:
+            return Response({'status': 'error', 'message': 'Invalid Last-Event-ID'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            stream_notification_events(request.user, after=after), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+
+class AuthCacheStatsView(APIView):
+    """Token cache counters of the process that serves the request."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated, WebPagePermission]
+    web_page = 'settings'
+
+    def get(self, request, *args, **kwargs):
+        data = {
+            'status': 'success',
+            'message': 'Auth Cache Stats!!!',
+            'pid': os.getpid(),
+            'stats': get_auth_cache_stats(),
+        }
+
+        return Response(data, status=status.HTTP_200_OK)
@@ -2,7 +2,10 @@ from django.contrib import admin
 from apps.utils.models import (
     State,
     District,
-    Z2HSettings
+    Z2HSettings,
+    Z2HSequences,
+    Z2HUploads,
+    Z2HUploadSessions,
 )
 
 # Register your models here.
@@ -19,6 +22,21 @@ class DistrictAdmin(admin.ModelAdmin):
 class Z2HSettingsAdmin(admin.ModelAdmin):
     list_display = ('uid', 'name', 'description', 'value', 'is_active')
 
+class Z2HSequencesAdmin(admin.ModelAdmin):
+    list_display = ('uid', 'name', 'prefix', 'next_value', 'block_size', 'is_active')
+
+class Z2HUploadsAdmin(admin.ModelAdmin):
+    list_display = ('uid', 'upload_type', 'file_path', 'file_name', 'size', 'is_processed', 'created')
+    list_filter = ('upload_type', 'is_processed')
+    search_fields = ('sha256', 'file_path', 'file_name')
+
+class Z2HUploadSessionsAdmin(admin.ModelAdmin):
+    list_display = ('uid', 'created_by', 'upload_type', 'file_name', 'size', 'received_size', 'status', 'modified')
+    list_filter = ('upload_type', 'status')
+
 admin.site.register(State, StateAdmin)
 admin.site.register(District, DistrictAdmin)
-admin.site.register(Z2HSettings, Z2HSettingsAdmin)
\ No newline at end of file
+admin.site.register(Z2HSettings, Z2HSettingsAdmin)
+admin.site.register(Z2HSequences, Z2HSequencesAdmin)
+admin.site.register(Z2HUploads, Z2HUploadsAdmin)
+admin.site.register(Z2HUploadSessions, Z2HUploadSessionsAdmin)
\ No newline at end of file
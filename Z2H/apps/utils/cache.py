@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from apps.app.models import Z2HPlanDetails, Z2HWebPages, Z2HWebPageRoles
+from apps.user.models import Role, Z2HUserRoles
+
+# In-process tier in front of the shared cache, so hot lookups don't even cost a cache round trip.
+# Entries expire after CONFIG_LOCAL_CACHE_TIMEOUT, which bounds how stale other workers can be after a save,
+# and only the CONFIG_LOCAL_CACHE_SIZE most recently used are kept.
+# Access control lookups skip this tier: a revoked page must be refused by every worker at once.
+_local_cache = OrderedDict()
+_local_cache_lock = threading.Lock()
+
+def _get_or_load(key, loader, local=True):
+    now = time.monotonic()
+
+    if local:
+        with _local_cache_lock:
+            entry = _local_cache.get(key)
+            if entry and entry[0] > now:
+                _local_cache.move_to_end(key)
+                return entry[1]
+
+    value = cache.get(key)
+    if value is None:
+        value = loader()
+        if value is None:
+            return None
+
+        cache.set(key, value, settings.CONFIG_CACHE_TIMEOUT)
+
+    if local:
+        with _local_cache_lock:
+            _local_cache[key] = (now + settings.CONFIG_LOCAL_CACHE_TIMEOUT, value)
+            _local_cache.move_to_end(key)
+
+            while len(_local_cache) > settings.CONFIG_LOCAL_CACHE_SIZE:
+                _local_cache.popitem(last=False)
+
+    return value
+
+def _delete(keys):
+    cache.delete_many(keys)
+
+    with _local_cache_lock:
+        for key in keys:
+            _local_cache.pop(key, None)
+
+def _invalidate(*keys):
+    # Deleted once the change commits, so a reader in between cannot cache the old row again
+    transaction.on_commit(lambda: _delete(keys))
+
+def clear_config_cache():
+    with _local_cache_lock:
+        _local_cache.clear()
+
+def get_plan(uid):
+    """Return the Z2HPlanDetails with the given uid."""
+    return _get_or_load(f"config:plan:{uid}", lambda: Z2HPlanDetails.objects.filter(uid=uid).first())
+
+def get_plan_by_name(name):
+    """Return the Z2HPlanDetails with the given name."""
+    uid = _get_or_load(
+        f"config:plan_name:{name}",
+        lambda: Z2HPlanDetails.objects.filter(name=name).values_list('uid', flat=True).first(),
+    )
+
+    return get_plan(uid) if uid else None
+
+def get_role(uid):
+    """Return the Role with the given uid."""
+    return _get_or_load(f"config:role:{uid}", lambda: Role.objects.filter(uid=uid).first())
+
+def get_role_by_id(role_id):
+    """Return the Role with the given id."""
+    uid = _get_or_load(f"config:role_id:{role_id}", lambda: Role.objects.filter(id=role_id).values_list('uid', flat=True).first())
+
+    return get_role(uid) if uid else None
+
+def get_user_role_uid(user_uid):
+    """Return the uid of the role assigned to the user with the given uid."""
+    return _get_or_load(
+        f"config:user_role:{user_uid}",
+        lambda: Z2HUserRoles.objects.filter(user_uid=str(user_uid)).values_list('role_uid', flat=True).first(),
+        local=False,
+    )
+
+def get_web_page_names():
+    """Return the name of every web page keyed by its uid."""
+    return _get_or_load(
+        "config:web_pages",
+        lambda: {str(uid): name for uid, name in Z2HWebPages.objects.values_list('uid', 'name')},
+        local=False,
+    )
+
+def get_role_web_pages(role_uid):
+    """Return the names of the web pages a role can open."""
+    web_page_uids = _get_or_load(
+        f"config:role_web_pages:{role_uid}",
+        lambda: list(
+            Z2HWebPageRoles.objects.filter(role_uid=str(role_uid), is_active=True).values_list('web_page_uid', flat=True)
+        ),
+        local=False,
+    )
+    web_page_names = get_web_page_names()
+
+    return [web_page_names[uid] for uid in web_page_uids if uid in web_page_names]
+
+def get_user_web_pages(user):
+    """Return the names of the web pages a user can open through their role."""
+    role_uid = get_user_role_uid(user.uid)
+
+    return get_role_web_pages(role_uid) if role_uid else []
+
+def invalidate_role_web_pages(*role_uids):
+    _invalidate(*[f"config:role_web_pages:{role_uid}" for role_uid in role_uids])
+
+@receiver(pre_save, sender=Z2HPlanDetails)
+def remember_plan_name(sender, instance, **kwargs):
+    # A rename must also drop the entry cached under the previous name
+    instance._previous_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first() if instance.pk else None
+
+@receiver([post_save, post_delete], sender=Z2HPlanDetails)
+def invalidate_plan(sender, instance, **kwargs):
+    names = {instance.name, getattr(instance, '_previous_name', None)} - {None}
+
+    _invalidate(f"config:plan:{instance.uid}", *[f"config:plan_name:{name}" for name in names])
+
+@receiver([post_save, post_delete], sender=Role)
+def invalidate_role(sender, instance, **kwargs):
+    _invalidate(f"config:role:{instance.uid}", f"config:role_id:{instance.id}")
+
+@receiver([post_save, post_delete], sender=Z2HUserRoles)
+def invalidate_user_role(sender, instance, **kwargs):
+    _invalidate(f"config:user_role:{instance.user_uid}")
+
+@receiver([post_save, post_delete], sender=Z2HWebPages)
+def invalidate_web_pages(sender, instance, **kwargs):
+    _invalidate("config:web_pages")
+
+@receiver([post_save, post_delete], sender=Z2HWebPageRoles)
+def invalidate_web_page_role(sender, instance, **kwargs):
+    invalidate_role_web_pages(instance.role_uid)
@@ -0,0 +1,21 @@
+import csv
+from django.http import StreamingHttpResponse
+
+class Echo:
+    """File-like object whose write() returns the value, so csv.writer rows can be yielded."""
+
+    def write(self, value):
+        return value
+
+def stream_csv_response(file_name, headers, rows):
+    """Stream rows as a CSV attachment without building the file in memory."""
+    csv_writer = csv.writer(Echo())
+
+    def generate_csv_rows():
+        yield csv_writer.writerow(headers)
+        for row in rows:
+            yield csv_writer.writerow(row)
+
+    response = StreamingHttpResponse(generate_csv_rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    return response
@@ -0,0 +1,27 @@
+import shutil
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.utils.models import Z2HUploadSessions
+from apps.utils.uploads import get_session_dir
+
+class Command(BaseCommand):
+    help = "Delete video upload sessions that were abandoned or failed, together with their received chunks. Meant to be run periodically (cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help="Age in hours after which an unfinished session is abandoned.")
+
+    def handle(self, *args, **options):
+        sessions = Z2HUploadSessions.objects.filter(
+            status__in=['in_progress', 'failed'],
+            modified__lt=timezone.now() - timedelta(hours=options['hours']),
+        )
+
+        deleted_count = 0
+        for session in sessions.iterator():
+            shutil.rmtree(get_session_dir(session), ignore_errors=True)
+            session.delete()
+            deleted_count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted_count} upload sessions"))
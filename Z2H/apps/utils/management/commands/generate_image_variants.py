@@ -0,0 +1,71 @@
+import os
+
+from django.core.management.base import BaseCommand
+from apps.app.models import Z2HProductImages
+from apps.user.models import RegisterUser
+from apps.user.user_info import invalidate_user_info
+from apps.utils.models import Z2HUploads
+from apps.utils.uploads import (
+    IMAGE_UPLOAD_TYPES,
+    generate_image_variants,
+    get_file_sha256,
+    get_upload_path_from_url,
+    get_upload_root,
+    get_variant_urls,
+)
+
+class Command(BaseCommand):
+    help = "Register product images and profile photos uploaded before content addressing and generate their WebP variants."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate variants of images that already have them.")
+
+    def get_upload(self, file_path):
+        upload = Z2HUploads.objects.filter(file_path=file_path).first()
+        if upload:
+            return upload
+
+        full_path = os.path.join(get_upload_root(), file_path)
+        upload_type = file_path.split('/')[0]
+        if upload_type not in IMAGE_UPLOAD_TYPES or not os.path.isfile(full_path):
+            return None
+
+        sha256 = get_file_sha256(full_path)
+
+        # The same picture uploaded twice under the old naming shares one set of variants
+        upload, _ = Z2HUploads.objects.get_or_create(
+            upload_type=upload_type,
+            sha256=sha256,
+            defaults={'file_path': file_path, 'file_name': os.path.basename(file_path), 'size': os.path.getsize(full_path)},
+        )
+
+        return upload
+
+    def handle(self, *args, **options):
+        urls = set(Z2HProductImages.objects.exclude(product_image_url=None).values_list('product_image_url', flat=True))
+        urls |= set(RegisterUser.objects.exclude(profile_photo_path=None).values_list('profile_photo_path', flat=True))
+
+        processed_count = 0
+        skipped_count = 0
+        for url in sorted(urls):
+            file_path = get_upload_path_from_url(url)
+            upload = self.get_upload(file_path) if file_path else None
+
+            if not upload:
+                skipped_count += 1
+                continue
+
+            if options['force'] or not upload.is_processed:
+                generate_image_variants(upload)
+                processed_count += 1
+
+            variant_urls = get_variant_urls(upload)
+            Z2HProductImages.objects.filter(product_image_url=url).update(image_variants=variant_urls)
+
+            register_users = RegisterUser.objects.filter(profile_photo_path=url)
+            invalidate_user_info(*register_users.values_list('user_id', flat=True))
+            register_users.update(profile_photo_variants=variant_urls)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {processed_count} images, skipped {skipped_count} urls without a local file"
+        ))
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:36
+
+from django.db import migrations, models
+import uuid
+
+# Prefix and next-value settings each sequence used to be driven by.
+LEGACY_SETTINGS = {
+    'order_number': ('order_number_text', 'order_number_sequence'),
+    'order_item_number': ('order_item_number_text', 'order_item_number_sequence'),
+    'customer_number': ('customer_number_text', 'customer_number_value'),
+    'product_code': ('product_code', 'prod_code_sequence'),
+    'product_category_code': ('product_category_code', 'product_category_sequence'),
+    'product_sub_category_code': ('product_sub_category_code', 'product_sub_category_sequence'),
+}
+
+
+def copy_settings_sequences(apps, schema_editor):
+    Z2HSettings = apps.get_model('utils', 'Z2HSettings')
+    Z2HSequences = apps.get_model('utils', 'Z2HSequences')
+
+    settings = dict(Z2HSettings.objects.filter(is_active=True).values_list('name', 'value'))
+
+    for name, (prefix_setting, value_setting) in LEGACY_SETTINGS.items():
+        if value_setting not in settings:
+            continue
+
+        Z2HSequences.objects.create(
+            name=name,
+            prefix=settings.get(prefix_setting, ''),
+            next_value=int(settings[value_setting]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utils', '0002_z2hsettings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Z2HSequences',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('name', models.CharField(max_length=128, unique=True)),
+                ('prefix', models.CharField(blank=True, default='', max_length=64)),
+                ('next_value', models.BigIntegerField(default=1)),
+                ('block_size', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(copy_settings_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utils', '0003_z2hsequences'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='z2hsettings',
+            index=models.Index(fields=['name'], name='settings_name'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:54
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utils', '0004_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Z2HUploads',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('upload_type', models.CharField(max_length=64)),
+                ('sha256', models.CharField(max_length=64)),
+                ('file_path', models.CharField(max_length=256, unique=True)),
+                ('file_name', models.CharField(blank=True, max_length=256, null=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('variants', models.JSONField(default=dict)),
+                ('is_processed', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='z2huploads',
+            constraint=models.UniqueConstraint(fields=('upload_type', 'sha256'), name='unique_upload_type_sha256'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utils', '0006_z2huploadsessions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='z2huploadsessions',
+            name='status',
+            field=models.CharField(choices=[('in_progress', 'in_progress'), ('verifying', 'verifying'), ('completed', 'completed'), ('failed', 'failed')], default='in_progress', max_length=64),
+        ),
+    ]
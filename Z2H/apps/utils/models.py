@@ -1,5 +1,6 @@
 import uuid
 
+from django.conf import settings
 from django.db import models
 
 class ZeroToHeroBaseModel(models.Model):
@@ -32,5 +33,58 @@ class Z2HSettings(ZeroToHeroBaseModel):
     description = models.TextField(blank=True)
     value = models.CharField(max_length=128, null=False, blank=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='settings_name'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class Z2HSequences(ZeroToHeroBaseModel):
+    name = models.CharField(max_length=128, unique=True, null=False, blank=False)
+    prefix = models.CharField(max_length=64, blank=True, default='')
+    next_value = models.BigIntegerField(default=1)
+    block_size = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return self.name
+
+class Z2HUploads(ZeroToHeroBaseModel):
+    upload_type = models.CharField(max_length=64, null=False, blank=False)
+    sha256 = models.CharField(max_length=64, null=False, blank=False)
+    file_path = models.CharField(max_length=256, unique=True, null=False, blank=False)
+    file_name = models.CharField(max_length=256, null=True, blank=True)
+    size = models.BigIntegerField(default=0)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=dict)
+    is_processed = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['upload_type', 'sha256'], name='unique_upload_type_sha256'),
+        ]
+
+    def __str__(self):
+        return self.file_path
+
+class Z2HUploadSessions(ZeroToHeroBaseModel):
+    STATUS_CHOICES = (
+        ('in_progress', 'in_progress'),
+        ('verifying', 'verifying'),
+        ('completed', 'completed'),
+        ('failed', 'failed'),
+    )
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions", null=False, blank=False)
+    upload_type = models.CharField(max_length=64, null=False, blank=False)
+    file_name = models.CharField(max_length=256, null=False, blank=False)
+    size = models.BigIntegerField(null=False, blank=False)
+    sha256 = models.CharField(max_length=64, null=False, blank=False)
+    received_size = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=64, choices=STATUS_CHOICES, default='in_progress')
+    upload = models.ForeignKey(Z2HUploads, on_delete=models.SET_NULL, related_name="sessions", null=True, blank=True)
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.file_name} - {self.status}"
\ No newline at end of file
@@ -0,0 +1,120 @@
+import base64
+import json
+import math
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+
+CURSOR_QUERY_PARAM = 'cursor'
+WITH_TOTAL_QUERY_PARAM = 'withTotal'
+DEFAULT_ROWS_PER_PAGE = 10
+
+def parse_positive_int(value, name, default=None, maximum=None):
+    """A query parameter as an int from 1 to maximum, default when it is absent. Raises ValueError otherwise."""
+    if value in (None, ''):
+        return default
+
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = 0
+
+    if number < 1 or (maximum and number > maximum):
+        message = f"{name} must be a positive number"
+        raise ValueError(f"{message} up to {maximum}" if maximum else message)
+
+    return number
+
+def get_rows_per_page(request, param='rowsPerPage'):
+    """Page size of the request, capped at MAX_ROWS_PER_PAGE."""
+    return parse_positive_int(request.query_params.get(param, None), param, DEFAULT_ROWS_PER_PAGE, settings.MAX_ROWS_PER_PAGE)
+
+def get_page_number(request, param='page', default=None):
+    return parse_positive_int(request.query_params.get(param, None), param, default)
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor, ordering):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError("Invalid cursor")
+
+    return values
+
+def get_keyset_filter(ordering, values):
+    """Build (a > x) OR (a = x AND b > y) ... for rows after the given ordering values."""
+    keyset_filter = Q()
+    for index, field in enumerate(ordering):
+        conditions = dict(zip(ordering[:index], values[:index]))
+        conditions[f"{field}__gt"] = values[index]
+        keyset_filter |= Q(**conditions)
+
+    return keyset_filter
+
+def get_approximate_count(queryset):
+    """Planner row estimate on PostgreSQL (no table scan), exact COUNT elsewhere."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+def get_page_pagination_data(queryset, page, rows_per_page):
+    """Return one numbered page of the queryset with the total page count."""
+    if rows_per_page < 1:
+        raise ValueError("rows per page must be a positive number")
+
+    paginator = Paginator(queryset, rows_per_page)
+    page_obj = paginator.get_page(page)
+
+    return {
+        "data": page_obj.object_list,
+        "total_page_count": math.ceil(paginator.count / rows_per_page),
+    }
+
+def get_cursor_pagination_data(request, queryset, ordering, rows_per_page):
+    """
+    Return one page of the queryset after the request's cursor, ordered by the given unique ordering.
+    Every page costs the same index range scan, no matter how deep it is.
+    """
+    if rows_per_page < 1:
+        raise ValueError("rows per page must be a positive number")
+
+    cursor = request.query_params.get(CURSOR_QUERY_PARAM, None)
+    page_queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        page_queryset = page_queryset.filter(get_keyset_filter(ordering, decode_cursor(cursor, ordering)))
+
+    rows = list(page_queryset[:rows_per_page + 1])
+    next_cursor = None
+    if len(rows) > rows_per_page:
+        rows = rows[:rows_per_page]
+        next_cursor = encode_cursor([getattr(rows[-1], field) for field in ordering])
+
+    data = {
+        "data": rows,
+        "next_cursor": next_cursor,
+    }
+
+    if request.query_params.get(WITH_TOTAL_QUERY_PARAM, None) == 'true':
+        total_count = get_approximate_count(queryset)
+        data["total_count"] = total_count
+        data["total_page_count"] = math.ceil(total_count / rows_per_page)
+
+    return data
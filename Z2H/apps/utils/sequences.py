@@ -0,0 +1,77 @@
+import threading
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from apps.utils.models import Z2HSequences, Z2HSettings
+
+ORDER_NUMBER = 'order_number'
+ORDER_ITEM_NUMBER = 'order_item_number'
+CUSTOMER_NUMBER = 'customer_number'
+PRODUCT_CODE = 'product_code'
+PRODUCT_CATEGORY_CODE = 'product_category_code'
+PRODUCT_SUB_CATEGORY_CODE = 'product_sub_category_code'
+
+# Z2HSettings rows (prefix, next value) the sequences were driven by before, used to seed them on first use.
+LEGACY_SETTINGS = {
+    ORDER_NUMBER: ('order_number_text', 'order_number_sequence'),
+    ORDER_ITEM_NUMBER: ('order_item_number_text', 'order_item_number_sequence'),
+    CUSTOMER_NUMBER: ('customer_number_text', 'customer_number_value'),
+    PRODUCT_CODE: ('product_code', 'prod_code_sequence'),
+    PRODUCT_CATEGORY_CODE: ('product_category_code', 'product_category_sequence'),
+    PRODUCT_SUB_CATEGORY_CODE: ('product_sub_category_code', 'product_sub_category_sequence'),
+}
+
+# Block handed out per sequence, and a lock per sequence so a reservation only holds up callers of that sequence.
+_blocks = {}
+_block_locks = {}
+_block_locks_lock = threading.Lock()
+
+def _create_sequence(name):
+    prefix_setting, value_setting = LEGACY_SETTINGS[name]
+    settings = dict(
+        Z2HSettings.objects.filter(name__in=[prefix_setting, value_setting], is_active=True).values_list('name', 'value')
+    )
+
+    try:
+        with transaction.atomic():
+            Z2HSequences.objects.create(
+                name=name,
+                prefix=settings.get(prefix_setting, ''),
+                next_value=int(settings.get(value_setting, 1)),
+            )
+    except IntegrityError:
+        # Another worker seeded it first
+        pass
+
+def _reserve_block(name):
+    """Atomically move the sequence forward by its block size and return (prefix, first, last + 1)."""
+    with transaction.atomic():
+        sequences = Z2HSequences.objects.filter(name=name, is_active=True)
+
+        # The UPDATE holds the row lock until commit, so concurrent workers always get disjoint blocks
+        if not sequences.update(next_value=F('next_value') + F('block_size')):
+            _create_sequence(name)
+            sequences.update(next_value=F('next_value') + F('block_size'))
+
+        prefix, next_value, block_size = sequences.values_list('prefix', 'next_value', 'block_size').get()
+
+    return prefix, next_value - block_size, next_value
+
+def _get_block_lock(name):
+    with _block_locks_lock:
+        return _block_locks.setdefault(name, threading.Lock())
+
+def get_next_number(name):
+    """Return the next formatted number (prefix + value) for the given sequence."""
+    with _get_block_lock(name):
+        block = _blocks.get(name)
+
+        # A caller that waited on the lock while another reserved finds the fresh block here and does not reserve again
+        if block is None or block[1] >= block[2]:
+            block = list(_reserve_block(name))
+            _blocks[name] = block
+
+        value = block[1]
+        block[1] += 1
+
+    return block[0] + str(value)
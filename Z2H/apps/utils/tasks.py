@@ -1,8 +1,86 @@
-import yagmail
+import logging
 import os
+import threading
+import uuid
+
+import dramatiq
+import yagmail
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# One SMTP connection per worker thread, reused across messages and reopened after a failure
+_smtp_connections = threading.local()
+
+def get_smtp_connection():
+    if getattr(_smtp_connections, 'yag', None) is None:
+        _smtp_connections.yag = yagmail.SMTP(user=os.environ["SENDER_EMAIL"], password=os.environ["SENDER_EMAIL_APP_PASSWORD"])
+
+    return _smtp_connections.yag
+
+def close_smtp_connection():
+    yag = getattr(_smtp_connections, 'yag', None)
+    _smtp_connections.yag = None
+
+    if yag is not None:
+        try:
+            yag.close()
+        except Exception:
+            pass
+
+def format_email(to_email, body, subject):
+    """The message as text for the console and file backends; outside DEBUG the body (passwords) is left out."""
+    if not settings.DEBUG:
+        body = f"[body redacted, {len(body)} characters]"
+
+    return f"To: {to_email}\nSubject: {subject}\n\n{body}\n"
+
+def deliver_email(to_email, body, subject):
+    """Send one message through the configured EMAIL_DELIVERY_BACKEND."""
+    if settings.EMAIL_DELIVERY_BACKEND == 'console':
+        logger.info("Email not sent (console backend)\n%s", format_email(to_email, body, subject))
+        return
+
+    if settings.EMAIL_DELIVERY_BACKEND == 'file':
+        os.makedirs(settings.EMAIL_FILE_PATH, exist_ok=True)
+        with open(os.path.join(settings.EMAIL_FILE_PATH, f"{uuid.uuid4()}.txt"), 'w') as email_file:
+            email_file.write(format_email(to_email, body, subject))
+        return
+
+    logger.info("Sending email to %s", to_email)
+    try:
+        get_smtp_connection().send(to=to_email, subject=subject, contents=body)
+    except Exception:
+        close_smtp_connection()
+        logger.exception("Sending email to %s failed", to_email)
+        raise
+    logger.info("Email sent to %s", to_email)
+
+# Failed sends are retried by dramatiq with exponential backoff (10 seconds up to 10 minutes)
+@dramatiq.actor(queue_name='emails', max_retries=5, min_backoff=10_000, max_backoff=600_000)
+def send_email_task(to_email, body, subject):
+    deliver_email(to_email=to_email, body=body, subject=subject)
 
 def send_email(to_email, body, subject):
-    print("Sending email to ", to_email)
-    yag = yagmail.SMTP(user=os.environ["SENDER_EMAIL"], password=os.environ["SENDER_EMAIL_APP_PASSWORD"])
-    yag.send(to=to_email, subject=subject, contents=body)
-    print("Email sent to ", to_email)
\ No newline at end of file
+    if settings.EMAIL_ASYNC_DELIVERY:
+        send_email_task.send(to_email=to_email, body=body, subject=subject)
+    else:
+        deliver_email(to_email=to_email, body=body, subject=subject)
+
+@dramatiq.actor(queue_name='images', max_retries=3)
+def generate_image_variants_task(upload_id):
+    from apps.utils.models import Z2HUploads
+    from apps.utils.uploads import generate_image_variants
+
+    upload = Z2HUploads.objects.filter(id=upload_id, is_processed=False).first()
+    if upload:
+        generate_image_variants(upload)
+
+@dramatiq.actor(queue_name='uploads', max_retries=3)
+def verify_upload_session_task(session_id):
+    from apps.utils.models import Z2HUploadSessions
+    from apps.utils.uploads import verify_upload_session
+
+    session = Z2HUploadSessions.objects.filter(id=session_id, status='verifying').first()
+    if session:
+        verify_upload_session(session)
@@ -1,3 +1,421 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+from apps.app.models import Z2HOrders, Z2HPlanDetails, Z2HProductImages, Z2HWebPages, Z2HWebPageRoles
+from apps.user.models import Z2HUser, Z2HCustomers, RegisterUser, Role, Z2HUserRoles, Z2HReferralTree, Z2HCommissions
+from apps.utils import sequences
+from apps.utils.cache import _local_cache, clear_config_cache, get_plan, get_plan_by_name, get_user_web_pages
+from apps.utils.models import State, District, Z2HSettings, Z2HUploads, Z2HUploadSessions
+from apps.utils.tasks import deliver_email
+from apps.utils.uploads import append_upload_chunk, get_upload_root, get_upload_url, store_upload
 
 # Create your tests here.
+
+class HotQueryIndexTests(TestCase):
+    """Every hot lookup must be planned on its index once the tables hold a realistic amount of rows."""
+
+    ROWS = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        district = District.objects.create(state=State.objects.create(name='Explain State'), name='Explain District')
+        cls.role = Role.objects.create(name='explain')
+
+        cls.users = Z2HUser.objects.bulk_create([
+            Z2HUser(email=f"explain{index}@z2h.local", name=f"Explain {index}", password='') for index in range(cls.ROWS)
+        ], batch_size=1000)
+
+        RegisterUser.objects.bulk_create([
+            RegisterUser(
+                role=cls.role, user=user, name=f"Explain {index}", nominee_name='nominee', date_of_birth='1990-01-01',
+                marital_status='single', gender='male', aadhar_number='000000000000', mobile_number=f"explain{index}",
+                district=district, city='city', town='town', address='address', pin_code='600001', name_of_bank='bank',
+                name_as_in_bank='name', ifsc_code='IFSC0000000', bank_branch='branch', account_number='0',
+                email_address=f"explain{index}@z2h.local", profile_photo_path=f"http://z2h.local/static_image/profile/{index}.jpg",
+            ) for index, user in enumerate(cls.users)
+        ], batch_size=1000)
+
+        # A complete binary referral tree, with a small share of completed but unpaid levels
+        cls.customers = Z2HCustomers.objects.bulk_create([
+            Z2HCustomers(
+                user=user, customer_number=f"EXPLAIN{index}", active_plan_uid=str(uuid.uuid4()), plan_start_date=now,
+                is_level_one_completed=index % 50 == 0, level_one_completed_date=now if index % 50 == 0 else None,
+            ) for index, user in enumerate(cls.users)
+        ], batch_size=1000)
+
+        for index, customer in enumerate(cls.customers[1:], start=1):
+            customer.referrer = cls.customers[(index - 1) // 2]
+        Z2HCustomers.objects.bulk_update(cls.customers[1:], ['referrer'], batch_size=1000)
+
+        Z2HReferralTree.objects.bulk_create([
+            Z2HReferralTree(ancestor=customer, descendant=customer, depth=0) for customer in cls.customers
+        ] + [
+            Z2HReferralTree(ancestor=customer.referrer, descendant=customer, depth=1) for customer in cls.customers[1:]
+        ], batch_size=1000)
+
+        order_statuses = ['delivered'] * 97 + ['yet_to_be_couriered', 'in_transit', 'cancelled']
+        Z2HOrders.objects.bulk_create([
+            Z2HOrders(
+                ordered_by=customer.user, customer=customer, order_number=f"EXPLAIN{index}",
+                order_date=now - timedelta(days=index % 365), order_status=order_statuses[index % len(order_statuses)],
+            ) for index, customer in enumerate(cls.customers)
+        ], batch_size=1000)
+
+        Z2HCommissions.objects.bulk_create([
+            Z2HCommissions(
+                customer=customer, level=level, completed_date=now - timedelta(days=index % 365),
+                status='unpaid' if index % 50 == 0 else 'paid',
+            ) for index, customer in enumerate(cls.customers) for level in (1, 2)
+        ], batch_size=1000)
+
+        Z2HSettings.objects.bulk_create([
+            Z2HSettings(name=f"explain_setting_{index}", value=str(index)) for index in range(cls.ROWS)
+        ], batch_size=1000)
+
+        Z2HUserRoles.objects.bulk_create([
+            Z2HUserRoles(user_uid=str(user.uid), role_uid=str(cls.role.uid)) for user in cls.users
+        ], batch_size=1000)
+
+        Z2HWebPageRoles.objects.bulk_create([
+            Z2HWebPageRoles(role_uid=str(uuid.uuid4()), web_page_uid=str(uuid.uuid4())) for index in range(cls.ROWS)
+        ], batch_size=1000)
+
+        Z2HProductImages.objects.bulk_create([
+            Z2HProductImages(product_image_url=f"http://z2h.local/static_image/product/{index}.jpg") for index in range(cls.ROWS)
+        ], batch_size=1000)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def get_hot_queries(self):
+        """(index names, queryset) of every hot lookup; the plan has to name one of the indexes."""
+        now = timezone.now()
+        customer = self.customers[self.ROWS // 2]
+        user = self.users[self.ROWS // 2]
+
+        hot_queries = [
+            (('customer_customer_number',), Z2HCustomers.objects.filter(customer_number=customer.customer_number)),
+            (('customer_referrer_admin',), Z2HCustomers.objects.filter(referrer=customer, is_admin_user=False)),
+            (
+                ('customer_level_one_unpaid',),
+                Z2HCustomers.objects.filter(
+                    is_level_one_completed=True, is_level_one_commission_paid=False, level_one_completed_date__gte=now - timedelta(days=30),
+                ),
+            ),
+            (('order_status_date',), Z2HOrders.objects.filter(order_status='in_transit', order_date__range=[now - timedelta(days=30), now])),
+            (('order_order_number',), Z2HOrders.objects.filter(order_number=f"EXPLAIN{self.ROWS // 2}")),
+            (
+                # mobile_number is unique too; SQLite names unique constraint indexes sqlite_autoindex_<table>_<n>
+                ('register_user_email_mobile', 'user_registeruser_mobile_number', 'sqlite_autoindex_user_registeruser'),
+                RegisterUser.objects.filter(email_address=user.email, mobile_number=f"explain{self.ROWS // 2}"),
+            ),
+            (
+                ('product_image_url',),
+                Z2HProductImages.objects.filter(product_image_url=f"http://z2h.local/static_image/product/{self.ROWS // 2}.jpg"),
+            ),
+            (
+                ('register_user_profile_photo',),
+                RegisterUser.objects.filter(profile_photo_path=f"http://z2h.local/static_image/profile/{self.ROWS // 2}.jpg"),
+            ),
+            (('settings_name',), Z2HSettings.objects.filter(name='explain_setting_10', is_active=True)),
+            (('user_roles_user_uid',), Z2HUserRoles.objects.filter(user_uid=str(user.uid))),
+            (
+                ('web_page_role_unique', 'sqlite_autoindex_app_z2hwebpageroles'),
+                Z2HWebPageRoles.objects.filter(role_uid=str(self.role.uid), is_active=True),
+            ),
+            (('referral_tree_descendant_depth',), Z2HReferralTree.objects.filter(descendant=customer, depth__gte=1)),
+            (
+                ('commission_level_status_date',),
+                Z2HCommissions.objects.filter(level=1, status__in=['unpaid', 'payment_issue'], completed_date__gte=now - timedelta(days=30)),
+            ),
+        ]
+
+        # Substring search is only index backed (trigram) on PostgreSQL
+        if connection.vendor == 'postgresql':
+            hot_queries += [
+                (('order_number_trgm',), Z2HOrders.objects.filter(order_number__icontains='LAIN123')),
+                (('customer_number_trgm',), Z2HCustomers.objects.filter(customer_number__icontains='LAIN123')),
+                (('register_user_mobile_trgm',), RegisterUser.objects.filter(mobile_number__icontains='plain123')),
+            ]
+
+        return hot_queries
+
+    def test_hot_queries_use_their_index(self):
+        for index_names, queryset in self.get_hot_queries():
+            with self.subTest(index_names[0]):
+                plan = queryset.explain()
+                self.assertTrue(any(index_name in plan for index_name in index_names), plan)
+
+class SequenceBlockTests(SimpleTestCase):
+    """Numbers are handed out from in-process blocks; refilling one sequence must not hold up the others."""
+
+    def setUp(self):
+        self.slow_reserving = threading.Event()
+        self.release_slow = threading.Event()
+        self.addCleanup(self.release_slow.set)
+        self.addCleanup(sequences._blocks.pop, 'slow', None)
+        self.addCleanup(sequences._blocks.pop, 'fast', None)
+
+    def reserve_block(self, name):
+        if name == 'slow':
+            self.slow_reserving.set()
+            self.release_slow.wait(5)
+            return 'S', 1, 3
+
+        return 'F', 1, 3
+
+    def test_reservation_only_blocks_its_own_sequence(self):
+        slow_numbers = []
+
+        with mock.patch.object(sequences, '_reserve_block', side_effect=self.reserve_block) as reserve_block:
+            slow_caller = threading.Thread(target=lambda: slow_numbers.append(sequences.get_next_number('slow')))
+            slow_caller.start()
+            self.slow_reserving.wait(5)
+
+            self.assertEqual([sequences.get_next_number('fast') for index in range(3)], ['F1', 'F2', 'F1'])
+            self.assertTrue(slow_caller.is_alive())
+
+            self.release_slow.set()
+            slow_caller.join(5)
+
+            self.assertEqual(slow_numbers, ['S1'])
+            self.assertEqual(sequences.get_next_number('slow'), 'S2')
+            self.assertEqual([call.args[0] for call in reserve_block.call_args_list].count('fast'), 2)
+
+class EmailDeliveryTests(SimpleTestCase):
+    """The console backend must not write message bodies (they carry passwords) to the logs outside DEBUG."""
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='console', DEBUG=False)
+    def test_console_backend_redacts_body(self):
+        with self.assertLogs('apps.utils.tasks', level='INFO') as logs:
+            deliver_email('user@z2h.com', 'Your password is secret123', 'Welcome')
+
+        self.assertIn('user@z2h.com', logs.output[0])
+        self.assertNotIn('secret123', logs.output[0])
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='console', DEBUG=True)
+    def test_console_backend_keeps_body_in_debug(self):
+        with self.assertLogs('apps.utils.tasks', level='INFO') as logs:
+            deliver_email('user@z2h.com', 'Your password is secret123', 'Welcome')
+
+        self.assertIn('secret123', logs.output[0])
+
+def get_jpeg_bytes(size=(64, 64)):
+    image_file = io.BytesIO()
+    Image.new('RGB', size, (200, 40, 40)).save(image_file, 'JPEG')
+
+    return image_file.getvalue()
+
+class ImageVariantTests(APITestCase):
+    """A corrupt image is stored as it is, marked processed without variants, and never fails the upload."""
+
+    def setUp(self):
+        upload_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_root, ignore_errors=True)
+
+        settings_override = override_settings(STATICFILES_DIRS=[upload_root], IMAGE_VARIANTS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client.force_authenticate(Z2HUser.objects.create_user('uploads@z2h.com', 'password', name='Uploads'))
+
+    def test_image_gets_variants(self):
+        upload = store_upload(SimpleUploadedFile('a.jpg', get_jpeg_bytes()), 'product_image')
+
+        self.assertTrue(upload.is_processed)
+        self.assertEqual(set(upload.variants), {'thumbnail', 'medium', 'webp'})
+
+    def test_variants_reach_rows_using_the_image(self):
+        jpeg = get_jpeg_bytes()
+        with mock.patch('apps.utils.uploads.queue_image_variants'):
+            upload = store_upload(SimpleUploadedFile('a.jpg', jpeg), 'product_image')
+
+        product_image = Z2HProductImages.objects.create(product_image_url=get_upload_url(upload.file_path))
+        self.assertEqual(product_image.image_variants, {})
+
+        store_upload(SimpleUploadedFile('a.jpg', jpeg), 'product_image')
+
+        product_image.refresh_from_db()
+        self.assertEqual(set(product_image.image_variants), {'thumbnail', 'medium', 'webp'})
+
+    def test_truncated_image_is_processed_without_variants(self):
+        upload = store_upload(SimpleUploadedFile('a.jpg', get_jpeg_bytes()[:300]), 'product_image')
+
+        upload.refresh_from_db()
+        self.assertTrue(upload.is_processed)
+        self.assertEqual(upload.variants, {})
+
+    def test_decompression_bomb_is_processed_without_variants(self):
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 100):
+            upload = store_upload(SimpleUploadedFile('a.jpg', get_jpeg_bytes()), 'product_image')
+
+        self.assertTrue(upload.is_processed)
+        self.assertEqual(upload.variants, {})
+
+    def test_corrupt_image_upload_succeeds(self):
+        response = self.client.post(
+            '/api/z2h/utils/image_upload/',
+            {'upload_type': 'product_image', 'file_name': SimpleUploadedFile('a.jpg', get_jpeg_bytes()[:300])},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Z2HUploads.objects.get().is_processed)
+
+    def test_reupload_queues_unprocessed_image(self):
+        jpeg = get_jpeg_bytes()
+        with mock.patch('apps.utils.uploads.queue_image_variants'):
+            upload = store_upload(SimpleUploadedFile('a.jpg', jpeg), 'product_image')
+
+        self.assertFalse(upload.is_processed)
+
+        upload = store_upload(SimpleUploadedFile('a.jpg', jpeg), 'product_image')
+
+        self.assertTrue(upload.is_processed)
+
+class ChunkedUploadTests(APITestCase):
+    """Chunks are read with no transaction open and the joined file is checked against its sha256 once complete."""
+
+    def setUp(self):
+        upload_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_root, ignore_errors=True)
+
+        settings_override = override_settings(
+            STATICFILES_DIRS=[upload_root], UPLOAD_SESSION_DIR=os.path.join(upload_root, 'sessions'), UPLOAD_VERIFY_ASYNC=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = Z2HUser.objects.create_user('videos@z2h.com', 'password', name='Videos')
+        self.client.force_authenticate(self.user)
+
+    def start_upload(self, content, sha256=None):
+        response = self.client.post('/api/z2h/utils/video_upload/', {
+            'file_name': 'demo.mp4', 'size': len(content), 'sha256': sha256 or hashlib.sha256(content).hexdigest(),
+        })
+        self.assertEqual(response.status_code, 201)
+
+        return response.data['upload_uid']
+
+    def put_chunk(self, uid, offset, chunk):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put(
+                f"/api/z2h/utils/video_upload/{uid}/", chunk, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+            )
+
+    def test_chunks_are_joined_and_verified(self):
+        content = b'0123456789' * 10
+        uid = self.start_upload(content)
+
+        self.assertEqual(self.put_chunk(uid, 0, content[:60]).status_code, 200)
+        # A retry of the acknowledged chunk is refused and changes nothing
+        self.assertEqual(self.put_chunk(uid, 0, b'x' * 60).status_code, 409)
+        self.assertEqual(self.put_chunk(uid, 60, content[60:]).status_code, 200)
+
+        response = self.client.get(f"/api/z2h/utils/video_upload/{uid}/")
+        self.assertEqual(response.data['upload_status'], 'completed')
+
+        upload = Z2HUploads.objects.get()
+        with open(os.path.join(get_upload_root(), upload.file_path), 'rb') as video_file:
+            self.assertEqual(video_file.read(), content)
+
+    def test_checksum_mismatch_fails_the_session(self):
+        uid = self.start_upload(b'content', sha256='0' * 64)
+
+        self.put_chunk(uid, 0, b'content')
+
+        self.assertEqual(Z2HUploadSessions.objects.get(uid=uid).status, 'failed')
+        self.assertFalse(Z2HUploads.objects.exists())
+
+    def test_chunk_is_read_outside_a_transaction(self):
+        content = b'content'
+        uid = self.start_upload(content)
+        atomic_depth = len(connection.atomic_blocks)
+        depths = []
+
+        class Stream(io.BytesIO):
+            def read(self, size=-1):
+                depths.append(len(connection.atomic_blocks))
+                return super().read(size)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            append_upload_chunk(uid, self.user, 0, Stream(content), len(content))
+
+        self.assertEqual(set(depths), {atomic_depth})
+        self.assertEqual(Z2HUploadSessions.objects.get(uid=uid).status, 'completed')
+
+class ConfigCacheTests(TestCase):
+    """The in-process tier stays bounded, and access changes saved by another worker apply at once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Z2HUser.objects.create_user('pages@z2h.com', 'password', name='Pages')
+        role = Role.objects.create(name='Pages')
+        cls.web_page = Z2HWebPages.objects.create(name='reports')
+        Z2HUserRoles.objects.create(user_uid=str(cls.user.uid), role_uid=str(role.uid))
+        Z2HWebPageRoles.objects.create(role_uid=str(role.uid), web_page_uid=str(cls.web_page.uid))
+
+    def setUp(self):
+        cache.clear()
+        clear_config_cache()
+
+    @override_settings(CONFIG_LOCAL_CACHE_SIZE=2)
+    def test_local_tier_keeps_most_recently_used(self):
+        plans = [Z2HPlanDetails.objects.create(name=f"Plan{index}", registration_fee=200) for index in range(3)]
+
+        get_plan(plans[0].uid)
+        get_plan(plans[1].uid)
+        get_plan(plans[0].uid)
+        get_plan(plans[2].uid)
+
+        self.assertEqual(list(_local_cache), [f"config:plan:{plans[0].uid}", f"config:plan:{plans[2].uid}"])
+
+    def test_revoked_page_is_refused_after_another_worker_invalidates(self):
+        self.assertEqual(get_user_web_pages(self.user), ['reports'])
+
+        # Another worker saves the change: its signal clears the shared cache, not this process
+        Z2HWebPageRoles.objects.update(is_active=False)
+        cache.clear()
+
+        self.assertEqual(get_user_web_pages(self.user), [])
+
+    def test_renamed_plan_is_not_found_by_its_old_name(self):
+        plan = Z2HPlanDetails.objects.create(name='Silver', registration_fee=200)
+        self.assertEqual(get_plan_by_name('Silver'), plan)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            plan.name = 'Gold'
+            plan.save()
+
+        self.assertIsNone(get_plan_by_name('Silver'))
+        self.assertEqual(get_plan_by_name('Gold').name, 'Gold')
+
+    def test_plan_is_invalidated_when_the_change_commits(self):
+        plan = Z2HPlanDetails.objects.create(name='Silver', registration_fee=200)
+        get_plan(plan.uid)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            plan.registration_fee = 300
+            plan.save()
+
+            # Not committed yet: a reader keeps getting the cached row and cannot cache the new one early
+            self.assertEqual(get_plan(plan.uid).registration_fee, 200)
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(get_plan(plan.uid).registration_fee, 300)
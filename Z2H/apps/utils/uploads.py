@@ -0,0 +1,388 @@
+import hashlib
+import os
+import re
+import shutil
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageOps
+from apps.app.models import Z2HProducts, Z2HProductImages
+from apps.user.models import RegisterUser
+from apps.utils.models import Z2HUploads, Z2HUploadSessions
+
+ENVIRONMENT = os.environ.get('ENVIRONMENT', 'production')
+
+IMAGE_UPLOAD_TYPES = ('profile_image', 'product_image')
+VIDEO_UPLOAD_TYPES = ('demo_video',)
+RANGE_HEADER_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+COPY_BLOCK_SIZE = 64 * 1024
+UPLOAD_URL_PATTERN = re.compile(r"/(?:static|static_image)/(.+)$")
+
+def get_upload_root():
+    return settings.STATICFILES_DIRS[0]
+
+def get_upload_url(file_path):
+    if ENVIRONMENT == 'local':
+        return f"{os.environ['APP_URL']}/static/{file_path}"
+
+    return f"{os.environ['APP_URL']}/static_image/{file_path}"
+
+def get_video_url(upload):
+    return f"{os.environ['APP_URL']}{reverse('utils:stream-video', kwargs={'uid': upload.uid})}"
+
+def get_upload_path_from_url(url):
+    match = UPLOAD_URL_PATTERN.search(url or '')
+    return match.group(1) if match else None
+
+def get_file_extension(file_name):
+    extension = os.path.splitext(file_name or '')[1].lower()
+    return extension if re.fullmatch(r"\.[a-z0-9]{1,8}", extension) else ''
+
+def get_content_path(upload_type, sha256, suffix=''):
+    """Relative path of a stored file: <upload_type>/<first two hash characters>/<hash><suffix>."""
+    return f"{upload_type}/{sha256[:2]}/{sha256}{suffix}"
+
+def write_file(file_path, chunks):
+    """Write chunks to a file under the upload root through a temporary name, so readers never see a partial file."""
+    full_path = os.path.join(get_upload_root(), file_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    temporary_path = f"{full_path}.{uuid.uuid4().hex}.part"
+    with open(temporary_path, "wb") as destination:
+        for chunk in chunks:
+            destination.write(chunk)
+
+    os.replace(temporary_path, full_path)
+
+def get_file_sha256(full_path):
+    digest = hashlib.sha256()
+    with open(full_path, 'rb') as source:
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+def store_upload(uploaded_file, upload_type):
+    """
+    Store an uploaded file under its sha256 and return its Z2HUploads row.
+    A file already uploaded with the same content is not written again.
+    """
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    upload = Z2HUploads.objects.filter(upload_type=upload_type, sha256=sha256).first()
+
+    if not upload or not os.path.exists(os.path.join(get_upload_root(), upload.file_path)):
+        file_path = upload.file_path if upload else get_content_path(upload_type, sha256, get_file_extension(uploaded_file.name))
+        write_file(file_path, uploaded_file.chunks())
+
+        if not upload:
+            upload, _ = Z2HUploads.objects.get_or_create(
+                upload_type=upload_type,
+                sha256=sha256,
+                defaults={'file_path': file_path, 'file_name': uploaded_file.name, 'size': uploaded_file.size},
+            )
+
+    # A re-upload of an image whose variants were never produced queues it again
+    if upload_type in IMAGE_UPLOAD_TYPES and not upload.is_processed:
+        queue_image_variants(upload)
+
+    return upload
+
+class UploadSessionError(Exception):
+    def __init__(self, message, session=None):
+        super().__init__(message)
+        self.message = message
+        self.session = session
+
+def get_session_dir(session):
+    return os.path.join(settings.UPLOAD_SESSION_DIR, str(session.uid))
+
+def get_session_chunk_path(session, offset):
+    return os.path.join(get_session_dir(session), f"{offset:020d}.chunk")
+
+def get_existing_upload(upload_type, sha256):
+    upload = Z2HUploads.objects.filter(upload_type=upload_type, sha256=sha256).first()
+    if upload and os.path.exists(os.path.join(get_upload_root(), upload.file_path)):
+        return upload
+
+    return None
+
+def create_upload_session(user, upload_type, file_name, size, sha256):
+    """
+    Start a resumable upload. Content the server already has completes the session straight away,
+    so the client can skip sending it.
+    """
+    session = Z2HUploadSessions(created_by=user, upload_type=upload_type, file_name=file_name, size=size, sha256=sha256)
+
+    session.upload = get_existing_upload(upload_type, sha256)
+    if session.upload:
+        session.received_size = size
+        session.status = 'completed'
+
+    session.save()
+
+    return session
+
+def check_upload_chunk(session, offset, length):
+    if session.status != 'in_progress':
+        raise UploadSessionError("Upload Session Is Not In Progress!!!", session)
+
+    if offset != session.received_size:
+        raise UploadSessionError("Upload Offset Mismatch!!!", session)
+
+    if offset + length > session.size:
+        raise UploadSessionError("Chunk Exceeds Upload Size!!!", session)
+
+def append_upload_chunk(session_uid, user, offset, stream, length):
+    """
+    Accept length bytes read from stream at offset. The bytes go to a file of their own before any lock is
+    taken; the session row is then locked only to check the offset again and advance it, so of parallel
+    retries of one chunk exactly one is kept. The last chunk hands the session over to verification.
+    """
+    session = Z2HUploadSessions.objects.filter(uid=session_uid, created_by=user).first()
+
+    if not session:
+        raise UploadSessionError("Upload Session Not Found!!!")
+
+    check_upload_chunk(session, offset, length)
+
+    os.makedirs(get_session_dir(session), exist_ok=True)
+    temporary_path = f"{get_session_chunk_path(session, offset)}.{uuid.uuid4().hex}.part"
+
+    written = 0
+    with open(temporary_path, 'wb') as chunk_file:
+        while written < length:
+            block = stream.read(min(COPY_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            chunk_file.write(block)
+            written += len(block)
+
+    try:
+        if written != length:
+            raise UploadSessionError("Incomplete Chunk Received!!!", session)
+
+        with transaction.atomic():
+            session = Z2HUploadSessions.objects.select_for_update().get(id=session.id)
+            check_upload_chunk(session, offset, length)
+
+            os.replace(temporary_path, get_session_chunk_path(session, offset))
+            session.received_size += written
+
+            if session.received_size == session.size:
+                session.status = 'verifying'
+                transaction.on_commit(lambda: queue_upload_verification(session))
+
+            session.save(update_fields=['received_size', 'status', 'modified'])
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    if settings.UPLOAD_VERIFY_ASYNC:
+        return session
+
+    # Verified in this request; answer with the outcome
+    session.refresh_from_db()
+    if session.status == 'failed':
+        raise UploadSessionError("Checksum Mismatch!!!", session)
+
+    return session
+
+def queue_upload_verification(session):
+    from apps.utils.tasks import verify_upload_session_task
+
+    if settings.UPLOAD_VERIFY_ASYNC:
+        verify_upload_session_task.send(session.id)
+    else:
+        verify_upload_session(session)
+
+def verify_upload_session(session):
+    """
+    Join the chunks of a fully received session while hashing them, compare against the sha256 given at
+    the start and move the file to its content address. Runs outside any transaction; only the final
+    status change touches the database.
+    """
+    session_dir = get_session_dir(session)
+    assembled_path = os.path.join(session_dir, f"{uuid.uuid4().hex}.assembled")
+    digest = hashlib.sha256()
+
+    with open(assembled_path, 'wb') as destination:
+        offset = 0
+        while offset < session.size:
+            with open(get_session_chunk_path(session, offset), 'rb') as source:
+                for block in iter(lambda: source.read(COPY_BLOCK_SIZE), b''):
+                    digest.update(block)
+                    destination.write(block)
+                    offset += len(block)
+
+    if digest.hexdigest() != session.sha256:
+        shutil.rmtree(session_dir, ignore_errors=True)
+        Z2HUploadSessions.objects.filter(id=session.id, status='verifying').update(status='failed', modified=timezone.now())
+        return False
+
+    upload = get_existing_upload(session.upload_type, session.sha256)
+
+    if not upload:
+        file_path = get_content_path(session.upload_type, session.sha256, get_file_extension(session.file_name))
+        full_path = os.path.join(get_upload_root(), file_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(assembled_path, full_path)
+
+        upload, _ = Z2HUploads.objects.update_or_create(
+            upload_type=session.upload_type,
+            sha256=session.sha256,
+            defaults={'file_path': file_path, 'file_name': session.file_name, 'size': session.size, 'is_processed': True},
+        )
+
+    shutil.rmtree(session_dir, ignore_errors=True)
+    Z2HUploadSessions.objects.filter(id=session.id, status='verifying').update(
+        status='completed', upload=upload, modified=timezone.now(),
+    )
+
+    return True
+
+def parse_range_header(range_header, file_size):
+    """
+    Return the (start, end) byte positions of a single `bytes=` range, None to serve the whole file,
+    or raise ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_HEADER_PATTERN.match((range_header or '').strip())
+    if not match:
+        # Absent, malformed or multi-range requests get the whole file
+        return None
+
+    start, end = match.groups()
+
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(file_size - length, 0), file_size - 1
+
+    start = int(start)
+    end = min(int(end), file_size - 1) if end else file_size - 1
+
+    if start >= file_size or start > end:
+        raise ValueError("Unsatisfiable range")
+
+    return start, end
+
+def read_file_range(full_path, start, end):
+    with open(full_path, 'rb') as source:
+        source.seek(start)
+        remaining = end - start + 1
+
+        while remaining > 0:
+            block = source.read(min(COPY_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+def queue_image_variants(upload):
+    from apps.utils.tasks import generate_image_variants_task
+
+    if settings.IMAGE_VARIANTS_ASYNC:
+        generate_image_variants_task.send(upload.id)
+    else:
+        generate_image_variants(upload)
+
+def save_webp(image, file_path):
+    full_path = os.path.join(get_upload_root(), file_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    temporary_path = f"{full_path}.{uuid.uuid4().hex}.part"
+    image.save(temporary_path, 'WEBP', quality=settings.IMAGE_WEBP_QUALITY, method=4)
+    os.replace(temporary_path, full_path)
+
+def generate_image_variants(upload):
+    """Write the resized WebP variants of an uploaded image and publish their URLs to the rows that use it."""
+    source_path = os.path.join(get_upload_root(), upload.file_path)
+    variants = {}
+
+    try:
+        with Image.open(source_path) as source_image:
+            image = ImageOps.exif_transpose(source_image)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    except (OSError, Image.DecompressionBombError):
+        # Missing, not an image, truncated or too large to decode; serve the original only
+        image = None
+
+    if image is not None:
+        upload.width, upload.height = image.size
+
+        for name, size in settings.IMAGE_VARIANT_SIZES.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            variants[name] = get_content_path(upload.upload_type, upload.sha256, f"_{name}.webp")
+            save_webp(variant, variants[name])
+
+        variants['webp'] = get_content_path(upload.upload_type, upload.sha256, ".webp")
+        save_webp(image, variants['webp'])
+
+    upload.variants = variants
+    upload.is_processed = True
+    upload.save(update_fields=['variants', 'width', 'height', 'is_processed', 'modified'])
+
+    publish_image_variants(upload)
+
+    return upload
+
+def get_variant_urls(upload):
+    return {name: get_upload_url(file_path) for name, file_path in upload.variants.items()}
+
+def publish_image_variants(upload):
+    from apps.app.catalog import get_product_category_ids, invalidate_catalog
+    from apps.user.user_info import invalidate_user_info
+
+    variant_urls = get_variant_urls(upload)
+    # Rows store the URL the upload endpoint returned, so an exact (indexed) match finds them
+    upload_url = get_upload_url(upload.file_path)
+
+    product_images = Z2HProductImages.objects.filter(product_image_url=upload_url)
+    category_ids = get_product_category_ids(Z2HProducts.objects.filter(z2hproductimages__in=product_images))
+    if product_images.update(image_variants=variant_urls):
+        invalidate_catalog(category_ids)
+
+    register_users = RegisterUser.objects.filter(profile_photo_path=upload_url)
+    user_ids = list(register_users.values_list('user_id', flat=True))
+    register_users.update(profile_photo_variants=variant_urls)
+    invalidate_user_info(*user_ids)
+
+def get_image_variant_urls(url):
+    """Variant URLs of an uploaded image, empty until the worker has produced them."""
+    file_path = get_upload_path_from_url(url)
+    if not file_path:
+        return {}
+
+    upload = Z2HUploads.objects.filter(file_path=file_path, is_processed=True).first()
+    return get_variant_urls(upload) if upload else {}
+
+# Rows that start pointing at an image pick up variants the worker already produced;
+# later ones arrive through publish_image_variants.
+
+@receiver(pre_save, sender=Z2HProductImages)
+def set_product_image_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'product_image_url' not in update_fields:
+        return
+
+    instance.image_variants = get_image_variant_urls(instance.product_image_url)
+
+@receiver(pre_save, sender=RegisterUser)
+def set_profile_photo_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'profile_photo_path' not in update_fields:
+        return
+
+    instance.profile_photo_variants = get_image_variant_urls(instance.profile_photo_path)
@@ -7,4 +7,7 @@ urlpatterns = [
     path(r'state/', views.StateView.as_view(), name='state'),
     path(r'district/<str:state_uid>/', views.DistrictView.as_view(), name='district'),
     path(r'image_upload/', views.UploadImageView.as_view(), name='image-upload'),
+    path(r'video_upload/', views.VideoUploadSessionView.as_view(), name='video-upload'),
+    path(r'video_upload/<uuid:uid>/', views.VideoUploadChunkView.as_view(), name='video-upload-chunk'),
+    path(r'videos/<uuid:uid>/', views.z2h_stream_video, name='stream-video'),
 ]
\ No newline at end of file
@@ -1,19 +1,34 @@
 from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
-from datetime import datetime
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
 from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
-from rest_framework import permissions, authentication
-from .models import State, District
+from rest_framework import permissions
+from .models import State, District, Z2HUploads, Z2HUploadSessions
 from .serializers import StateSerializer, DistrictSerializer
+from apps.user.authentication import CachedTokenAuthentication
+from apps.utils.uploads import (
+    store_upload,
+    get_upload_url,
+    get_upload_root,
+    get_video_url,
+    create_upload_session,
+    append_upload_chunk,
+    parse_range_header,
+    read_file_range,
+    UploadSessionError,
+    VIDEO_UPLOAD_TYPES,
+)
 from rest_framework.response import Response
 from rest_framework import status
+import mimetypes
 import os
+import re
 
 # Create your views here.
 
-ENVIRONMENT = os.environ.get('ENVIRONMENT', 'production')
-
 class StateView(ListAPIView):
     queryset = State.objects.all()
     serializer_class = StateSerializer
@@ -30,48 +45,14 @@ class DistrictView(ListAPIView):
 
 class UploadImageView(APIView):
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
-
-    def get_proper_file_name(self, file_name):
-        file_name_extension = "." + file_name.split(".")[-1]
-        file_name_without_extension = file_name.replace(file_name_extension, "")
-        file_name_date = file_name_without_extension.replace(".", "") + "_" + str(datetime.now()).replace("-", "_").replace(" ", "_").replace(":", "_").replace(".","_") + file_name_extension
-        file_name_proper = file_name_date.replace(" ", "_").replace("-", "_").replace("'", "").replace("#", "_No_").replace("&", "_").replace("(", "_").replace(")", "_")
-        return file_name_proper
-    
+    authentication_classes = [CachedTokenAuthentication]
+
     def handle_product_image_upload(self, request, upload_type):
-        data = dict()
         file_uploaded_urls = list()
-        try:
-            file_name_list = request.FILES.getlist('file_name')
-
-            for file in file_name_list:
-                file_name = file.name
-                file_uplaod_path = os.path.join(settings.STATICFILES_DIRS[0], "product_image")
-                proper_file_name = self.get_proper_file_name(file_name)
-                file_to_upload = os.path.join(file_uplaod_path, proper_file_name)
-
-                if not os.path.exists(file_uplaod_path):
-                    os.makedirs(file_uplaod_path)
 
-                with open(file_to_upload, "wb") as destination:
-                    for chunk in file.chunks():
-                        destination.write(chunk)
-                
-                destination.close()
-
-                if ENVIRONMENT == 'local':
-                    file_uploaded_url = f"{os.environ['APP_URL']}/static/{upload_type}/{proper_file_name}"
-                elif ENVIRONMENT == 'production':
-                    file_uploaded_url = f"{os.environ['APP_URL']}/static_image/{upload_type}/{proper_file_name}"
-
-                file_uploaded_urls.append(file_uploaded_url)
-        
-        except KeyError:
-            data = {
-                "status": "error",
-                "message": "Invalid File or File not Found!!!"
-            }
+        for file in request.FILES.getlist('file_name'):
+            upload = store_upload(file, upload_type)
+            file_uploaded_urls.append(get_upload_url(upload.file_path))
 
         data = {
             "status": "success",
@@ -80,8 +61,6 @@ class UploadImageView(APIView):
         }
         return Response(data, status=status.HTTP_200_OK)
 
-
-
     def post(self, request):
         upload_type = request.data.get('upload_type')
 
@@ -98,19 +77,7 @@ class UploadImageView(APIView):
             return self.handle_product_image_upload(request, upload_type)
 
         try:
-            file_name = request.FILES["file_name"].name
-            
-            file_uplaod_path = os.path.join(settings.STATICFILES_DIRS[0], upload_type)
-            proper_file_name = self.get_proper_file_name(file_name)
-            file_to_upload = os.path.join(file_uplaod_path, proper_file_name)
-
-            if not os.path.exists(file_uplaod_path):
-                os.makedirs(file_uplaod_path)
-
-            with open(file_to_upload, "wb") as destination:
-                for chunk in request.FILES["file_name"].chunks():
-                    destination.write(chunk)
-                    destination.close()
+            upload = store_upload(request.FILES["file_name"], upload_type)
                     
         except KeyError:
             data = {
@@ -125,16 +92,156 @@ class UploadImageView(APIView):
                 "message": str(e)
             }
             return Response(data, status=status.HTTP_400_BAD_REQUEST)
-        
-        if ENVIRONMENT == 'local':
-            file_uploaded_url = f"{os.environ['APP_URL']}/static/{upload_type}/{proper_file_name}"
-        elif ENVIRONMENT == 'production':
-            file_uploaded_url = f"{os.environ['APP_URL']}/static_image/{upload_type}/{proper_file_name}"
 
         data = {
             "status": "success",
             "message": "Image Uploaded Successfully",
-            "image_upload_path": file_uploaded_url,
+            "image_upload_path": get_upload_url(upload.file_path),
         }
         return Response(data, status=status.HTTP_200_OK)
 
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def get_upload_session_data(session, message):
+    data = {
+        "status": "success",
+        "message": message,
+        "upload_uid": session.uid,
+        "upload_status": session.status,
+        "offset": session.received_size,
+        "size": session.size,
+        "chunk_size": settings.UPLOAD_CHUNK_SIZE,
+        "video_url": None,
+        "file_url": None,
+    }
+
+    if session.upload:
+        data["video_url"] = get_video_url(session.upload)
+        data["file_url"] = get_upload_url(session.upload.file_path)
+
+    return data
+
+class VideoUploadSessionView(APIView):
+    """
+    Starts a resumable upload. The client sends the file name, size and sha256, then PUTs the bytes
+    to VideoUploadChunkView in order; a file the server already has completes immediately.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CachedTokenAuthentication]
+
+    def post(self, request):
+        upload_type = request.data.get('upload_type', 'demo_video')
+        file_name = request.data.get('file_name', None)
+        sha256 = str(request.data.get('sha256', '')).lower()
+
+        try:
+            size = int(request.data.get('size', 0))
+        except (TypeError, ValueError):
+            size = 0
+
+        if upload_type not in VIDEO_UPLOAD_TYPES:
+            return Response({"status": "error", "message": "Invalid Upload Type"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not file_name or not SHA256_PATTERN.match(sha256):
+            return Response({"status": "error", "message": "File Name and sha256 are required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if size <= 0 or size > settings.VIDEO_UPLOAD_MAX_SIZE:
+            return Response({"status": "error", "message": "Invalid File Size"}, status=status.HTTP_400_BAD_REQUEST)
+
+        session = create_upload_session(request.user, upload_type, file_name, size, sha256)
+
+        return Response(get_upload_session_data(session, "Upload Session Created"), status=status.HTTP_201_CREATED)
+
+class VideoUploadChunkView(APIView):
+    """
+    GET returns the offset to resume from. PUT appends the raw request body at the offset given
+    in the Upload-Offset header; a mismatched offset answers 409 with the offset the server has.
+    After the last chunk the upload is verifying until its checksum is checked; GET reports the outcome.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CachedTokenAuthentication]
+
+    def get(self, request, uid):
+        session = Z2HUploadSessions.objects.filter(uid=uid, created_by=request.user).select_related('upload').first()
+
+        if not session:
+            return Response({"status": "error", "message": "Upload Session Not Found!!!"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(get_upload_session_data(session, "Upload Session Status"), status=status.HTTP_200_OK)
+
+    def put(self, request, uid):
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', 0))
+        except ValueError:
+            return Response({"status": "error", "message": "Upload-Offset header is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if length <= 0 or length > settings.UPLOAD_MAX_CHUNK_SIZE:
+            return Response({"status": "error", "message": "Invalid Chunk Size"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            session = append_upload_chunk(uid, request.user, offset, request.stream, length)
+        except UploadSessionError as e:
+            if not e.session:
+                return Response({"status": "error", "message": e.message}, status=status.HTTP_404_NOT_FOUND)
+
+            data = get_upload_session_data(e.session, e.message)
+            data["status"] = "error"
+            conflict = e.session.status == 'in_progress' and offset != e.session.received_size
+            return Response(data, status=status.HTTP_409_CONFLICT if conflict else status.HTTP_400_BAD_REQUEST)
+
+        if session.status == 'completed':
+            message = "Video Uploaded Successfully"
+        elif session.status == 'verifying':
+            message = "Video Received, Verifying"
+        else:
+            message = "Chunk Uploaded Successfully"
+
+        return Response(get_upload_session_data(session, message), status=status.HTTP_200_OK)
+
+@require_safe
+def z2h_stream_video(request, uid):
+    """Serve an uploaded video with HTTP Range support, so players can seek without downloading the whole file."""
+    upload = Z2HUploads.objects.filter(uid=uid, upload_type__in=VIDEO_UPLOAD_TYPES).first()
+    full_path = os.path.join(get_upload_root(), upload.file_path) if upload else None
+
+    if not full_path or not os.path.exists(full_path):
+        raise Http404("Video Not Found")
+
+    file_size = os.path.getsize(full_path)
+    etag = quote_etag(upload.sha256)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        # Content addressed, so a URL never changes content
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range_header(range_header, file_size)
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{file_size}"
+        return HttpResponse(status=416, headers=headers)
+
+    start, end = byte_range if byte_range else (0, file_size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    response_status = 200
+
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        response_status = 206
+
+    if request.method == 'HEAD':
+        return HttpResponse(status=response_status, headers=headers, content_type=content_type)
+
+    return StreamingHttpResponse(
+        read_file_range(full_path, start, end), status=response_status, headers=headers, content_type=content_type,
+    )
+